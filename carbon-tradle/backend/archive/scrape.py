@@ -1,27 +1,37 @@
 import json
-import requests
+import os
+import sys
 import logging
 import time  # optional, for rate limit delays
 
+# The shared HTTP cache lives one directory up, in backend/.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from http_cache import DEFAULT_CACHE_DIR, CachedSession
+from taxonomy import PARENT_MAPPING
+
 # Configure logging for debug-level messages
 logging.basicConfig(level=logging.DEBUG, format='%(levelname)s: %(message)s')
 
 # Base URL for the ClimateTRACE API
 BASE_URL = "https://api.climatetrace.org"
 
+# Responses are cached on disk and revalidated with ETag/Last-Modified on re-runs.
+# Set CARBONLE_HTTP_OFFLINE=1 to replay the cache without touching the network.
+http = CachedSession(DEFAULT_CACHE_DIR)
+
 # -------------------------------
 # Step 1: Retrieve definitions (sectors and subsectors)
 # -------------------------------
 logging.info("Fetching sectors definitions from API")
 sectors_url = f"{BASE_URL}/v6/definitions/sectors"
-sectors_response = requests.get(sectors_url)
+sectors_response = http.get(sectors_url)
 sectors_response.raise_for_status()
 sectors_data = sectors_response.json()  # Expected: list of strings
 logging.debug(f"Sectors data: {sectors_data}")
 
 logging.info("Fetching subsectors definitions from API")
 subsectors_url = f"{BASE_URL}/v6/definitions/subsectors"
-subsectors_response = requests.get(subsectors_url)
+subsectors_response = http.get(subsectors_url)
 subsectors_response.raise_for_status()
 subsectors_data = subsectors_response.json()  # Expected: list of strings
 logging.debug(f"Subsectors data: {subsectors_data}")
@@ -34,96 +44,9 @@ sector_subsector_mapping = {sector: [] for sector in sectors_data}
 logging.info("Built initial sector mapping.")
 logging.debug(f"Sector mapping after initialization: {sector_subsector_mapping}")
 
-# Manual mapping of subsector to its parent sector.
-# Adjust or expand this mapping as needed.
-parent_mapping = {
-    # manufacturing
-    'aluminum': 'manufacturing',
-    'cement': 'manufacturing',
-    'chemicals': 'manufacturing',
-    'pulp-and-paper': 'manufacturing',
-    'iron-and-steel': 'manufacturing',
-    'glass': 'manufacturing',
-    'textiles-leather-apparel': 'manufacturing',
-    'other-chemicals': 'manufacturing',
-    'other-energy-use': 'manufacturing',
-    'other-manufacturing': 'manufacturing',
-    'other-metals': 'manufacturing',
-    'petrochemical-steam-cracking': 'manufacturing',
-    
-    # mineral-extraction
-    'bauxite-mining': 'mineral-extraction',
-    'coal-mining': 'mineral-extraction',
-    'copper-mining': 'mineral-extraction',
-    'iron-mining': 'mineral-extraction',
-    'rock-quarrying': 'mineral-extraction',
-    'sand-quarrying': 'mineral-extraction',
-    'other-mining-quarrying': 'mineral-extraction',
-    'lime': 'mineral-extraction',
-    
-    # power
-    'electricity-generation': 'power',
-    'heat-plants': 'power',
-    
-    # transportation
-    'domestic-aviation': 'transportation',
-    'international-aviation': 'transportation',
-    'domestic-shipping': 'transportation',
-    # 'domestic-shipping-ship': no mapping provided
-    'railways': 'transportation',
-    'road-transportation': 'transportation',
-    'road-transportation-road-segment': 'transportation',
-    'other-transport': 'transportation',
-    'international-shipping': 'transportation',
-    # 'international-shipping-ship': no mapping provided
-    
-    # fossil-fuel-operations
-    'oil-and-gas-production': 'fossil-fuel-operations',
-    'oil-and-gas-refining': 'fossil-fuel-operations',
-    'oil-and-gas-transport': 'fossil-fuel-operations',
-    'other-fossil-fuel-operations': 'fossil-fuel-operations',
-    
-    # agriculture
-    'rice-cultivation': 'agriculture',
-    'enteric-fermentation-cattle-operation': 'agriculture',
-    'enteric-fermentation-cattle-pasture': 'agriculture',
-    'enteric-fermentation-other': 'agriculture',
-    'manure-applied-to-soils': 'agriculture',
-    'manure-management-cattle-operation': 'agriculture',
-    'manure-management-other': 'agriculture',
-    'other-agricultural-soil-emissions': 'agriculture',
-    'crop-residues': 'agriculture',
-    'cropland-fires': 'agriculture',
-    'manure-left-on-pasture-cattle': 'agriculture',
-    
-    # forestry-and-land-use
-    'forest-land-clearing': 'forestry-and-land-use',
-    'forest-land-degradation': 'forestry-and-land-use',
-    'forest-land-fires': 'forestry-and-land-use',
-    'net-forest-land': 'forestry-and-land-use',
-    'net-shrubgrass': 'forestry-and-land-use',
-    'net-wetland': 'forestry-and-land-use',
-    'shrubgrass-fires': 'forestry-and-land-use',
-    'soil-organic-carbon': 'forestry-and-land-use',
-    'wetland-fires': 'forestry-and-land-use',
-    'water-reservoirs': 'forestry-and-land-use',
-    'wood-and-wood-products': 'forestry-and-land-use',
-    'removals': 'forestry-and-land-use',
-    
-    # waste
-    'biological-treatment-of-solid-waste-and-biogenic': 'waste',
-    'incineration-and-open-burning-of-waste': 'waste',
-    'solid-waste-disposal': 'waste',
-    'domestic-wastewater-treatment-and-discharge': 'waste',
-    'residential-onsite-fuel-usage': 'waste',
-    'industrial-wastewater-treatment-and-discharge': 'waste',
-    
-    # fluorinated-gases
-    'fluorinated-gases': 'fluorinated-gases',
-    
-    # buildings (if applicable)
-    'non-residential-onsite-fuel-usage': 'buildings'
-}
+# Subsector -> parent sector mapping, shared with retrievedata.py.
+# Adjust or expand it in backend/taxonomy.py.
+parent_mapping = PARENT_MAPPING
 
 # Process each subsector from the API data
 for sub in subsectors_data:
@@ -370,7 +293,7 @@ for country, country_code in countries.items():
             }
             logging.info(f"Fetching emission data for {country} (code {country_code}), sector '{sector}', subsector '{subsector}'")
             try:
-                response = requests.get(f"{BASE_URL}/v6/assets/emissions", params=params)
+                response = http.get(f"{BASE_URL}/v6/assets/emissions", params=params)
                 response.raise_for_status()
                 emission_data = response.json()  # Expected: list of emission objects
                 logging.debug(f"Emission data for {country} - {sector} - {subsector}: {emission_data}")
@@ -382,6 +305,7 @@ for country, country_code in countries.items():
             # time.sleep(0.1)
 
 logging.info("Completed fetching emission data for all combinations.")
+logging.info(f"HTTP cache stats: {http.stats}")
 
 # -------------------------------
 # Step 4: Write the final nested JSON structure to a file
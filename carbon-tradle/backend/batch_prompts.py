@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import re
+
+from prompts import FACT_SYSTEM_PROMPT, MODEL, SYSTEM_PROMPT
+
+# Cache files read by daily_puzzle.py
+HINT_CACHE_FILE = "hint_cache.json"    # { target: { guess: hint } }
+FACT_CACHE_FILE = "fact_cache.json"    # { subsector: fact }
+
+BATCH_SIZE = 25
+MAX_ROUNDS = 3
+
+# Aliases this short ("us", "uk", "uae") are abbreviations, only forbidden in capitals
+SHORT_ALIAS_LENGTH = 3
+
+BATCH_INSTRUCTIONS = """
+You will receive several items at once as a JSON array. Answer each item independently, following all of the rules above.
+Reply with only a JSON array containing one object {"id": <the item's id>, "text": <your answer>} per input item, and nothing else.
+"""
+
+
+# =============================================================================
+# 1. GENERIC BATCHED GENERATION
+# =============================================================================
+
+def parse_batch_response(content):
+    """
+    Extracts { id: text } from a model reply that should be a JSON array of
+    {"id": ..., "text": ...}. Tolerates code fences or prose around the array;
+    malformed entries are simply left out (and so get retried).
+    """
+    start, end = content.find("["), content.rfind("]")
+    if start == -1 or end < start:
+        return {}
+    try:
+        items = json.loads(content[start:end + 1])
+    except ValueError:
+        return {}
+
+    answers = {}
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and isinstance(item.get("text"), str):
+            answers[str(item.get("id"))] = item["text"].strip()
+    return answers
+
+def generate_batched(client, system_prompt, instruction, items, validate,
+                     batch_size=BATCH_SIZE, max_rounds=MAX_ROUNDS, model=MODEL):
+    """
+    Packs items (dicts with a unique "id") into requests of batch_size and
+    collects one answer per item.
+
+    validate(item, text) returns None if the answer is acceptable, or a short
+    reason. Only items that are missing or invalid are sent again in the next
+    round, up to max_rounds.
+
+    :return: (results { id: text }, failures { id: reason })
+    """
+    results = {}
+    failures = {}
+    pending = list(items)
+
+    for _ in range(max_rounds):
+        if not pending:
+            break
+        retry = []
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            messages = [
+                {"role": "developer", "content": system_prompt + BATCH_INSTRUCTIONS},
+                {"role": "user", "content": f"{instruction}\n{json.dumps(batch)}"},
+            ]
+            try:
+                completion = client.chat.completions.create(model=model, messages=messages)
+                answers = parse_batch_response(completion.choices[0].message.content or "")
+                request_error = None
+            except Exception as e:
+                answers = {}
+                request_error = f"request failed: {e}"
+
+            for item in batch:
+                item_id = str(item["id"])
+                text = answers.get(item_id)
+                problem = request_error or ("missing from response" if not text else validate(item, text))
+                if problem:
+                    failures[item_id] = problem
+                    retry.append(item)
+                else:
+                    results[item_id] = text
+                    failures.pop(item_id, None)
+        pending = retry
+
+    return results, failures
+
+
+# =============================================================================
+# 2. HINTS AND FACTS
+# =============================================================================
+
+def mentions_any(text, names, ignore_case=True):
+    """ True if any of names appears in text as a whole word. """
+    flags = re.IGNORECASE if ignore_case else 0
+    return any(
+        re.search(rf"(?<!\w){re.escape(name)}(?!\w)", text, flags=flags)
+        for name in names if name
+    )
+
+def forbidden_words(code, aliases=None):
+    """
+    (names, codes) a hint for target code must not contain: its ALIASES
+    (case-insensitive) and, matched case-sensitively, the ISO3 code and any
+    alias of SHORT_ALIAS_LENGTH letters or less in capitals. Matching "CAN",
+    "PER" or "US" regardless of case would reject every hint saying "can",
+    "per capita" or "us".
+    """
+    from country_index import ALIASES
+    aliases = ALIASES.get(code, []) if aliases is None else aliases
+    names = [alias for alias in aliases if len(alias) > SHORT_ALIAS_LENGTH]
+    codes = [code] + [alias.upper() for alias in aliases if len(alias) <= SHORT_ALIAS_LENGTH]
+    return names, codes
+
+def generate_hints(client, target_name, guesses, forbidden=(), forbidden_codes=(), **kwargs):
+    """
+    Hints for many guesses against one target in as few calls as possible.
+
+    :param target_name: Display name of the target country
+    :param guesses: { guess_id: guess_name }
+    :param forbidden: Extra names the hint must not contain, matched case-insensitively;
+                      the target name is always forbidden, per SYSTEM_PROMPT.
+    :param forbidden_codes: Codes and abbreviations matched case-sensitively (see forbidden_words)
+    :return: (hints { guess_id: hint }, failures { guess_id: reason })
+    """
+    forbidden = [target_name, *forbidden]
+
+    def validate(item, text):
+        if mentions_any(text, forbidden) or mentions_any(text, forbidden_codes, ignore_case=False):
+            return "reveals the target country"
+        return None
+
+    items = [{"id": guess_id, "guess": guess_name} for guess_id, guess_name in guesses.items()]
+    instruction = (
+        f"The correct country is '{target_name}'. For each guess below, provide a hint that helps "
+        f"the player get from their guess closer to the correct answer."
+    )
+    return generate_batched(client, SYSTEM_PROMPT, instruction, items, validate, **kwargs)
+
+def generate_facts(client, subsectors, **kwargs):
+    """
+    Fun facts for many subsectors in as few calls as possible.
+    :return: (facts { subsector: fact }, failures { subsector: reason })
+    """
+    items = [{"id": subsector, "subsector": subsector} for subsector in subsectors]
+    instruction = (
+        "For each sub-sector below, share a fun fact about it, particularly in the context "
+        "of carbon emissions or environmental impact."
+    )
+    return generate_batched(client, FACT_SYSTEM_PROMPT, instruction, items, lambda item, text: None, **kwargs)
+
+
+# =============================================================================
+# 3. CACHE WARMING CLI
+# =============================================================================
+
+def update_json_file(filename, updates):
+    data = {}
+    if os.path.exists(filename):
+        with open(filename, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    for key, value in updates.items():
+        if isinstance(value, dict):
+            data.setdefault(key, {}).update(value)
+        else:
+            data[key] = value
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def make_client(stub=False):
+    if stub:
+        from fake_openai import FakeOpenAI
+        return FakeOpenAI()
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm hint/fact caches with batched model requests.")
+    parser.add_argument("kind", choices=["hints", "facts"])
+    parser.add_argument("--target", action="append", default=[],
+                        help="ISO3 code of a target country to generate hints for (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    parser.add_argument("--stub", action="store_true", help="Use the deterministic fake model (no API calls)")
+    args = parser.parse_args(argv)
+
+    client = make_client(args.stub)
+    options = {"batch_size": args.batch_size, "max_rounds": args.max_rounds}
+
+    if args.kind == "hints":
+        from daily_puzzle import load_coordinates
+        coordinates = load_coordinates()
+        updates = {}
+        for target in args.target:
+            guesses = {code: c["name"] for code, c in coordinates.items() if code != target}
+            names, codes = forbidden_words(target)
+            hints, failures = generate_hints(client, coordinates[target]["name"], guesses,
+                                             forbidden=names, forbidden_codes=codes, **options)
+            updates[target] = hints
+            print(f"{target}: {len(hints)} hints, {len(failures)} failed {sorted(failures)[:10]}")
+        update_json_file(HINT_CACHE_FILE, updates)
+        print(f"Updated '{HINT_CACHE_FILE}'")
+    else:
+        from taxonomy import ALL_SUBSECTORS
+        facts, failures = generate_facts(client, ALL_SUBSECTORS, **options)
+        print(f"{len(facts)} facts, {len(failures)} failed {sorted(failures)[:10]}")
+        update_json_file(FACT_CACHE_FILE, facts)
+        print(f"Updated '{FACT_CACHE_FILE}'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Compares the nested-dict breakdown (subsector_breakdown.json as loaded by
+# json.load) against compact_breakdown.CompactBreakdown loaded from its
+# binary snapshot:
+#   - resident memory added by loading and holding the structure (each model
+#     is measured in its own fresh interpreter so they can't share pages)
+#   - lookup latency for breakdown[country][sector][subsector], and for the
+#     compact model's direct value(country, subsector) path
+#
+#   python bench_breakdown.py
+BREAKDOWN_FILE = "subsector_breakdown.json"
+NUM_LOOKUPS = 200_000
+MODELS = ("nested", "compact", "compact-value")
+
+
+def rss_bytes():
+    """ Current resident set size of this process (Linux /proc). """
+    with open("/proc/self/statm") as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * resource.getpagesize()
+
+
+def lookup_keys(breakdown, count, seed=0):
+    """ Random (country, sector, subsector) triples that exist in the data. """
+    triples = [
+        (country, sector, subsector)
+        for country, sectors in breakdown.items()
+        for sector, subsectors in sectors.items()
+        for subsector in subsectors
+        if subsector != "sectorTotal"
+    ]
+    rng = random.Random(seed)
+    return [rng.choice(triples) for _ in range(count)]
+
+
+def measure(model, filename, snapshot):
+    """ Runs in a child process: load one model, report RSS delta and lookup latency. """
+    from compact_breakdown import CompactBreakdown
+    gc.collect()
+
+    before = rss_bytes()
+    if model == "nested":
+        with open(filename, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = CompactBreakdown.load(snapshot)
+    gc.collect()
+    held = rss_bytes() - before
+
+    if model == "nested":
+        keys = lookup_keys(data, NUM_LOOKUPS)
+    else:
+        keys = lookup_keys(data.to_dict(), NUM_LOOKUPS)
+
+    start = time.perf_counter()
+    if model == "compact-value":
+        for country, _, subsector in keys:
+            data.value(country, subsector)
+    else:
+        for country, sector, subsector in keys:
+            data[country][sector][subsector]
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({"model": model, "rss_bytes": held, "ns_per_lookup": 1e9 * elapsed / len(keys)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark nested-dict vs compact breakdown.")
+    parser.add_argument("--input", default=BREAKDOWN_FILE)
+    parser.add_argument("--child", choices=MODELS, help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child, args.input, args.snapshot)
+        return
+
+    from compact_breakdown import CompactBreakdown
+    with open(args.input, "r", encoding="utf-8") as f:
+        nested = json.load(f)
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "breakdown.bin")
+        CompactBreakdown.from_breakdown(nested).save(snapshot)
+        print(f"'{args.input}': {os.path.getsize(args.input) / 1024:.0f} KiB JSON, "
+              f"{os.path.getsize(snapshot) / 1024:.0f} KiB compact snapshot\n")
+
+        print(f"{'model':<14}  {'RSS held (KiB)':>14}  {'lookup (ns)':>11}")
+        print("-" * 43)
+        for model in MODELS:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", model, "--input", args.input, "--snapshot", snapshot],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(out)
+            print(f"{model:<14}  {result['rss_bytes'] / 1024:>14.0f}  {result['ns_per_lookup']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
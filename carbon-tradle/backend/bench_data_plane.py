@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+
+from compact_breakdown import SUBSECTORS
+from daily_puzzle import BREAKDOWN_FILE, COORDINATES_FILE, load_coordinates
+from data_plane import GROSS_FILE, NET_FILE, DataPlane, build_snapshot
+
+# Per-worker unique memory (USS = Private_Clean + Private_Dirty from
+# /proc/<pid>/smaps_rollup) of forked workers that each read every number
+# once, like a worker serving requests would:
+#   - none:                no emissions data (interpreter baseline)
+#   - json-per-worker:     every worker parses the JSON/CSV files itself
+#   - json-preloaded:      the master parses them before fork; workers
+#                          un-share pages just by touching (refcounting) objects
+#   - snapshot-preloaded:  the master memory-maps data_plane.bin before fork
+#                          (data_plane.preload())
+# The master calls gc.freeze() before forking in every mode.
+#
+#   python bench_data_plane.py [--workers 1 4 16]
+MODES = ("none", "json-per-worker", "json-preloaded", "snapshot-preloaded")
+
+
+def uss_kib():
+    """ Unique set size of this process in KiB (Linux only). """
+    private = 0
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                private += int(line.split()[1])
+    return private
+
+
+def load_json_data():
+    with open(BREAKDOWN_FILE, "r", encoding="utf-8") as f:
+        breakdown = json.load(f)
+    with open(NET_FILE, "r", encoding="utf-8") as f:
+        net = json.load(f)
+    with open(GROSS_FILE, "r", encoding="utf-8") as f:
+        gross = json.load(f)
+    return breakdown, net, gross, load_coordinates(COORDINATES_FILE)
+
+
+def touch_json(data):
+    breakdown, net, gross, coordinates = data
+    total = 0.0
+    for country, sectors in breakdown.items():
+        total += net.get(country, 0.0) + gross.get(country, 0.0)
+        place = coordinates.get(country)
+        if place:
+            total += place["lat"] + place["lon"]
+        for subsectors in sectors.values():
+            for value in subsectors.values():
+                total += value
+    return total
+
+
+def touch_snapshot(plane):
+    total = 0.0
+    for country in plane.countries:
+        total += (plane.net(country) or 0.0) + (plane.gross(country) or 0.0)
+        place = plane.coordinates(country)
+        if place:
+            total += place[0] + place[1]
+        for subsector in SUBSECTORS:
+            total += plane.breakdown.value(country, subsector)
+    return total
+
+
+def worker(mode, shared, report_fd, release_fd):
+    """ Runs in a forked child: touch all data, report USS, wait until released. """
+    if mode == "json-per-worker":
+        touch_json(load_json_data())
+    elif mode == "json-preloaded":
+        touch_json(shared)
+    elif mode == "snapshot-preloaded":
+        touch_snapshot(shared)
+    gc.collect()
+    os.write(report_fd, f"{uss_kib()}\n".encode())
+    # Stay alive (and keep pages shared) until every sibling has reported.
+    os.read(release_fd, 1)
+    os._exit(0)
+
+
+def run(mode, workers, snapshot):
+    """ Forks `workers` children from a master prepared for `mode`; returns their USS values (KiB). """
+    shared = None
+    if mode == "json-preloaded":
+        shared = load_json_data()
+    elif mode == "snapshot-preloaded":
+        shared = DataPlane.open(snapshot)
+    # Every mode freezes, so the baseline isn't inflated by collections
+    # un-sharing the interpreter's own objects.
+    gc.freeze()
+
+    report_r, report_w = os.pipe()
+    release_r, release_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(report_r)
+            os.close(release_w)
+            worker(mode, shared, report_w, release_r)
+        pids.append(pid)
+    os.close(report_w)
+    os.close(release_r)
+
+    with os.fdopen(report_r) as reports:
+        values = [int(reports.readline()) for _ in range(workers)]
+    os.close(release_w)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-worker USS for the data loading modes.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "data_plane.bin")
+        build_snapshot(snapshot)
+
+        print(f"{'mode':<22}{'workers':>8}{'USS/worker (KiB)':>18}{'over baseline':>15}{'total USS (KiB)':>17}")
+        print("-" * 80)
+        baseline = {}
+        for mode in MODES:
+            for workers in args.workers:
+                # Each measurement gets its own master, so modes can't share pages.
+                read_fd, write_fd = os.pipe()
+                pid = os.fork()
+                if pid == 0:
+                    os.close(read_fd)
+                    values = run(mode, workers, snapshot)
+                    os.write(write_fd, json.dumps(values).encode())
+                    os._exit(0)
+                os.close(write_fd)
+                with os.fdopen(read_fd) as f:
+                    values = json.loads(f.read())
+                os.waitpid(pid, 0)
+
+                per_worker = sum(values) / len(values)
+                if mode == "none":
+                    baseline[workers] = per_worker
+                extra = per_worker - baseline.get(workers, per_worker)
+                print(f"{mode:<22}{workers:>8}{per_worker:>18.0f}{extra:>15.0f}{sum(values):>17}")
+
+
+if __name__ == "__main__":
+    if not sys.platform.startswith("linux"):
+        sys.exit("bench_data_plane.py reads /proc/self/smaps_rollup and needs Linux")
+    main()
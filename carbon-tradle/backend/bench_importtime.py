@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Worker boot cost of the Flask backends, measured in fresh interpreters:
+#   - "import":          import the backend module (what a worker pays before
+#                        it can accept a request now that init is lazy)
+#   - "import+warm_up":  import and build the model client / caches, i.e. what
+#                        every worker paid at import before
+# plus a `python -X importtime` breakdown of the slowest imports.
+#
+#   python bench_importtime.py [--runs 7] [--top 12]
+BACKENDS = ("hint_backend", "fact_and_tip_backend")
+MODES = {
+    "import": "import {module}",
+    "import+warm_up": "import {module}; {module}.warm_up()",
+}
+
+TIMER = """
+import time
+_start = time.perf_counter()
+{code}
+print(time.perf_counter() - _start)
+"""
+
+
+def boot_seconds(module, mode, runs):
+    """ Median wall time of `mode` over runs fresh interpreters. """
+    code = TIMER.format(code=MODES[mode].format(module=module))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def importtime(module):
+    """
+    Parses `python -X importtime -c "import <module>"` output into
+    [(cumulative_us, self_us, name)], slowest first.
+    """
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return sorted(rows, reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure backend worker boot time.")
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=12, help="Slowest imports to list per backend")
+    args = parser.parse_args(argv)
+
+    print(f"{'backend':<24}{'import (ms)':>14}{'import+warm_up (ms)':>22}")
+    print("-" * 60)
+    for module in BACKENDS:
+        lazy = boot_seconds(module, "import", args.runs)
+        eager = boot_seconds(module, "import+warm_up", args.runs)
+        print(f"{module:<24}{lazy * 1000:>14.1f}{eager * 1000:>22.1f}")
+
+    for module in BACKENDS:
+        print(f"\n-X importtime, {module} (cumulative / self, ms):")
+        for cumulative_us, self_us, name in importtime(module)[:args.top]:
+            print(f"  {cumulative_us / 1000:>8.1f} {self_us / 1000:>8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Peak memory and throughput of process.py's two ingestion paths over
+# simplified_emissions.json scaled up by repeating its records:
+#   - load:    json.load + validate_records + the three aggregators
+#   - stream:  json_stream + iter_valid_records + aggregate_records (--stream)
+# Each run happens in a fresh interpreter; memory is the peak RSS growth
+# over the interpreter with all modules already imported.
+#
+#   python bench_stream_json.py [--scales 1 10 40]
+INPUT_FILE = "simplified_emissions.json"
+MODES = ("load", "stream")
+
+
+def peak_rss_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(mode, filename):
+    """ Runs in the child: prints {"seconds", "peak_kib", "records"} as JSON. """
+    import process
+    from records import iter_valid_records, validate_records
+    from collections import Counter
+
+    baseline = peak_rss_kib()
+    start = time.perf_counter()
+    if mode == "load":
+        records, _ = validate_records(process.load_simplified_emissions(filename))
+        process.calculate_net_emissions(records)
+        process.calculate_gross_emissions(records)
+        process.build_subsector_breakdown(records)
+        count = len(records)
+    else:
+        records = iter_valid_records(process.iter_simplified_emissions(filename), Counter())
+        count = process.aggregate_records(records)[3]
+    seconds = time.perf_counter() - start
+    print(json.dumps({"seconds": seconds, "peak_kib": peak_rss_kib() - baseline, "records": count}))
+
+
+def write_scaled(source, scale, output):
+    """ Writes source's records repeated scale times, in the same pretty-printed format. """
+    with open(source, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(records * scale, f, indent=2)
+    return os.path.getsize(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark json.load vs the streaming parser in process.py.")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 40])
+    args = parser.parse_args(argv)
+
+    print(f"{'scale':>6}{'file (MiB)':>12}{'mode':>8}{'records':>10}{'seconds':>10}{'records/s':>12}{'peak RSS (MiB)':>16}")
+    print("-" * 74)
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            filename = os.path.join(tmp, f"scaled_{scale}.json")
+            size = write_scaled(args.input, scale, filename)
+            for mode in MODES:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, filename],
+                    capture_output=True, text=True, check=True,
+                )
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{scale:>6}{size / 2**20:>12.1f}{mode:>8}{result['records']:>10}"
+                      f"{result['seconds']:>10.2f}{result['records'] / result['seconds']:>12.0f}"
+                      f"{result['peak_kib'] / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        main()
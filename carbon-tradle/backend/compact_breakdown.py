@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+from array import array
+from enum import IntEnum
+
+from taxonomy import (
+    NUM_SUBSECTORS,
+    SECTOR_INDEX,
+    SECTOR_SLICES,
+    SECTORS,
+    SUBSECTOR_INDEX,
+    SUBSECTORS,
+)
+
+# =============================================================================
+# 1. INTERNED TAXONOMY
+# =============================================================================
+
+# SECTORS / SUBSECTORS (ordered so each sector is one contiguous slice of a
+# country's row), their indexes and SECTOR_SLICES come from taxonomy.py.
+
+# Enum value == position in the dense arrays, e.g. Subsector["cement"].value
+Sector = IntEnum("Sector", {name: i for i, name in enumerate(SECTORS)})
+Subsector = IntEnum("Subsector", {name: i for i, name in enumerate(SUBSECTORS)})
+
+SECTOR_TOTAL_KEY = "sectorTotal"
+
+
+# =============================================================================
+# 2. VIEWS
+# =============================================================================
+
+class SectorView:
+    """
+    One sector of one country. Behaves like the inner dict of
+    subsector_breakdown.json:
+        view["electricity-generation"]  -> float
+        view["sectorTotal"]             -> float
+    """
+    __slots__ = ("name", "_values", "_offset", "_start", "_stop")
+
+    def __init__(self, name, values, offset, start, stop):
+        self.name = name
+        self._values = values
+        self._offset = offset
+        self._start = start
+        self._stop = stop
+
+    @property
+    def total(self):
+        return sum(self._values[self._offset + self._start:self._offset + self._stop])
+
+    def __getitem__(self, subsector):
+        if subsector == SECTOR_TOTAL_KEY:
+            return self.total
+        i = SUBSECTOR_INDEX[subsector]
+        if not self._start <= i < self._stop:
+            raise KeyError(subsector)
+        return self._values[self._offset + i]
+
+    def items(self):
+        for i in range(self._start, self._stop):
+            yield SUBSECTORS[i], self._values[self._offset + i]
+
+    def to_dict(self):
+        """ The subsector_breakdown.json shape, including "sectorTotal". """
+        result = dict(self.items())
+        result[SECTOR_TOTAL_KEY] = self.total
+        return result
+
+
+class CountryView:
+    """
+    One country's breakdown. view["power"] returns a SectorView, so nested
+    lookups read like the dict version:
+        breakdown["USA"]["power"]["electricity-generation"]
+    Views only hold a reference to the shared array plus an offset.
+    """
+    __slots__ = ("country", "_values", "_offset", "_sectors")
+
+    def __init__(self, country, values, offset):
+        self.country = country
+        self._values = values
+        self._offset = offset
+        self._sectors = tuple(
+            SectorView(sector, values, offset, *SECTOR_SLICES[sector]) for sector in SECTORS
+        )
+
+    def __getitem__(self, sector):
+        return self._sectors[SECTOR_INDEX[sector]]
+
+    def subsector(self, name):
+        return self._values[self._offset + SUBSECTOR_INDEX[name]]
+
+    @property
+    def total(self):
+        return sum(self._values[self._offset:self._offset + NUM_SUBSECTORS])
+
+    def keys(self):
+        return SECTORS
+
+    def to_dict(self):
+        return {sector: self[sector].to_dict() for sector in SECTORS}
+
+
+# =============================================================================
+# 3. COMPACT BREAKDOWN
+# =============================================================================
+
+class CompactBreakdown:
+    """
+    Alternative in-memory model for build_subsector_breakdown's output.
+
+    All numbers live in one flat array('d') (or any float64 buffer, e.g. a
+    memoryview over data_plane.py's memory-mapped snapshot) of shape
+    (len(countries), NUM_SUBSECTORS), row-major, in SUBSECTORS order; a
+    subsector a country never reported is 0.0. "sectorTotal" is computed from
+    the sector's slice on demand instead of being stored. Country lookups go
+    through a single dict of row offsets; views are cached per country.
+    """
+    __slots__ = ("countries", "_rows", "_values", "_views", "skipped")
+
+    def __init__(self, countries, values, skipped=0):
+        self.countries = tuple(sys.intern(c) for c in countries)
+        self._rows = {country: i * NUM_SUBSECTORS for i, country in enumerate(self.countries)}
+        self._values = values
+        # CountryViews are built on first access and reused (11 small objects per country).
+        self._views = {}
+        # Records dropped because their subsector isn't in PARENT_MAPPING.
+        self.skipped = skipped
+
+    @classmethod
+    def from_records(cls, records):
+        """ Builds the model straight from validated records (records.EmissionRecord, one pass). """
+        rows = {}
+        values = array("d")
+        skipped = 0
+        for country, _sector, subsector, emissions in records:
+            i = SUBSECTOR_INDEX.get(subsector)
+            if i is None:
+                skipped += 1
+                continue
+            offset = rows.get(country)
+            if offset is None:
+                offset = rows[country] = len(values)
+                values.frombytes(bytes(8 * NUM_SUBSECTORS))  # NUM_SUBSECTORS zeros
+            values[offset + i] += emissions
+        return cls(list(rows), values, skipped)
+
+    @classmethod
+    def from_breakdown(cls, breakdown):
+        """ Converts an existing nested dict (subsector_breakdown.json) to the compact model. """
+        countries = list(breakdown)
+        values = array("d", bytes(8 * NUM_SUBSECTORS * len(countries)))
+        skipped = 0
+        for row, country in enumerate(countries):
+            offset = row * NUM_SUBSECTORS
+            for subsectors in breakdown[country].values():
+                for subsector, emissions in subsectors.items():
+                    if subsector == SECTOR_TOTAL_KEY:
+                        continue
+                    i = SUBSECTOR_INDEX.get(subsector)
+                    if i is None:
+                        skipped += 1
+                        continue
+                    values[offset + i] += emissions
+        return cls(countries, values, skipped)
+
+    def save(self, filename):
+        """
+        Writes a binary snapshot: one JSON header line with the country and
+        subsector order, followed by the raw float64 array.
+        """
+        header = {"countries": list(self.countries), "subsectors": list(SUBSECTORS)}
+        with open(filename, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            self._values.tofile(f)
+
+    def values_bytes(self):
+        """ The raw float64 values (as written by save() after the header line). """
+        return memoryview(self._values).cast("B")
+
+    @classmethod
+    def load(cls, filename):
+        """ Reads a snapshot written by save() without going through any nested dicts. """
+        with open(filename, "rb") as f:
+            header = json.loads(f.readline())
+            if tuple(header["subsectors"]) != SUBSECTORS:
+                raise ValueError(f"'{filename}' was written with a different subsector taxonomy")
+            values = array("d")
+            values.fromfile(f, len(header["countries"]) * NUM_SUBSECTORS)
+        return cls(header["countries"], values)
+
+    def __contains__(self, country):
+        return country in self._rows
+
+    def __len__(self):
+        return len(self.countries)
+
+    def __getitem__(self, country):
+        view = self._views.get(country)
+        if view is None:
+            view = self._views[country] = CountryView(country, self._values, self._rows[country])
+        return view
+
+    def value(self, country, subsector):
+        """ Fastest path: a single float without building any view. """
+        return self._values[self._rows[country] + SUBSECTOR_INDEX[subsector]]
+
+    def to_dict(self):
+        """ Back to the nested-dict layout of subsector_breakdown.json. """
+        return {country: self[country].to_dict() for country in self.countries}
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+import argparse
+import ast
+import re
+import time
+import unicodedata
+
+from daily_puzzle import COORDINATES_FILE, load_coordinates
+
+# Country-name resolution and autocomplete for the backends:
+#   index = CountryIndex.build()
+#   index.resolve("ivory coast")   -> "CIV"
+#   index.resolve("Germny")        -> "DEU"   (typo, within MAX_EDITS)
+#   index.suggest("unit", 3)       -> ([{"code": "USA", "name": "United States"},
+#                                       {"code": "GBR", "name": "United Kingdom"}, ...], False)
+#
+# Names come from coordinates.csv (the display names the frontend uses), the
+# name -> ISO3 table in archive/scrape.py, the ISO3 codes themselves and
+# ALIASES below. Every name is normalized (accents, case, punctuation,
+# "St." -> "saint", a leading "the") before it goes into one character trie,
+# from each word start, so "korea" also finds "South Korea". Each trie node
+# keeps its best MAX_SUGGESTIONS matches, so a prefix lookup is one walk down
+# the trie.
+#
+# Typos go through a symmetric-delete index (as in SymSpell): every string
+# reachable by deleting up to MAX_EDITS_LONG characters from the first
+# PREFIX_LENGTH characters of a name (and of each shorter start of it) maps
+# back to the names. A query generates its own deletes, looks them up, and
+# only the few names that share one are checked with a real edit distance,
+# so a typo costs a few dozen dict lookups instead of a scan of every name.
+SCRAPE_FILE = "archive/scrape.py"
+MAX_SUGGESTIONS = 10
+PREFIX_LENGTH = 7
+
+# Common names and abbreviations missing from both tables
+ALIASES = {
+    "USA": ["us", "u.s.", "u.s.a.", "america", "united states of america"],
+    "GBR": ["uk", "u.k.", "britain", "great britain", "england", "scotland", "wales"],
+    "ARE": ["uae"],
+    "COD": ["drc", "dr congo", "congo-kinshasa", "democratic republic of congo", "zaire"],
+    "COG": ["congo-brazzaville", "congo republic"],
+    "CIV": ["ivory coast", "cote divoire"],
+    "KOR": ["south korea", "republic of korea"],
+    "PRK": ["north korea", "dprk"],
+    "CZE": ["czech republic", "czechia"],
+    "MMR": ["burma"],
+    "NLD": ["holland", "the netherlands"],
+    "RUS": ["russian federation"],
+    "TUR": ["turkey", "turkiye"],
+    "SWZ": ["swaziland", "eswatini"],
+    "CPV": ["cape verde", "cabo verde"],
+    "TLS": ["east timor"],
+    "MKD": ["north macedonia", "fyrom"],
+    "LAO": ["laos", "lao pdr"],
+    "VAT": ["vatican", "holy see"],
+    "FSM": ["micronesia"],
+    "IRN": ["persia"],
+    "LKA": ["ceylon"],
+    "BFA": ["upper volta"],
+}
+
+# Edits allowed for a typo, by the length of the normalized query
+MAX_EDITS = ((3, 0), (5, 1))   # up to 3 chars: none, up to 5: one, longer: two
+MAX_EDITS_LONG = 2
+
+# Whole words rewritten by normalize_name
+WORD_REWRITES = {"st": "saint", "ste": "sainte", "mt": "mount", "rep": "republic", "dem": "democratic"}
+
+_NOT_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Match kinds, best first; suggestions sort on (kind, name length, name)
+DISPLAY, OTHER_NAME, INNER_WORD = 0, 1, 2
+
+
+# =============================================================================
+# 1. NORMALIZATION
+# =============================================================================
+
+def normalize_name(text):
+    """ "  Côte d'Ivoire" -> "cote d ivoire", "St. Lucia" -> "saint lucia", "The Gambia" -> "gambia" """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    words = _NOT_ALNUM.sub(" ", text.replace("&", " and ").replace("'", "")).split()
+    if len(words) > 1 and words[0] == "the":
+        words = words[1:]
+    return " ".join(WORD_REWRITES.get(word, word) for word in words)
+
+def max_edits(key):
+    for length, edits in MAX_EDITS:
+        if len(key) <= length:
+            return edits
+    return MAX_EDITS_LONG
+
+def load_scrape_countries(filename=SCRAPE_FILE):
+    """
+    The `countries = {name: ISO3}` table from archive/scrape.py, read with
+    ast so the script (which calls the API at import) never runs.
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "countries" for t in node.targets):
+            return ast.literal_eval(node.value)
+    return {}
+
+
+def deletes(text, edits):
+    """ Every string made by deleting up to edits characters from text, text included. """
+    found = {text}
+    frontier = {text}
+    for _ in range(edits):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        found |= frontier
+    return found
+
+def edit_distance(query, key, prefix=False, limit=None):
+    """
+    Damerau-Levenshtein distance (optimal string alignment: an adjacent
+    transposition counts as one edit). With prefix=True, the distance from
+    query to the closest start of key ("germny" -> "germany" is 1, and so is
+    "germny" -> "germany something"). Stops early with limit + 1 once the
+    distance must exceed limit.
+    """
+    prev_prev, prev = None, list(range(len(key) + 1))
+    for i in range(1, len(query) + 1):
+        row = [i]
+        for j in range(1, len(key) + 1):
+            cost = min(prev[j - 1] + (query[i - 1] != key[j - 1]), prev[j] + 1, row[j - 1] + 1)
+            if i > 1 and j > 1 and query[i - 1] == key[j - 2] and query[i - 2] == key[j - 1]:
+                cost = min(cost, prev_prev[j - 2] + 1)
+            row.append(cost)
+        if limit is not None and min(row) > limit:
+            return limit + 1
+        prev_prev, prev = prev, row
+    return min(prev) if prefix else prev[-1]
+
+
+# =============================================================================
+# 2. INDEX
+# =============================================================================
+
+class Node:
+    __slots__ = ("children", "ranked")
+
+    def __init__(self):
+        self.children = {}
+        self.ranked = []   # [(kind, len, name, code)] best matches at or below this node
+
+
+class CountryIndex:
+    """
+    names[code] is the display name; every other name, alias and the code
+    itself resolve to it. Build once (CountryIndex.build()) and share: all
+    lookups are read-only.
+    """
+
+    def __init__(self, names, other_names=()):
+        self.names = dict(names)
+        self.keys = {}
+        self.root = Node()   # every word start of every name
+        self.typos = {}      # delete string -> { key }
+        for code, name in self.names.items():
+            self._add(name, code, DISPLAY)
+        for name, code in other_names:
+            if code in self.names:
+                self._add(name, code, OTHER_NAME)
+        self._finish(self.root)
+
+    @classmethod
+    def build(cls, coordinates_file=COORDINATES_FILE, scrape_file=SCRAPE_FILE, aliases=None):
+        names = {code: c["name"] for code, c in load_coordinates(coordinates_file).items()}
+        other_names = [(code, code) for code in names]
+        other_names += [(name, code) for name, code in load_scrape_countries(scrape_file).items()]
+        aliases = ALIASES if aliases is None else aliases
+        other_names += [(alias, code) for code, names_ in aliases.items() for alias in names_]
+        return cls(names, other_names)
+
+    def _add(self, name, code, kind):
+        key = normalize_name(name)
+        if not key or key in self.keys:
+            return
+        self.keys[key] = code
+        entry = (kind, len(key), self.names[code], code)
+        for start in [0] + [m.end() for m in re.finditer(" ", key)]:
+            node = self.root
+            for char in key[start:]:
+                node = node.children.setdefault(char, Node())
+                node.ranked.append(entry if start == 0 else (INNER_WORD,) + entry[1:])
+
+        head = key[:PREFIX_LENGTH]
+        for length in range(1, len(head) + 1):
+            for deleted in deletes(head[:length], MAX_EDITS_LONG):
+                self.typos.setdefault(deleted, set()).add(key)
+
+    def _finish(self, node):
+        """ Keeps each node's best entry per code, best first, at most MAX_SUGGESTIONS. """
+        best = {}
+        for entry in sorted(node.ranked):
+            best.setdefault(entry[3], entry)
+        node.ranked = list(best.values())[:MAX_SUGGESTIONS]
+        for child in node.children.values():
+            self._finish(child)
+
+    def _walk(self, key):
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    # -------------------------------------------------------------------------
+    # Typos
+    # -------------------------------------------------------------------------
+
+    def _fuzzy(self, key, edits, prefix):
+        """
+        { code: distance } for names within edits of key. With prefix=True a
+        name only has to start with something that close (for autocomplete).
+        """
+        candidates = set()
+        for deleted in deletes(key[:PREFIX_LENGTH], edits):
+            candidates |= self.typos.get(deleted, set())
+
+        found = {}
+        for candidate in candidates:
+            if prefix:
+                candidate_start = candidate[:len(key) + edits]   # no closer start is longer
+            elif abs(len(candidate) - len(key)) > edits:
+                continue
+            else:
+                candidate_start = candidate
+            distance = edit_distance(key, candidate_start, prefix, edits)
+            code = self.keys[candidate]
+            if distance <= edits and distance < found.get(code, edits + 1):
+                found[code] = distance
+        return found
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    def resolve(self, text):
+        """
+        ISO3 code for a country name, alias or code, the start of exactly
+        one country's name ("bosnia"), or a close typo, or None. A typo only
+        resolves when a single country is the closest match.
+        """
+        if not text:
+            return None
+        code = str(text).strip().upper()
+        if code in self.names:
+            return code
+        key = normalize_name(text)
+        if key in self.keys:
+            return self.keys[key]
+        node = self._walk(key)
+        if node is not None:
+            return node.ranked[0][3] if len(node.ranked) == 1 else None
+
+        found = self._fuzzy(key, max_edits(key), prefix=False)
+        if not found:
+            return None
+        best = min(found.values())
+        closest = [code for code, distance in found.items() if distance == best]
+        return closest[0] if len(closest) == 1 else None
+
+    def canonical_name(self, text):
+        """ Display name for anything resolve() understands, else the text with whitespace folded. """
+        code = self.resolve(text)
+        return self.names[code] if code else " ".join(str(text).split())
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        """
+        Returns (suggestions, fuzzy): up to limit { "code", "name" } dicts for
+        names starting with text (or with a word starting with it), and
+        whether they came from the typo-tolerant search.
+        """
+        key = normalize_name(text)
+        limit = max(0, min(limit, MAX_SUGGESTIONS))
+        if not key or not limit:
+            return [], False
+
+        node = self._walk(key)
+        if node is not None:
+            return [{"code": code, "name": name} for _, _, name, code in node.ranked[:limit]], False
+
+        found = self._fuzzy(key, max_edits(key), prefix=True)
+        codes = sorted(found, key=lambda code: (found[code], self.names[code]))[:limit]
+        return [{"code": code, "name": self.names[code]} for code in codes], True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve country names and time autocomplete lookups.")
+    parser.add_argument("queries", nargs="*", default=["uni", "korea", "ivory coast", "germny", "st lucia", "xyz"])
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = CountryIndex.build()
+    print(f"Indexed {len(index.names)} countries, {len(index.keys)} names in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for query in args.queries:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            suggestions, fuzzy = index.suggest(query, 5)
+        suggest_us = (time.perf_counter() - start) / args.repeat * 1e6
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            code = index.resolve(query)
+        resolve_us = (time.perf_counter() - start) / args.repeat * 1e6
+        names = ", ".join(s["name"] for s in suggestions)
+        print(f"{query!r}: resolve={code} ({resolve_us:.0f} us)  suggest{' (fuzzy)' if fuzzy else ''}=[{names}] ({suggest_us:.0f} us)")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from serialization import dump_json
+
+# Inputs
+COORDINATES_FILE = os.path.join("..", "frontend", "public", "data", "coordinates.csv")
+BREAKDOWN_FILE   = "subsector_breakdown.json"
+RANKINGS_FILE    = "rankings.npz"       # optional, written by process.py
+HINT_CACHE_FILE  = "hint_cache.json"    # optional: { target: { guess: hint } }
+FACT_CACHE_FILE  = "fact_cache.json"    # optional: { subsector: fact }
+
+# Output: one compact bundle per day, e.g. puzzles/2025-02-16.json
+OUTPUT_DIR = "puzzles"
+
+# Changing the salt reshuffles every future puzzle.
+DEFAULT_SALT = "carbonle"
+
+# Number of top subsectors whose facts are bundled.
+TOP_SUBSECTORS = 3
+
+EARTH_RADIUS_KM = 6371
+ARROWS = ["↑", "↗", "→", "↘", "↓", "↙", "←", "↖"]
+
+
+# =============================================================================
+# 1. GEOMETRY (mirrors frontend/src/utils/distanceUtils.js)
+# =============================================================================
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """ Great-circle distance in km. """
+    d_lat = math.radians(lat2 - lat1)
+    d_lon = math.radians(lon2 - lon1)
+    a = (math.sin(d_lat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lon / 2) ** 2)
+    a = min(a, 1.0)  # rounding can push near-antipodal points just past 1
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+def bearing_degrees(lat1, lon1, lat2, lon2):
+    """ Initial bearing from point 1 to point 2, in [0, 360). """
+    d_lon = math.radians(lon2 - lon1)
+    y = math.sin(d_lon) * math.cos(math.radians(lat2))
+    x = (math.cos(math.radians(lat1)) * math.sin(math.radians(lat2)) -
+         math.sin(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.cos(d_lon))
+    return (math.degrees(math.atan2(y, x)) + 360) % 360
+
+def bearing_arrow(bearing):
+    """ Same 8-way arrow as getDirectionArrow in the frontend. """
+    return ARROWS[int(((bearing + 22.5) % 360) // 45)]
+
+
+# =============================================================================
+# 2. INPUTS
+# =============================================================================
+
+def load_coordinates(filename=COORDINATES_FILE):
+    """
+    { "AFG": { "name": "Afghanistan", "lat": 33.0, "lon": 65.0 }, ... }
+    Rows without a position (e.g. "EUU,European Union (27),,") are skipped.
+    """
+    coordinates = {}
+    with open(filename, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if not row["LATITUDE"] or not row["LONGITUDE"]:
+                continue
+            coordinates[row["CODE"]] = {
+                "name": row["COUNTRY"],
+                "lat": float(row["LATITUDE"]),
+                "lon": float(row["LONGITUDE"]),
+            }
+    return coordinates
+
+def load_optional_json(filename):
+    if not filename or not os.path.exists(filename):
+        return {}
+    with open(filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_inputs(breakdown_file=BREAKDOWN_FILE, coordinates_file=COORDINATES_FILE, rankings_file=RANKINGS_FILE,
+                hint_cache_file=HINT_CACHE_FILE, fact_cache_file=FACT_CACHE_FILE):
+    """ Everything a bundle is built from, loaded once (per worker process). """
+    with open(breakdown_file, "r", encoding="utf-8") as f:
+        breakdown = json.load(f)
+
+    rankings = None
+    if rankings_file and os.path.exists(rankings_file):
+        from rankings import RankingTable
+        rankings = RankingTable.load(rankings_file)
+
+    return {
+        "breakdown": breakdown,
+        "coordinates": load_coordinates(coordinates_file),
+        "rankings": rankings,
+        "hints": load_optional_json(hint_cache_file),
+        "facts": load_optional_json(fact_cache_file),
+    }
+
+def candidate_targets(inputs):
+    """ Countries that have both an emissions breakdown and coordinates, sorted. """
+    return sorted(set(inputs["breakdown"]) & set(inputs["coordinates"]))
+
+
+# =============================================================================
+# 3. BUNDLE
+# =============================================================================
+
+def select_target(day, candidates, salt=DEFAULT_SALT):
+    """ Deterministic pick for a date: sha256(salt:YYYY-MM-DD) mod len(candidates). """
+    digest = hashlib.sha256(f"{salt}:{day.isoformat()}".encode("utf-8")).digest()
+    return candidates[int.from_bytes(digest[:8], "big") % len(candidates)]
+
+def build_tree(country, sectors):
+    """ Same shape as frontend/public/data/file_hierarchical.json for one country. """
+    children = []
+    for sector, subsectors in sectors.items():
+        children.append({
+            "name": sector,
+            "value": subsectors.get("sectorTotal", 0.0),
+            "children": [
+                {"name": name, "value": value}
+                for name, value in subsectors.items()
+                if name != "sectorTotal"
+            ],
+        })
+    return {"name": country, "children": children}
+
+def ranked_sectors(sectors):
+    """ Sectors by total, largest first, with their share of the positive total. """
+    totals = {sector: subsectors.get("sectorTotal", 0.0) for sector, subsectors in sectors.items()}
+    positive = sum(v for v in totals.values() if v > 0) or 1.0
+    return [
+        {"sector": sector, "value": value, "share": max(value, 0.0) / positive}
+        for sector, value in sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    ]
+
+def top_subsectors(sectors, n=TOP_SUBSECTORS):
+    values = [
+        (value, name)
+        for subsectors in sectors.values()
+        for name, value in subsectors.items()
+        if name != "sectorTotal" and value > 0
+    ]
+    return [name for _, name in sorted(values, reverse=True)[:n]]
+
+def distance_row(target, coordinates):
+    """
+    Feedback the game would show for every possible guess:
+      { "USA": { "distance_km": 11200.5, "accuracy": 0.42, "arrow": "↗" }, ... }
+    accuracy = (max distance from target - distance) / max distance, as in Home.js.
+    """
+    t = coordinates[target]
+    distances = {
+        code: haversine_distance(t["lat"], t["lon"], c["lat"], c["lon"])
+        for code, c in coordinates.items()
+    }
+    max_distance = max(distances.values()) or 1.0
+
+    row = {}
+    for code, c in coordinates.items():
+        if code == target:
+            continue
+        row[code] = {
+            "distance_km": distances[code],
+            "accuracy": (max_distance - distances[code]) / max_distance,
+            "arrow": bearing_arrow(bearing_degrees(c["lat"], c["lon"], t["lat"], t["lon"])),
+        }
+    return row
+
+def rank_facts(target, rankings, n=TOP_SUBSECTORS):
+    """ Rank-based facts from rankings.npz, e.g. { "gross": 2, "top_decile": [...] }. """
+    if rankings is None or target not in rankings.countries:
+        return {}
+    return {
+        "net": rankings.rank(target, "net"),
+        "gross": rankings.rank(target, "gross"),
+        "top_decile": rankings.in_top_fraction(target, 0.1)[:n * 3],
+    }
+
+def build_bundle(day, inputs, salt=DEFAULT_SALT):
+    """ Everything one day of the game needs, in a single dict. """
+    target = select_target(day, candidate_targets(inputs), salt)
+    sectors = inputs["breakdown"][target]
+    coords = inputs["coordinates"][target]
+    subsectors = top_subsectors(sectors)
+
+    return {
+        "date": day.isoformat(),
+        "target": {"code": target, "name": coords["name"], "lat": coords["lat"], "lon": coords["lon"]},
+        "tree": build_tree(target, sectors),
+        "sectors": ranked_sectors(sectors),
+        "top_subsectors": subsectors,
+        "distances": distance_row(target, inputs["coordinates"]),
+        "rankings": rank_facts(target, inputs["rankings"]),
+        "hints": inputs["hints"].get(target, {}),
+        "facts": {name: inputs["facts"][name] for name in subsectors if name in inputs["facts"]},
+    }
+
+def write_bundle(bundle, output_dir=OUTPUT_DIR):
+    path = os.path.join(output_dir, f"{bundle['date']}.json")
+    dump_json(bundle, path, compact=True, float_digits=4, compress=("gzip",))
+    return path
+
+
+# =============================================================================
+# 4. BATCH (parallel across cores)
+# =============================================================================
+
+_worker_inputs = None
+
+def _init_worker(input_files):
+    global _worker_inputs
+    _worker_inputs = load_inputs(**input_files)
+
+def _build_and_write(job):
+    day, salt, output_dir = job
+    return write_bundle(build_bundle(day, _worker_inputs, salt), output_dir)
+
+def precompute(days, input_files=None, salt=DEFAULT_SALT, output_dir=OUTPUT_DIR, workers=None):
+    """
+    Builds and writes one bundle per day. With workers > 1 the days are spread
+    over a process pool; each worker loads the inputs once in its initializer.
+    Returns the written paths in date order.
+    """
+    input_files = input_files or {}
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(day, salt, output_dir) for day in days]
+
+    if workers == 1 or len(jobs) == 1:
+        _init_worker(input_files)
+        return [_build_and_write(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(input_files,)) as pool:
+        return list(pool.map(_build_and_write, jobs, chunksize=8))
+
+def days_of_year(year):
+    day = datetime.date(year, 1, 1)
+    while day.year == year:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute ready-to-serve daily puzzle bundles.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--date", type=datetime.date.fromisoformat,
+                       help="Day to build, YYYY-MM-DD (default: today)")
+    group.add_argument("--year", type=int, help="Build every day of this year")
+    parser.add_argument("--salt", default=DEFAULT_SALT, help="Seed mixed into the daily target selection")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--breakdown", default=BREAKDOWN_FILE)
+    parser.add_argument("--coordinates", default=COORDINATES_FILE)
+    parser.add_argument("--hint-cache", default=HINT_CACHE_FILE)
+    parser.add_argument("--fact-cache", default=FACT_CACHE_FILE)
+    args = parser.parse_args()
+
+    days = list(days_of_year(args.year)) if args.year else [args.date or datetime.date.today()]
+    paths = precompute(
+        days,
+        input_files={
+            "breakdown_file": args.breakdown,
+            "coordinates_file": args.coordinates,
+            "hint_cache_file": args.hint_cache,
+            "fact_cache_file": args.fact_cache,
+        },
+        salt=args.salt,
+        output_dir=args.output_dir,
+        workers=args.workers,
+    )
+    print(f"Wrote {len(paths)} puzzle bundle(s) to '{args.output_dir}'")
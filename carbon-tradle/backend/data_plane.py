@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import json
+import math
+import mmap
+import os
+from array import array
+
+from compact_breakdown import NUM_SUBSECTORS, SUBSECTORS, CompactBreakdown
+from daily_puzzle import BREAKDOWN_FILE, COORDINATES_FILE, load_coordinates
+from lazy import Lazy
+
+# Read-only emissions data shared by every worker of a pre-forking server.
+#
+# build_snapshot() packs the breakdown, net/gross totals and coordinates
+# into one binary file:
+#   - one JSON header line (country order, subsector order, country names),
+#     space-padded so the numbers start on an 8-byte boundary
+#   - a float64 totals table, shape (countries, len(TOTAL_COLUMNS))
+#   - a float64 breakdown table, shape (countries, NUM_SUBSECTORS), in
+#     compact_breakdown.SUBSECTORS order
+#
+# DataPlane.open() memory-maps that file read-only. The numbers never become
+# Python objects, so reading them never writes to (and un-shares) a page;
+# all workers use the same page-cache pages. With a pre-forking server, load
+# it once in the master, e.g. in a gunicorn config with preload_app = True:
+#   def on_starting(server): data_plane.preload()
+# preload() also calls gc.freeze(), so collections in the workers don't
+# touch the master's remaining objects either.
+SNAPSHOT_FILE = "data_plane.bin"
+NET_FILE      = "net_emissions.json"
+GROSS_FILE    = "gross_emissions.json"
+
+TOTAL_COLUMNS = ("net", "gross", "lat", "lon")
+ITEM_SIZE = array("d").itemsize
+
+
+# =============================================================================
+# 1. SNAPSHOT
+# =============================================================================
+
+def build_snapshot(output=SNAPSHOT_FILE, breakdown_file=BREAKDOWN_FILE, net_file=NET_FILE,
+                   gross_file=GROSS_FILE, coordinates_file=COORDINATES_FILE):
+    """ Packs the JSON/CSV inputs into one snapshot file; returns the number of countries. """
+    with open(breakdown_file, "r", encoding="utf-8") as f:
+        breakdown = CompactBreakdown.from_breakdown(json.load(f))
+    with open(net_file, "r", encoding="utf-8") as f:
+        net = json.load(f)
+    with open(gross_file, "r", encoding="utf-8") as f:
+        gross = json.load(f)
+    coordinates = load_coordinates(coordinates_file)
+
+    countries = list(breakdown.countries)
+    totals = array("d")
+    for country in countries:
+        place = coordinates.get(country, {})
+        totals.extend([
+            net.get(country, math.nan),
+            gross.get(country, math.nan),
+            place.get("lat", math.nan),
+            place.get("lon", math.nan),
+        ])
+
+    header = json.dumps({
+        "countries": countries,
+        "subsectors": list(SUBSECTORS),
+        "totals": list(TOTAL_COLUMNS),
+        "names": {country: coordinates[country]["name"] for country in countries if country in coordinates},
+    }).encode("utf-8")
+    padding = -(len(header) + 1) % ITEM_SIZE
+    with open(output, "wb") as f:
+        f.write(header + b" " * padding + b"\n")
+        totals.tofile(f)
+        f.write(breakdown.values_bytes())
+    return len(countries)
+
+
+# =============================================================================
+# 2. SHARED, READ-ONLY ACCESS
+# =============================================================================
+
+class DataPlane:
+    """
+    Memory-mapped snapshot. Usage:
+        plane = DataPlane.open("data_plane.bin")
+        plane.net("USA"), plane.gross("USA"), plane.coordinates("USA")
+        plane.breakdown["USA"]["power"]["electricity-generation"]
+
+    breakdown is a CompactBreakdown whose values are a memoryview over the
+    mapped file instead of an array it owns. Prefer breakdown.value(country,
+    subsector) in request paths: views are cached per worker and so are
+    private memory.
+    """
+    __slots__ = ("countries", "names", "breakdown", "_rows", "_totals", "_mmap")
+
+    def __init__(self, header, buffer, mm=None):
+        if tuple(header["subsectors"]) != SUBSECTORS or tuple(header["totals"]) != TOTAL_COLUMNS:
+            raise ValueError("Snapshot was written with a different taxonomy or layout")
+        self.countries = tuple(header["countries"])
+        self.names = header["names"]
+        self._rows = {country: i * len(TOTAL_COLUMNS) for i, country in enumerate(self.countries)}
+        values = buffer.cast("d")
+        split = len(self.countries) * len(TOTAL_COLUMNS)
+        self._totals = values[:split]
+        self.breakdown = CompactBreakdown(self.countries, values[split:split + len(self.countries) * NUM_SUBSECTORS])
+        self._mmap = mm
+
+    @classmethod
+    def open(cls, filename=SNAPSHOT_FILE):
+        with open(filename, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = mm.find(b"\n") + 1
+        header = json.loads(mm[:start])
+        return cls(header, memoryview(mm)[start:], mm)
+
+    def __contains__(self, country):
+        return country in self._rows
+
+    def _total(self, country, column):
+        value = self._totals[self._rows[country] + column]
+        return None if math.isnan(value) else value
+
+    def net(self, country):
+        return self._total(country, 0)
+
+    def gross(self, country):
+        return self._total(country, 1)
+
+    def coordinates(self, country):
+        """ (lat, lon), or None if coordinates.csv has no position for the country. """
+        lat = self._total(country, 2)
+        return None if lat is None else (lat, self._total(country, 3))
+
+
+def open_data_plane():
+    return DataPlane.open(os.getenv("CARBONLE_DATA_PLANE", SNAPSHOT_FILE))
+
+# Opened on first use, or in the master by preload().
+data_plane = Lazy(open_data_plane, "data_plane")
+
+def preload():
+    """ Call in the master before forking workers. """
+    plane = data_plane.get()
+    gc.freeze()
+    return plane
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped data plane snapshot.")
+    parser.add_argument("--output", default=SNAPSHOT_FILE)
+    parser.add_argument("--breakdown", default=BREAKDOWN_FILE)
+    parser.add_argument("--net", default=NET_FILE)
+    parser.add_argument("--gross", default=GROSS_FILE)
+    parser.add_argument("--coordinates", default=COORDINATES_FILE)
+    args = parser.parse_args()
+
+    count = build_snapshot(args.output, args.breakdown, args.net, args.gross, args.coordinates)
+    print(f"Wrote {count} countries to '{args.output}' ({os.path.getsize(args.output)} bytes)")
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from compact_breakdown import CompactBreakdown
+from daily_puzzle import BREAKDOWN_FILE, COORDINATES_FILE, EARTH_RADIUS_KM, load_coordinates
+from serialization import dump_json
+from taxonomy import NUM_SUBSECTORS
+
+# How hard is each country as a daily target? Every (target, first guess)
+# game is played out by simulated players, and a country is hard when they
+# need many guesses to reach it. Output, for puzzle scheduling:
+#   difficulty.json
+#     {
+#       "params": { "tolerance_km": 1000, "temperature": 0.2, ... },
+#       "countries": {
+#         "USA": {
+#           "expected_guesses": { "intuitive": 2.71, "informed": 2.43 },
+#           "solve_rate":       { "intuitive": 0.97, "informed": 0.99 },   (within MAX_GUESSES)
+#           "score": 2.57,        mean expected guesses over the strategies
+#           "difficulty": 0.41    percentile of score: 0 easiest, 1 hardest
+#         },
+#         ...
+#       },
+#       "by_difficulty": ["...", ...]   easiest first
+#     }
+#
+# The player model:
+#   - Before guessing, the player sees the target's emissions treemap. Their
+#     belief that country c is the target is a softmax (TEMPERATURE) over the
+#     cosine similarity of c's subsector shares to the target's, and the
+#     first guess is drawn from that belief.
+#   - Each wrong guess shows the distance and the 8-way arrow (as in
+#     Home.js). A country stays a candidate while the guess would have shown
+#     the same arrow for it and a distance within TOLERANCE_KM.
+#   - Next guesses come from the remaining candidates:
+#       "intuitive" drawn in proportion to belief (ROUNDS seeded runs,
+#                   averaged), like a player who goes with their gut
+#       "informed"  of the INFORMED_WIDTH most believed, the one whose
+#                   feedback leaves the least expected belief behind
+#
+# All n x n x n feedback consistency is computed up front
+# (consistent[g, t, c]: after guessing g with target t, c is still possible),
+# and every step advances all n x n games of a batch of targets at once.
+# Batches of targets are spread over a process pool.
+DIFFICULTY_OUTPUT = "difficulty.json"
+
+MAX_GUESSES = 6           # Home.js maxGuesses
+TOLERANCE_KM = 1000       # how closely a player compares distances
+TEMPERATURE = 0.2         # lower: the treemap pins the target down more
+INFORMED_WIDTH = 8        # candidates the informed player weighs against each other
+MAX_STEPS = 40            # simulation cap; games not solved by then count as MAX_STEPS
+ROUNDS = 4                # runs of the randomized "intuitive" strategy
+SEED = 0
+TARGETS_PER_BATCH = 16
+
+STRATEGIES = ("intuitive", "informed")
+
+
+# =============================================================================
+# 1. INPUTS
+# =============================================================================
+
+def pairwise_feedback(lat, lon):
+    """
+    (distance_km, arrow) arrays of shape (n, n) for guess g (rows) and
+    target t (columns); the same haversine and 8-way bearing as
+    daily_puzzle.py / distanceUtils.js, vectorized.
+    """
+    lat, lon = np.radians(lat), np.radians(lon)
+    d_lat = lat[None, :] - lat[:, None]
+    d_lon = lon[None, :] - lon[:, None]
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(d_lon / 2) ** 2
+    a = np.minimum(a, 1.0)
+    distance = EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    y = np.sin(d_lon) * np.cos(lat[None, :])
+    x = np.cos(lat[:, None]) * np.sin(lat[None, :]) - np.sin(lat[:, None]) * np.cos(lat[None, :]) * np.cos(d_lon)
+    bearing = (np.degrees(np.arctan2(y, x)) + 360) % 360
+    arrow = (((bearing + 22.5) % 360) // 45).astype(np.int8)
+    return distance, arrow
+
+def treemap_belief(values, temperature=TEMPERATURE):
+    """
+    (n, n) row-stochastic: belief[t, c] = how likely a player who sees t's
+    treemap thinks c is the target. values is (n, NUM_SUBSECTORS); only
+    positive emissions are drawn, as in the treemap.
+    """
+    shares = np.clip(values, 0.0, None)
+    norms = np.linalg.norm(shares, axis=1, keepdims=True)
+    shares = np.divide(shares, norms, out=np.zeros_like(shares), where=norms > 0)
+    logits = (shares @ shares.T) / temperature
+    belief = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return belief / belief.sum(axis=1, keepdims=True)
+
+def consistency(distance, arrow, tolerance_km=TOLERANCE_KM):
+    """
+    (n, n, n) bool: consistent[g, t, c] is True when, after guessing g with
+    target t, country c is still possible. A correct guess leaves only
+    itself; a wrong one rules itself out.
+    """
+    n = len(distance)
+    consistent = (np.abs(distance[:, :, None] - distance[:, None, :]) <= tolerance_km) \
+        & (arrow[:, :, None] == arrow[:, None, :])
+    guesses = np.arange(n)
+    consistent[guesses, :, guesses] = False
+    consistent[guesses, guesses, :] = False
+    consistent[guesses, guesses, guesses] = True
+    return consistent
+
+def load_matrices(breakdown_file=BREAKDOWN_FILE, coordinates_file=COORDINATES_FILE, temperature=TEMPERATURE):
+    """ (countries, distance, arrow, belief) for the countries with both a breakdown and a position. """
+    coordinates = load_coordinates(coordinates_file)
+    with open(breakdown_file, "r", encoding="utf-8") as f:
+        breakdown = CompactBreakdown.from_breakdown(json.load(f))
+    values = np.frombuffer(breakdown.values_bytes(), dtype=np.float64).reshape(-1, NUM_SUBSECTORS)
+    rows = {country: i for i, country in enumerate(breakdown.countries)}
+
+    countries = sorted(set(rows) & set(coordinates))
+    lat = np.array([coordinates[c]["lat"] for c in countries])
+    lon = np.array([coordinates[c]["lon"] for c in countries])
+    distance, arrow = pairwise_feedback(lat, lon)
+    belief = treemap_belief(values[[rows[c] for c in countries]], temperature)
+    return countries, distance, arrow, belief
+
+
+# =============================================================================
+# 2. SIMULATION
+# =============================================================================
+
+def next_guess(strategy, weights, consistent, rng, width=INFORMED_WIDTH):
+    """
+    (games,) next guess per game from the belief still on each candidate,
+    weights (games, n), which is zero for ruled-out countries.
+    """
+    if strategy == "intuitive":
+        # Inverse-CDF sampling, one uniform draw per game; the first entry
+        # past the threshold always has positive weight
+        cumulative = np.cumsum(weights, axis=1)
+        threshold = rng.random(len(weights)) * cumulative[:, -1]
+        return (cumulative <= threshold[:, None]).sum(axis=1)
+
+    width = min(width, weights.shape[1])
+    games = np.arange(len(weights))[:, None]
+    top = np.argpartition(-weights, width - 1, axis=1)[:, :width]
+    w = weights[games, top]
+    order = np.argsort(-w, axis=1, kind="stable")   # most believed first, so ties go to it
+    top, w = np.take_along_axis(top, order, axis=1), np.take_along_axis(w, order, axis=1)
+    w = w / w.sum(axis=1, keepdims=True)
+
+    # remaining[i] = expected belief left after guessing top[i], over targets
+    # and survivors drawn from the same top candidates
+    sub = consistent[top[:, :, None, None], top[:, None, :, None], top[:, None, None, :]]
+    remaining = np.einsum("gijk,gj,gk->gi", sub, w, w)
+    remaining[w == 0] = np.inf
+    return top[np.arange(len(top)), remaining.argmin(axis=1)]
+
+def simulate(targets, strategy, consistent, belief, rng, max_steps=MAX_STEPS):
+    """
+    Plays every (target, first guess) game for the given target indices.
+    Returns guesses needed, shape (len(targets), n); the first guess of
+    game (t, g) is g.
+    """
+    n = belief.shape[0]
+    game_target = np.repeat(targets, n)
+    guess = np.tile(np.arange(n), len(targets))
+    weights = belief[game_target].astype(np.float64)
+    needed = np.full(len(game_target), max_steps)
+    active = np.arange(len(game_target))
+
+    for step in range(1, max_steps + 1):
+        solved = guess == game_target[active]
+        needed[active[solved]] = step
+        keep = ~solved
+        active, guess = active[keep], guess[keep]
+        if not len(active):
+            break
+        weights_active = weights[active] * consistent[guess, game_target[active]]
+        weights[active] = weights_active
+        guess = next_guess(strategy, weights_active, consistent, rng)
+    return needed.reshape(len(targets), n)
+
+
+# =============================================================================
+# 3. SCORES (parallel across cores)
+# =============================================================================
+
+_worker = None
+
+def _init_worker(breakdown_file, coordinates_file, tolerance_km, temperature):
+    global _worker
+    countries, distance, arrow, belief = load_matrices(breakdown_file, coordinates_file, temperature)
+    _worker = {
+        "countries": countries,
+        "belief": belief,
+        "consistent": consistency(distance, arrow, tolerance_km),
+    }
+
+def _score_batch(targets):
+    """
+    { strategy: (expected guesses, solve rate) } for a batch of target
+    indices. The random stream depends only on the batch, so results don't
+    change with the number of workers.
+    """
+    belief, consistent = _worker["belief"], _worker["consistent"]
+    rng = np.random.default_rng([SEED, int(targets[0])])
+    first_guess = belief[targets]   # the first guess is drawn from the treemap belief
+    scores = {}
+    for strategy in STRATEGIES:
+        rounds = ROUNDS if strategy == "intuitive" else 1
+        runs = [simulate(targets, strategy, consistent, belief, rng) for _ in range(rounds)]
+        needed = np.mean(runs, axis=0)
+        solved = np.mean([run <= MAX_GUESSES for run in runs], axis=0)
+        scores[strategy] = ((first_guess * needed).sum(axis=1), (first_guess * solved).sum(axis=1))
+    return targets, scores
+
+def score_countries(breakdown_file=BREAKDOWN_FILE, coordinates_file=COORDINATES_FILE,
+                    tolerance_km=TOLERANCE_KM, temperature=TEMPERATURE, workers=None):
+    """
+    The difficulty.json contents (see the header comment). With workers > 1
+    the target batches are spread over a process pool; each worker builds
+    the matrices once in its initializer.
+    """
+    initargs = (breakdown_file, coordinates_file, tolerance_km, temperature)
+    _init_worker(*initargs)
+    countries = _worker["countries"]
+    batches = np.array_split(np.arange(len(countries)), max(1, -(-len(countries) // TARGETS_PER_BATCH)))
+
+    expected = {strategy: np.zeros(len(countries)) for strategy in STRATEGIES}
+    solve_rate = {strategy: np.zeros(len(countries)) for strategy in STRATEGIES}
+    if workers == 1:
+        results = [_score_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+            results = list(pool.map(_score_batch, batches))
+    for targets, scores in results:
+        for strategy, (guesses, rate) in scores.items():
+            expected[strategy][targets] = guesses
+            solve_rate[strategy][targets] = rate
+
+    score = np.mean([expected[strategy] for strategy in STRATEGIES], axis=0)
+    order = np.argsort(score, kind="stable")
+    percentile = np.empty(len(countries))
+    percentile[order] = np.arange(len(countries)) / max(1, len(countries) - 1)
+
+    return {
+        "params": {
+            "tolerance_km": tolerance_km,
+            "temperature": temperature,
+            "informed_width": INFORMED_WIDTH,
+            "max_guesses": MAX_GUESSES,
+        },
+        "countries": {
+            country: {
+                "expected_guesses": {strategy: round(float(expected[strategy][i]), 3) for strategy in STRATEGIES},
+                "solve_rate": {strategy: round(float(solve_rate[strategy][i]), 4) for strategy in STRATEGIES},
+                "score": round(float(score[i]), 3),
+                "difficulty": round(float(percentile[i]), 4),
+            }
+            for i, country in enumerate(countries)
+        },
+        "by_difficulty": [countries[i] for i in order],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score how hard every country is as a daily target.")
+    parser.add_argument("--breakdown", default=BREAKDOWN_FILE)
+    parser.add_argument("--coordinates", default=COORDINATES_FILE)
+    parser.add_argument("--output", default=DIFFICULTY_OUTPUT)
+    parser.add_argument("--tolerance-km", type=float, default=TOLERANCE_KM,
+                        help="How closely players compare distances (default: %(default)s)")
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE,
+                        help="Softmax temperature of the treemap belief (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = score_countries(args.breakdown, args.coordinates, args.tolerance_km, args.temperature, args.workers)
+    dump_json(result, args.output)
+    ranked = result["by_difficulty"]
+    print(f"Scored {len(ranked)} countries in {time.perf_counter() - start:.2f}s -> '{args.output}'")
+    print(f"  easiest: {', '.join(ranked[:5])}")
+    print(f"  hardest: {', '.join(ranked[-5:])}")
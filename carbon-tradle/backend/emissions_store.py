@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import sqlite3
+
+# Default database file written by `process.py --sqlite`.
+DB_FILE = "emissions.sqlite3"
+
+# simplified_emissions.json rows carry no year; retrievedata.py fetches 2022.
+DEFAULT_YEAR = 2022
+
+SCHEMA = """
+CREATE TABLE emissions (
+    country   TEXT    NOT NULL,
+    sector    TEXT    NOT NULL,
+    subsector TEXT    NOT NULL,
+    year      INTEGER NOT NULL,
+    emissions REAL    NOT NULL
+)
+"""
+
+# Created after the bulk insert, which is much faster than maintaining them row by row.
+INDEXES = [
+    "CREATE INDEX idx_emissions_country ON emissions (country)",
+    "CREATE INDEX idx_emissions_sector_subsector ON emissions (sector, subsector)",
+    "CREATE INDEX idx_emissions_year ON emissions (year)",
+    # (sector, subsector) can't serve a lookup by subsector alone, e.g. "top countries for cement".
+    "CREATE INDEX idx_emissions_subsector ON emissions (subsector)",
+]
+
+
+def build_store(records, db_path=DB_FILE, year=DEFAULT_YEAR):
+    """
+    (Re)creates the SQLite store at db_path from validated records
+    (records.EmissionRecord, a list or a stream), all stored under the given year.
+    All rows go in with one executemany inside a single transaction.
+    Returns the number of rows inserted.
+    """
+    rows = (
+        (country, sector, subsector, year, emissions)
+        for country, sector, subsector, emissions in records
+    )
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # The file is rebuilt from scratch, so durability during the load is not needed.
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS emissions")
+            conn.execute(SCHEMA)
+            row_count = conn.executemany("INSERT INTO emissions VALUES (?, ?, ?, ?, ?)", rows).rowcount
+            for statement in INDEXES:
+                conn.execute(statement)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return row_count
+
+
+class EmissionsStore:
+    """
+    Read-only query API over the SQLite store.
+
+    Usage:
+        store = EmissionsStore("emissions.sqlite3")
+        store.top_countries(subsector="cement", n=5)
+        store.country_breakdown("USA", sector="power")
+
+    Safe to share across Flask threads (each query runs on its own cursor).
+    """
+
+    def __init__(self, db_path=DB_FILE):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _filters(country=None, sector=None, subsector=None, year=None, positive=False):
+        clauses, params = [], []
+        for column, value in (("country", country), ("sector", sector),
+                              ("subsector", subsector), ("year", year)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if positive:
+            clauses.append("emissions > 0")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def top_countries(self, sector=None, subsector=None, n=5, year=None):
+        """
+        Returns the n highest-emitting countries for a sector and/or subsector
+        (or overall if neither is given), as [(country, emissions), ...].
+        """
+        where, params = self._filters(sector=sector, subsector=subsector, year=year)
+        query = (f"SELECT country, SUM(emissions) AS total FROM emissions {where} "
+                 f"GROUP BY country ORDER BY total DESC LIMIT ?")
+        return self.conn.execute(query, params + [n]).fetchall()
+
+    def country_breakdown(self, country, sector=None, year=None):
+        """
+        Returns one country's breakdown in the subsector_breakdown.json shape:
+          { "power": { "electricity-generation": 1234.56, ..., "sectorTotal": 2023.68 }, ... }
+        optionally restricted to a single sector.
+        """
+        where, params = self._filters(country=country, sector=sector, year=year)
+        query = f"SELECT sector, subsector, SUM(emissions) FROM emissions {where} GROUP BY sector, subsector"
+
+        breakdown = {}
+        for sector_name, subsector_name, total in self.conn.execute(query, params):
+            breakdown.setdefault(sector_name, {})[subsector_name] = total
+        for subsectors in breakdown.values():
+            subsectors["sectorTotal"] = sum(subsectors.values())
+        return breakdown
+
+    def net_emissions(self, country, year=None):
+        """ Sum of all emissions for a country (including negative values). """
+        where, params = self._filters(country=country, year=year)
+        row = self.conn.execute(f"SELECT SUM(emissions) FROM emissions {where}", params).fetchone()
+        return row[0] or 0.0
+
+    def gross_emissions(self, country, year=None):
+        """ Sum of positive emissions only for a country. """
+        where, params = self._filters(country=country, year=year, positive=True)
+        row = self.conn.execute(f"SELECT SUM(emissions) FROM emissions {where}", params).fetchone()
+        return row[0] or 0.0
+
+    def countries(self):
+        """ All country codes in the store, sorted. """
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT country FROM emissions ORDER BY country")]
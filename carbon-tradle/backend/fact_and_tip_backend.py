@@ -1,11 +1,44 @@
 from flask import Flask, request, jsonify
-from openai import OpenAI
+import json
 import os
 
+from batch_prompts import FACT_CACHE_FILE
+from lazy import Lazy, warm_up as warm_up_all
+from model_client import client, client_stats
+from prompts import FALLBACK_FACT, FALLBACK_TIP, MODEL, fact_messages, tip_messages
+from resilience import ServiceUnavailable
+from sse import stream_cached, stream_completion, wants_stream
+from tip_cache import TTLCache, canonical_tip_key
+
 app = Flask(__name__)
 
-# Initialize the client with your API key.
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Nothing heavy happens at import: the model client and the caches below are
+# built on first use, or ahead of time by warm_up(), e.g. from a gunicorn hook:
+#   def post_worker_init(worker): fact_and_tip_backend.warm_up()
+
+def load_fact_cache():
+    """ Pre-generated facts (see batch_prompts.py), served while the model is unavailable. """
+    if not os.path.exists(FACT_CACHE_FILE):
+        return {}
+    with open(FACT_CACHE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def build_tip_cache():
+    """
+    Tips keyed on normalized (country, subsector, bucketed emissions).
+    Set TIP_CACHE_DB to a file path to keep tips across restarts and workers.
+    """
+    return TTLCache(
+        maxsize=int(os.getenv('TIP_CACHE_SIZE', '4096')),
+        ttl=float(os.getenv('TIP_CACHE_TTL', str(7 * 24 * 3600))),
+        persistent_path=os.getenv('TIP_CACHE_DB'),
+    )
+
+fact_cache = Lazy(load_fact_cache, "fact_cache")
+tip_cache = Lazy(build_tip_cache, "tip_cache")
+
+def warm_up():
+    return warm_up_all(client, fact_cache, tip_cache)
 
 # Endpoint to get a fun fact about a given sub-sector
 @app.route('/get_fun_fact', methods=['POST'])
@@ -16,18 +49,30 @@ def get_fun_fact():
     if not subsector:
         return jsonify({'error': "Parameter 'subsector' is required."}), 400
 
-    messages = [
-        {"role": "developer", "content": "You are a knowledgeable environmental educator."},
-        {"role": "user", "content": f"Share a fun fact about the '{subsector}' sub-sector, particularly in the context of carbon emissions or environmental impact."}
-    ]
+    messages = fact_messages(subsector)
+    stream = wants_stream(request, data)
 
     try:
-        completion = client.chat.completions.create(
-            model="o3-mini",  
+        if stream:
+            return stream_completion(
+                client.get().chat.completions.create(model=MODEL, messages=messages, stream=True),
+                'fun_fact',
+            )
+
+        completion = client.get().chat.completions.create(
+            model=MODEL,
             messages=messages,
         )
         fun_fact = completion.choices[0].message.content
         return jsonify({'fun_fact': fun_fact})
+    except ServiceUnavailable as e:
+        cached_fact = fact_cache.get().get(subsector)
+        if cached_fact:
+            payload = {'fun_fact': cached_fact, 'cached': True}
+            return stream_cached(payload) if stream else jsonify(payload)
+        payload = {'fun_fact': FALLBACK_FACT, 'fallback': True, 'error': str(e)}
+        headers = {'Retry-After': str(e.retry_after)}
+        return (stream_cached(payload) if stream else jsonify(payload)), 503, headers
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -42,25 +87,55 @@ def get_emission_tip():
     if not country or not subsector or not emissions_info:
         return jsonify({'error': "Parameters 'country', 'subsector', and 'emissions_info' are required."}), 400
 
-    messages = [
-        {"role": "developer", "content": "You are an expert in environmental policy and sustainability. Your goal is to provide actionable advice."},
-        {"role": "user", "content": (
-            f"Country: {country}\n"
-            f"Sub-sector: {subsector}\n"
-            f"Emissions Data: {emissions_info}\n\n"
-            "Based on this information, provide a relevant and very short practical tip to a regular person that they can do in their daily life to help reduce waste, emissions, and greenhouse gases."
-        )}
-    ]
+    stream = wants_stream(request, data)
+    cache_key = canonical_tip_key(country, subsector, emissions_info)
+    cached_tip = tip_cache.get().get(cache_key)
+    if cached_tip is not None:
+        # Cached tips go out in one burst when streaming
+        return stream_cached({'tip': cached_tip}) if stream else jsonify({'tip': cached_tip})
+
+    messages = tip_messages(country, subsector, emissions_info)
 
     try:
-        completion = client.chat.completions.create(
-            model="o3-mini", 
+        if stream:
+            # The tip is cached once the model has finished streaming it
+            return stream_completion(
+                client.get().chat.completions.create(model=MODEL, messages=messages, stream=True),
+                'tip',
+                on_complete=lambda tip: tip_cache.get().set(cache_key, tip),
+            )
+
+        completion = client.get().chat.completions.create(
+            model=MODEL,
             messages=messages,
         )
         tip = completion.choices[0].message.content
+        tip_cache.get().set(cache_key, tip)
         return jsonify({'tip': tip})
+    except ServiceUnavailable as e:
+        payload = {'tip': FALLBACK_TIP, 'fallback': True, 'error': str(e)}
+        headers = {'Retry-After': str(e.retry_after)}
+        return (stream_cached(payload) if stream else jsonify(payload)), 503, headers
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Endpoint exposing tip cache size and hit ratio for monitoring
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'tip_cache': tip_cache.get().stats()})
+
+# Breaker state and queue depth of the model client, for monitoring
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({'model_client': client_stats(), 'tip_cache': tip_cache.get().stats()})
+
+# 200 once the model client and caches are built, 503 before (or if one failed)
+@app.route('/ready', methods=['GET'])
+def ready():
+    components = [client, fact_cache, tip_cache]
+    is_ready = all(component.ready for component in components)
+    body = {'ready': is_ready, **{component.name: component.status() for component in components}}
+    return jsonify(body), 200 if is_ready else 503
+
 if __name__ == '__main__':
     app.run(debug=True)
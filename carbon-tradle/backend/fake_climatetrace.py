@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# A local stand-in for https://api.climatetrace.org/v6/assets/emissions,
+# serving records rebuilt from simplified_emissions.json. It can inject
+# latency, rate limiting and failures so the fetch scheduler in
+# retrievedata.py can be exercised without the real API:
+#
+#   python fake_climatetrace.py --port 8765 --latency 0.2 --rate-limit 0.1 --bad-countries PRK
+#   CLIMATETRACE_BASE_URL=http://127.0.0.1:8765/v6/assets/emissions python retrievedata.py
+INPUT_FILE = "simplified_emissions.json"
+EMISSIONS_PATH = "/v6/assets/emissions"
+
+
+def load_raw_records(filename):
+    """
+    Rebuilds API-shaped records from simplified records:
+      { "USA": [ { "Sector": <subsector>, "Emissions": <float>, "Country": "USA", ... }, ... ] }
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        simplified = json.load(f)
+
+    by_country = defaultdict(list)
+    for record in simplified:
+        by_country[record["country"]].append({
+            "AssetCount": 0,
+            "Emissions": record["emissions"],
+            "Year": None,
+            "Month": None,
+            "Gas": "co2e_100yr",
+            "Country": record["country"],
+            "Sector": record["subsector"],
+        })
+    return dict(by_country)
+
+
+class FakeClimateTrace:
+    """
+    Behaviour knobs for the fake server:
+      latency          seconds added to every request
+      latency_per_country  extra seconds per requested country
+      rate_limit       probability of answering 429 with Retry-After
+      error_rate       probability of a random 500
+      bad_countries    countries that make any request containing them fail with 500
+    Every request is appended to self.log as (countries, status) for inspection.
+    """
+
+    def __init__(self, records, latency=0.0, latency_per_country=0.0, rate_limit=0.0,
+                 error_rate=0.0, bad_countries=(), retry_after=1, seed=0):
+        self.records = records
+        self.latency = latency
+        self.latency_per_country = latency_per_country
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.bad_countries = set(bad_countries)
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.log = []
+
+    def respond(self, query):
+        """ Returns (status, headers, body dict/str) for a parsed query string. """
+        countries = [c for c in query.get("countries", [""])[0].split(",") if c]
+        with self.lock:
+            roll = self.random.random()
+        time.sleep(self.latency + self.latency_per_country * len(countries))
+
+        if roll < self.rate_limit:
+            status, headers, body = 429, {"Retry-After": str(self.retry_after)}, "rate limited"
+        elif roll < self.rate_limit + self.error_rate:
+            status, headers, body = 500, {}, "injected error"
+        elif self.bad_countries.intersection(countries):
+            status, headers, body = 500, {}, f"bad country in {sorted(self.bad_countries.intersection(countries))}"
+        else:
+            wanted = countries or sorted(self.records)
+            status, headers, body = 200, {}, {c: self.records[c] for c in wanted if c in self.records}
+
+        with self.lock:
+            self.log.append((countries, status))
+        return status, headers, body
+
+    def make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != EMISSIONS_PATH:
+                    status, headers, body = 404, {}, "not found"
+                else:
+                    status, headers, body = fake.respond(parse_qs(url.query))
+
+                payload = json.dumps(body).encode("utf-8") if isinstance(body, dict) else body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json" if isinstance(body, dict) else "text/plain")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=0):
+        """ Starts the server on a background thread; returns (server, base_url). """
+        server = ThreadingHTTPServer((host, port), self.make_handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://{host}:{server.server_port}{EMISSIONS_PATH}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake ClimateTRACE emissions API locally.")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-per-country", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--bad-countries", default="", help="Comma-separated ISO3 codes that always fail")
+    args = parser.parse_args()
+
+    fake = FakeClimateTrace(
+        load_raw_records(args.input),
+        latency=args.latency,
+        latency_per_country=args.latency_per_country,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        bad_countries=[c for c in args.bad_countries.split(",") if c],
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), fake.make_handler())
+    print(f"Fake ClimateTRACE API on http://127.0.0.1:{args.port}{EMISSIONS_PATH}")
+    server.serve_forever()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+# A deterministic stand-in for openai.OpenAI() with the single method the
+# backends use, client.chat.completions.create(model=..., messages=...).
+#
+# Batched requests (a user message holding a JSON array of {"id": ...} items,
+# see batch_prompts.py) are answered with a JSON array of
+# {"id": ..., "text": "stub answer for <id>"}. Any other request is answered
+# with "stub answer: <last user message>". Pass respond=<fn(messages) -> str>
+# to script other answers, and latency / error_rate to exercise timeouts,
+# retries and circuit breaking. With stream=True the answer comes back as an
+# iterator of chunks (chunk.choices[0].delta.content), one word at a time.
+
+
+def _message(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _stream(content):
+    for word in re.findall(r"\s*\S+", content):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+
+def default_respond(messages):
+    prompt = messages[-1]["content"]
+    start = prompt.find("[")
+    if start != -1:
+        try:
+            items = json.loads(prompt[start:prompt.rindex("]") + 1])
+        except ValueError:
+            items = None
+        if isinstance(items, list) and all(isinstance(item, dict) and "id" in item for item in items):
+            return json.dumps([{"id": item["id"], "text": f"stub answer for {item['id']}"} for item in items])
+    return f"stub answer: {prompt}"
+
+
+class FakeCompletions:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model=None, messages=None, **kwargs):
+        return self._client._create(model, messages, **kwargs)
+
+
+class FakeOpenAI:
+    """
+    Usage:
+        client = FakeOpenAI(latency=0.5, error_rate=0.2, seed=1)
+        client.chat.completions.create(model="o3-mini", messages=[...])
+
+    errors=[...] scripts outcomes per call instead of error_rate: each entry
+    is None (succeed) or an exception instance to raise; once exhausted,
+    calls succeed. Every call is recorded in self.calls.
+    """
+
+    def __init__(self, respond=default_respond, latency=0.0, error_rate=0.0, errors=None, seed=0):
+        self.respond = respond
+        self.latency = latency
+        self.error_rate = error_rate
+        self.errors = list(errors or [])
+        self.random = random.Random(seed)
+        self.calls = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=FakeCompletions(self))
+
+    def _create(self, model, messages, **kwargs):
+        with self._lock:
+            self.calls.append({"model": model, "messages": messages, **kwargs})
+            scripted = self.errors.pop(0) if self.errors else None
+            roll = self.random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        if scripted is not None:
+            raise scripted
+        if roll < self.error_rate:
+            raise RuntimeError("injected model error")
+        content = self.respond(messages)
+        if kwargs.get("stream"):
+            return _stream(content)
+        return _message(content)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+import json
+from array import array
+
+import numpy as np
+
+from records import BASIS_GAS, EmissionRecord, validate_record
+from taxonomy import NUM_SUBSECTORS, SECTOR_OF_SUBSECTOR, SECTORS, SUBSECTOR_INDEX, SUBSECTORS
+
+# Global warming potentials used to convert single gases to CO2e:
+#   {
+#     "source": "IPCC AR6 WG1 ...",
+#     "basis": "co2e_100yr",
+#     "factors": { "co2e_100yr": 1.0, "co2": 1.0, "ch4": 27.9, "n2o": 273.0 }
+#   }
+# factors[gas] is tonnes of basis CO2e per tonne of gas. Gases missing from
+# the table (e.g. "co2e_20yr", a different metric) still get per-gas outputs
+# but never enter the CO2e totals.
+GWP_FILE = "gwp.json"
+
+# Outputs written by `process.py --multi-gas`
+GAS_OUTPUT      = "gas_emissions.json"   # per-gas totals by country, native and CO2e
+GAS_CUBE_OUTPUT = "gas_emissions.npz"    # the whole gas x country x subsector cube
+
+# Rejection reasons on top of records.validate_record's
+REJECT_MISSING_GAS = "missing-gas"   # "gas" present but null/empty
+
+
+def load_gwp(filename=GWP_FILE):
+    """ Returns (basis gas, { gas: factor }) from a GWP table file. """
+    with open(filename, "r", encoding="utf-8") as f:
+        table = json.load(f)
+    factors = {gas: float(factor) for gas, factor in table["factors"].items()}
+    basis = table.get("basis", BASIS_GAS)
+    if factors.get(basis) != 1.0:
+        raise ValueError(f"'{filename}': the basis gas '{basis}' must have a factor of 1.0")
+    return basis, factors
+
+
+class GasCube:
+    """
+    Dense float64 array of shape (len(gases), len(countries), NUM_SUBSECTORS):
+      values[g, c, s]  = tonnes of gases[g] emitted by countries[c] in SUBSECTORS[s]
+      present[g, c, s] = whether any row reported that cell
+
+    Rows for different gases describe the same emissions, so they are never
+    summed as they come in. co2e() converts every gas with one vectorized
+    multiply by the GWP factors, and picks per cell: the reported basis
+    (co2e_100yr) value where ClimateTRACE gave one, otherwise the sum of the
+    converted single gases. Fetching co2e_100yr together with co2, ch4 and
+    n2o therefore counts each cell once.
+    """
+
+    def __init__(self, gases, countries, values, present, num_rows=None):
+        self.gases = list(gases)
+        self.countries = list(countries)
+        self.values = values
+        self.present = present
+        self.num_rows = num_rows   # accepted rows, when built by from_rows
+
+    # -------------------------------------------------------------------------
+    # Building
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_rows(cls, rows, rejected, default_gas=BASIS_GAS):
+        """
+        Builds the cube from simplified records in one pass (rows may be a
+        stream), validating each row once. Rows without a "gas" key count as
+        default_gas, so single-gas files work unchanged. Rejections are
+        counted into rejected (a Counter).
+        """
+        gas_index, country_index = {}, {}
+        gas_col, country_col, subsector_col = array("i"), array("i"), array("i")
+        emissions_col = array("d")
+
+        for row in rows:
+            gas = row.get("gas", default_gas) if isinstance(row, dict) else default_gas
+            if not gas or not isinstance(gas, str):
+                rejected[REJECT_MISSING_GAS] += 1
+                continue
+            record, problem = validate_record(row, gas=gas)
+            if problem:
+                rejected[problem] += 1
+                continue
+            gas_col.append(gas_index.setdefault(gas, len(gas_index)))
+            country_col.append(country_index.setdefault(record.country, len(country_index)))
+            subsector_col.append(SUBSECTOR_INDEX[record.subsector])
+            emissions_col.append(record.emissions)
+
+        shape = (len(gas_index), len(country_index), NUM_SUBSECTORS)
+        values = np.zeros(shape)
+        present = np.zeros(shape, dtype=bool)
+        if emissions_col:
+            cells = (
+                np.frombuffer(gas_col, dtype=np.int32),
+                np.frombuffer(country_col, dtype=np.int32),
+                np.frombuffer(subsector_col, dtype=np.int32),
+            )
+            np.add.at(values, cells, np.frombuffer(emissions_col, dtype=np.float64))
+            present[cells] = True
+        return cls(gas_index, country_index, values, present, len(emissions_col))
+
+    # -------------------------------------------------------------------------
+    # GWP conversion
+    # -------------------------------------------------------------------------
+
+    def factors(self, gwp):
+        """ (gases,) GWP factor per gas axis entry; NaN for gases missing from gwp. """
+        return np.array([gwp.get(gas, np.nan) for gas in self.gases])
+
+    def to_co2e(self, gwp):
+        """ (gases, countries, subsectors): every cell times its gas's factor (NaN if not convertible). """
+        return self.values * self.factors(gwp)[:, None, None]
+
+    def co2e(self, gwp, basis=BASIS_GAS):
+        """
+        Returns (co2e, covered), both (countries, subsectors):
+          co2e[c, s]    = reported basis value, else the sum of converted
+                          single gases
+          covered[c, s] = whether any basis or convertible row fed the cell
+        """
+        factors = self.factors(gwp)
+        convertible = np.isfinite(factors)
+        if basis in self.gases:
+            convertible[self.gases.index(basis)] = False
+            reported = self.present[self.gases.index(basis)]
+            reported_values = self.values[self.gases.index(basis)]
+        else:
+            reported = np.zeros(self.values.shape[1:], dtype=bool)
+            reported_values = np.zeros(self.values.shape[1:])
+
+        converted = np.tensordot(np.where(convertible, factors, 0.0), self.values, axes=1)
+        co2e = np.where(reported, reported_values, converted)
+        covered = reported | self.present[convertible].any(axis=0)
+        return co2e, covered
+
+    def co2e_records(self, gwp, basis=BASIS_GAS):
+        """
+        The co2e() cells as EmissionRecords (country order of first
+        appearance, then SUBSECTORS order), ready for process.py's
+        aggregators, the rankings and the SQLite store.
+        """
+        co2e, covered = self.co2e(gwp, basis)
+        return [
+            EmissionRecord(self.countries[c], SECTORS[SECTOR_OF_SUBSECTOR[s]], SUBSECTORS[s], float(co2e[c, s]))
+            for c, s in zip(*np.nonzero(covered))
+        ]
+
+    # -------------------------------------------------------------------------
+    # Outputs
+    # -------------------------------------------------------------------------
+
+    def summary(self, gwp, basis=BASIS_GAS):
+        """
+        Per-gas country totals for gas_emissions.json:
+          {
+            "basis": "co2e_100yr",
+            "gases": {
+              "ch4": {
+                "gwp": 27.9,                      (null if not convertible)
+                "net": { "USA": 2.6e7, ... },     (tonnes of ch4)
+                "net_co2e": { "USA": 7.3e8, ... } (absent if not convertible)
+              },
+              ...
+            }
+          }
+        """
+        totals = self.values.sum(axis=2)
+        co2e_totals = self.to_co2e(gwp).sum(axis=2)
+        covered = self.present.any(axis=2)
+        gases = {}
+        for g, gas in enumerate(self.gases):
+            countries = [(c, country) for c, country in enumerate(self.countries) if covered[g, c]]
+            entry = {
+                "gwp": gwp.get(gas),
+                "net": {country: float(totals[g, c]) for c, country in countries},
+            }
+            if gas in gwp:
+                entry["net_co2e"] = {country: float(co2e_totals[g, c]) for c, country in countries}
+            gases[gas] = entry
+        return {"basis": basis, "gases": gases}
+
+    def save(self, filename=GAS_CUBE_OUTPUT):
+        np.savez_compressed(
+            filename,
+            values=self.values,
+            present=self.present,
+            gases=np.array(self.gases),
+            countries=np.array(self.countries),
+            subsectors=np.array(SUBSECTORS),
+        )
+
+    @classmethod
+    def load(cls, filename=GAS_CUBE_OUTPUT):
+        with np.load(filename) as data:
+            if tuple(data["subsectors"]) != SUBSECTORS:
+                raise ValueError(f"'{filename}' was written with a different subsector taxonomy")
+            return cls(data["gases"].tolist(), data["countries"].tolist(), data["values"], data["present"])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import json
+
+# Group definitions (world, continents, income groups):
+# {
+#   "source": { ... },
+#   "groups": {
+#     "WORLD":  { "name": "World",  "kind": "world",     "members": "*" },
+#     "AFRICA": { "name": "Africa", "kind": "continent", "members": ["AGO", "BDI", ...] },
+#     ...
+#   }
+# }
+# "members": "*" means every country in the data.
+GROUPS_FILE = "groups.json"
+
+# Group outputs written by process.py, keyed by group code, same shapes as
+# net_emissions.json / gross_emissions.json / subsector_breakdown.json.
+GROUP_NET_OUTPUT       = "group_net_emissions.json"
+GROUP_GROSS_OUTPUT     = "group_gross_emissions.json"
+GROUP_BREAKDOWN_OUTPUT = "group_subsector_breakdown.json"
+
+ALL_MEMBERS = "*"
+
+
+def load_groups(filename=GROUPS_FILE):
+    """ Returns { group code: { "name", "kind", "members" } } from a mapping file. """
+    with open(filename, "r", encoding="utf-8") as f:
+        groups = json.load(f)["groups"]
+    for code, group in groups.items():
+        members = group.get("members")
+        if members != ALL_MEMBERS and not isinstance(members, list):
+            raise ValueError(f"Group '{code}' needs a list of members or \"{ALL_MEMBERS}\"")
+    return groups
+
+
+class GroupIndex(dict):
+    """
+    country -> tuple of group codes it rolls up into, e.g.
+      index["DEU"] -> ("WORLD", "EUROPE", "HIGH_INCOME")
+
+    Entries are filled on first lookup, so countries that only appear in
+    the data still land in "*" groups. Aggregators look each record's
+    country up once and add its emissions to every listed group.
+    """
+
+    def __init__(self, groups):
+        super().__init__()
+        self.groups = groups
+        self._wildcard = tuple(code for code, g in groups.items() if g["members"] == ALL_MEMBERS)
+        self._explicit = {}
+        for code, group in groups.items():
+            if group["members"] != ALL_MEMBERS:
+                for country in group["members"]:
+                    self._explicit.setdefault(country, []).append(code)
+
+    def __missing__(self, country):
+        codes = self[country] = self._wildcard + tuple(self._explicit.get(country, ()))
+        return codes
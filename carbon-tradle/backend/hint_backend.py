@@ -1,19 +1,34 @@
 from flask import Flask, request, jsonify
-from openai import OpenAI
+import json
 import os
 
+from batch_prompts import HINT_CACHE_FILE
+from country_index import MAX_SUGGESTIONS, CountryIndex
+from lazy import Lazy, warm_up as warm_up_all
+from model_client import client, client_stats
+from prompts import FALLBACK_HINT, MODEL, hint_messages
+from resilience import ServiceUnavailable
+from sse import stream_cached, stream_completion, wants_stream
+
 app = Flask(__name__)
 
-# Initialize the client with your API key
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Nothing heavy happens at import: the model client, the country index and the
+# hint cache are built on first use, or ahead of time by warm_up(), e.g. from
+# a gunicorn hook:
+#   def post_worker_init(worker): hint_backend.warm_up()
+
+def load_hint_cache():
+    """ Pre-generated hints (see batch_prompts.py): { target ISO3: { guess ISO3: hint } }. """
+    if not os.path.exists(HINT_CACHE_FILE):
+        return {}
+    with open(HINT_CACHE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+country_index = Lazy(CountryIndex.build, "country_index")
+hint_cache = Lazy(load_hint_cache, "hint_cache")
 
-# Define your system prompt (developer message in this new interface)
-SYSTEM_PROMPT = """
-You are a helpful hint generator for a geography-based game focused on greenhouse gas emissions.
-When a user makes a guess for a country, provide a concise hint related to greenhouse gas emissions that helps them get closer to the actual target country without revealing the answer directly.
-Focus on aspects like emissions sources, comparisons to the guessed country, or climate-related policies of the target country.
-Avoid giving away the answer directly. Keep hints brief and helpful. Do not ever give the actual country name in the hint.
-"""
+def warm_up():
+    return warm_up_all(client, country_index, hint_cache)
 
 @app.route('/get_hint', methods=['POST'])
 def get_hint():
@@ -24,24 +39,73 @@ def get_hint():
     if not guess or not country:
         return jsonify({"error": "Both 'guess' and 'country' are required."}), 400
 
+    # "usa", "United States of America" and "Untied States" all become USA, so
+    # the cache lookup and the prompt see one spelling per country
+    guess_code = country_index.get().resolve(guess)
+    country_code = country_index.get().resolve(country)
+    stream = wants_stream(request, data)
+    cached_hint = hint_cache.get().get(country_code, {}).get(guess_code)
+    if cached_hint:
+        payload = {"suggestion": cached_hint, "cached": True}
+        return stream_cached(payload) if stream else jsonify(payload)
+
     # Prepare messages using the new roles (using "developer" for system instructions)
-    messages = [
-        {"role": "developer", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": f"My guess is '{guess}' and the correct country is '{country}'. Can you provide a hint to help me get closer to the correct answer?"}
-    ]
+    messages = hint_messages(
+        country_index.get().names[guess_code] if guess_code else guess,
+        country_index.get().names[country_code] if country_code else country,
+    )
 
     try:
+        if stream:
+            # Forward tokens as server-sent events (see sse.py)
+            return stream_completion(
+                client.get().chat.completions.create(model=MODEL, messages=messages, stream=True),
+                "suggestion",
+            )
+
         # Create a completion using the new client interface.
-        completion = client.chat.completions.create(
-            model="o3-mini",  # Change to your desired model if needed.
+        completion = client.get().chat.completions.create(
+            model=MODEL,
             messages=messages,
         )
 
         # Access the content attribute directly
         suggestion = completion.choices[0].message.content
         return jsonify({"suggestion": suggestion})
+    except ServiceUnavailable as e:
+        payload = {"suggestion": FALLBACK_HINT, "fallback": True, "error": str(e)}
+        headers = {"Retry-After": str(e.retry_after)}
+        return (stream_cached(payload) if stream else jsonify(payload)), 503, headers
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Autocomplete for the guess box: /countries/suggest?q=unit&limit=5
+#   { "query": "unit", "fuzzy": false,
+#     "suggestions": [{ "code": "USA", "name": "United States" }, ...] }
+# fuzzy is true when nothing starts with q and the matches allow typos.
+@app.route('/countries/suggest', methods=['GET'])
+def suggest_countries():
+    query = request.args.get('q', '')
+    try:
+        limit = int(request.args.get('limit', MAX_SUGGESTIONS))
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer."}), 400
+
+    suggestions, fuzzy = country_index.get().suggest(query, limit)
+    return jsonify({"query": query, "fuzzy": fuzzy, "suggestions": suggestions})
+
+# Breaker state and queue depth of the model client, for monitoring
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({"model_client": client_stats()})
+
+# 200 once the model client, country index and hint cache are built, 503 before (or if one failed)
+@app.route('/ready', methods=['GET'])
+def ready():
+    components = [client, country_index, hint_cache]
+    is_ready = all(component.ready for component in components)
+    body = {"ready": is_ready, **{component.name: component.status() for component in components}}
+    return jsonify(body), 200 if is_ready else 503
+
 if __name__ == '__main__':
     app.run(debug=True)
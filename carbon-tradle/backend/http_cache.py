@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Default location of the on-disk cache, relative to where the script runs.
+DEFAULT_CACHE_DIR = ".http_cache"
+
+# Set CARBONLE_HTTP_OFFLINE=1 to replay cached responses without any network access.
+OFFLINE_ENV = "CARBONLE_HTTP_OFFLINE"
+
+# Query params whose value is a comma-separated list; their order doesn't
+# change the response, so it is normalized out of the cache key.
+LIST_PARAMS = ("countries", "sectors", "subsectors", "years")
+
+
+def offline_requested(flag=False):
+    """ True if offline replay was asked for by argument or CARBONLE_HTTP_OFFLINE. """
+    if flag:
+        return True
+    return os.getenv(OFFLINE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def cache_key(url, params=None):
+    """
+    Stable key for a GET request: sha256 of the URL plus its sorted query
+    params, with list-valued params (countries, sectors, ...) sorted too.
+    Headers (including Authorization) are deliberately not part of the key.
+    """
+    normalized = []
+    for name, value in sorted((params or {}).items()):
+        if value is None:
+            continue
+        value = str(value)
+        if name in LIST_PARAMS:
+            value = ",".join(sorted(value.split(",")))
+        normalized.append([name, value])
+    blob = json.dumps([url, normalized], separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class CachedSession:
+    """
+    Drop-in replacement for requests.get() backed by a persistent cache.
+
+    Each cached 200 response is stored as two files under cache_dir:
+      <key>.json     metadata (url, params, ETag, Last-Modified, headers, stored_at)
+      <key>.body.gz  gzip-compressed response body
+
+    On a repeat request the stored ETag / Last-Modified are sent as
+    If-None-Match / If-Modified-Since; a 304 answer is served from disk, so a
+    re-run only costs revalidation round-trips. In offline mode the network is
+    never touched: hits are replayed as-is and misses come back as a 504
+    response (the HTTP "only-if-cached" convention). With max_age (seconds),
+    entries younger than that are served without even revalidating.
+
+    Returned objects are ordinary requests.Response instances with an extra
+    from_cache attribute.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, offline=False, max_age=None, session=None, timeout=60):
+        self.cache_dir = cache_dir
+        self.offline = offline_requested(offline)
+        self.max_age = max_age
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "offline_misses": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+    # storage
+    # -------------------------------------------------------------------------
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".body.gz"
+
+    def _load(self, key):
+        meta_path, body_path = self._paths(key)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None, None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with gzip.open(body_path, "rb") as f:
+            body = f.read()
+        return meta, body
+
+    def _store(self, key, url, params, response):
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": url,
+            "params": params or {},
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "headers": {
+                name: value for name, value in response.headers.items()
+                if name.lower() in ("content-type", "etag", "last-modified")
+            },
+            "stored_at": time.time(),
+        }
+        # Write the body first so a crash never leaves metadata without a body.
+        with gzip.open(body_path + ".tmp", "wb") as f:
+            f.write(response.content)
+        os.replace(body_path + ".tmp", body_path)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _touch(self, key, meta):
+        meta_path, _ = self._paths(key)
+        meta["stored_at"] = time.time()
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @staticmethod
+    def _replay(url, meta, body, status_code=200, reason="OK"):
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = reason
+        response.url = url
+        response._content = body
+        response.headers = CaseInsensitiveDict(meta.get("headers", {}) if meta else {})
+        response.encoding = "utf-8"
+        response.from_cache = True
+        return response
+
+    # -------------------------------------------------------------------------
+    # public API
+    # -------------------------------------------------------------------------
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        key = cache_key(url, params)
+        meta, body = self._load(key)
+
+        if self.offline:
+            if meta is not None:
+                self.stats["hits"] += 1
+                return self._replay(url, meta, body)
+            self.stats["offline_misses"] += 1
+            logging.warning("Offline cache miss for %s %s", url, params)
+            return self._replay(url, None, b"", status_code=504, reason="Not cached (offline mode)")
+
+        if meta is not None and self.max_age is not None:
+            if time.time() - meta.get("stored_at", 0) < self.max_age:
+                self.stats["hits"] += 1
+                return self._replay(url, meta, body)
+
+        request_headers = dict(headers or {})
+        if meta is not None:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.get(url, params=params, headers=request_headers, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            self.stats["revalidated"] += 1
+            self._touch(key, meta)
+            return self._replay(url, meta, body)
+
+        self.stats["misses"] += 1
+        response.from_cache = False
+        if response.status_code == 200:
+            self._store(key, url, params, response)
+        return response
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import json
+import re
+
+# Incremental reader for files holding one top-level JSON array, such as
+# simplified_emissions.json:
+#   [
+#     { "sector": "power", "subsector": "electricity-generation", "emissions": 1234.56, "country": "USA" },
+#     ...
+#   ]
+# Items are decoded one at a time from a buffered window of the file, so
+# memory stays proportional to CHUNK_SIZE plus the largest single item, not
+# to the file size.
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+_ITEM_END = _WHITESPACE + ",]"
+_SKIP_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """
+    Yields the items of the JSON array in text file f, in order.
+    Raises ValueError on malformed input, like json.load would.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    pos = 0
+    eof = not buf
+
+    def skip_whitespace():
+        nonlocal buf, pos, eof
+        while True:
+            pos = _SKIP_WHITESPACE.match(buf, pos).end()
+            if pos < len(buf) or eof:
+                return
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+
+    skip_whitespace()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+
+    expect_item = True
+    first = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buf):
+            raise ValueError("Unterminated JSON array")
+        char = buf[pos]
+        if char == "]" and (first or not expect_item):
+            return
+        if not expect_item:
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            pos += 1
+            expect_item = True
+            continue
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                item, end = None, None
+            # A number cut by the window edge ("2" of "2.5e10") still decodes,
+            # so an item only counts once the character after it can end an
+            # array item (or the file ended).
+            if end is not None and (eof or (end < len(buf) and buf[end] in _ITEM_END)):
+                break
+            if eof:
+                raise ValueError(f"Truncated or malformed JSON array item near: {buf[pos:pos + 80]!r}")
+            more = f.read(chunk_size)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+
+        yield item
+        pos = end
+        first = False
+        expect_item = False
+        # Drop consumed text so the window doesn't grow with the file.
+        if pos > chunk_size:
+            buf, pos = buf[pos:], 0
+
+
+def iter_json_array_file(filename, chunk_size=CHUNK_SIZE):
+    """ iter_json_array over a file path, closing the file when exhausted. """
+    with open(filename, "r", encoding="utf-8") as f:
+        yield from iter_json_array(f, chunk_size)
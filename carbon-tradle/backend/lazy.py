@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+_UNSET = object()
+
+
+class Lazy:
+    """
+    A value that is built on first use, exactly once, even when several
+    request threads ask for it at the same time. Used by the Flask backends
+    so workers import fast and only pay for the model client / caches when
+    the first request (or an explicit warm-up) needs them.
+
+    Usage:
+        client = Lazy(build_client, "model_client")
+        client.get().chat.completions.create(...)
+
+    A factory that raises is not cached; the next get() tries again.
+    status() reports readiness for the /ready endpoints.
+    """
+
+    def __init__(self, factory, name=None):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "value")
+        self._value = _UNSET
+        self._lock = threading.Lock()
+        self.seconds = None
+        self.error = None
+
+    def get(self):
+        value = self._value
+        if value is not _UNSET:
+            return value
+        with self._lock:
+            if self._value is _UNSET:
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                self.seconds = time.perf_counter() - start
+                self.error = None
+        return self._value
+
+    @property
+    def ready(self):
+        return self._value is not _UNSET
+
+    def status(self):
+        return {"ready": self.ready, "init_seconds": self.seconds, "error": self.error}
+
+
+def warm_up(*lazies):
+    """
+    Builds every Lazy now, e.g. from a gunicorn post_worker_init hook, and
+    returns { name: status }. Failures are recorded, not raised, so one
+    broken component doesn't stop the others from warming.
+    """
+    for lazy in lazies:
+        try:
+            lazy.get()
+        except Exception:
+            pass
+    return {lazy.name: lazy.status() for lazy in lazies}
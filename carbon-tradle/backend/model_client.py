@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import os
+
+from lazy import Lazy
+from resilience import CircuitBreaker, ResilientClient
+
+
+def build_client():
+    """
+    The model client shared by hint_backend.py and fact_and_tip_backend.py,
+    wrapped with a per-call deadline, a bounded queue and a circuit breaker.
+    All limits can be tuned through the environment.
+    """
+    # Imported here: the SDK is by far the slowest import of a worker.
+    from openai import OpenAI
+    return ResilientClient(
+        OpenAI(api_key=os.getenv('OPENAI_API_KEY')),
+        deadline=float(os.getenv('MODEL_DEADLINE', '20')),
+        max_concurrent=int(os.getenv('MODEL_MAX_CONCURRENT', '8')),
+        max_queue=int(os.getenv('MODEL_MAX_QUEUE', '32')),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv('MODEL_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('MODEL_BREAKER_RESET', '30')),
+        ),
+    )
+
+# Built on first use (or by warm_up()), so importing a backend stays cheap.
+client = Lazy(build_client, "model_client")
+
+def client_stats():
+    """ client.stats() once the client exists; readiness info before that. """
+    if not client.ready:
+        return client.status()
+    return {**client.status(), **client.get().stats()}
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+from array import array
+
+import numpy as np
+
+from records import validate_record
+from taxonomy import NUM_SUBSECTORS, SECTOR_SLICES, SECTORS, SUBSECTOR_INDEX, SUBSECTORS
+
+# Output file written by `process.py --monthly` (numpy .npz archive)
+MONTHLY_OUTPUT = "monthly_emissions.npz"
+
+# Rejection reasons on top of records.validate_record's
+REJECT_MISSING_PERIOD = "missing-period"   # annual row (no month) or no year
+REJECT_BAD_PERIOD     = "bad-period"       # year/month not integers, or month outside 1-12
+
+# Meteorological seasons by calendar month (index 0 = January)
+SEASONS = ("DJF", "MAM", "JJA", "SON")
+SEASON_OF_MONTH = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+
+def coerce_period(row):
+    """ Returns (year, month) or (None, rejection reason) for a simplified record with a period. """
+    year, month = row.get("year"), row.get("month")
+    if year is None or month is None:
+        return None, REJECT_MISSING_PERIOD
+    try:
+        year, month = int(year), int(month)
+    except (TypeError, ValueError):
+        return None, REJECT_BAD_PERIOD
+    if not 1 <= month <= 12:
+        return None, REJECT_BAD_PERIOD
+    return (year, month), None
+
+
+class MonthlyCube:
+    """
+    Dense float64 array of shape (len(countries), NUM_SUBSECTORS, months):
+      values[c, s, m] = emissions of countries[c] in SUBSECTORS[s] during
+                        month m, counted from (start_year, start_month)
+
+    Month slots without a row are 0.0. Subsectors follow compact_breakdown's
+    order, so every sector is one contiguous slice of the subsector axis.
+    All aggregates below are whole-array numpy operations.
+    """
+
+    def __init__(self, countries, values, start_year, start_month=1):
+        self.countries = list(countries)
+        self.values = values
+        self.start_year = start_year
+        self.start_month = start_month
+        self.row = {country: i for i, country in enumerate(self.countries)}
+
+    @property
+    def num_months(self):
+        return self.values.shape[2]
+
+    def periods(self):
+        """ [(year, month), ...] for the month axis. """
+        first = self.start_year * 12 + self.start_month - 1
+        return [((first + m) // 12, (first + m) % 12 + 1) for m in range(self.num_months)]
+
+    def month_labels(self):
+        return [f"{year}-{month:02d}" for year, month in self.periods()]
+
+    # -------------------------------------------------------------------------
+    # Building
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_rows(cls, rows, rejected):
+        """
+        Builds the cube from simplified records carrying "year" and "month"
+        (retrievedata.simplify_data keeps them for rows that have a Month),
+        validating each row once. rows may be a stream; rejections are counted into rejected
+        (a Counter).
+
+        Rows are first collected into flat typed columns (a few bytes per
+        row), then scattered into the dense array in one np.add.at call.
+        """
+        rows_by_country = {}
+        country_col, subsector_col, month_col = array("i"), array("i"), array("i")
+        emissions_col = array("d")
+
+        for row in rows:
+            record, problem = validate_record(row, monthly=True)
+            if problem is None:
+                period, problem = coerce_period(row)
+            if problem:
+                rejected[problem] += 1
+                continue
+            year, month = period
+            country_col.append(rows_by_country.setdefault(record.country, len(rows_by_country)))
+            subsector_col.append(SUBSECTOR_INDEX[record.subsector])
+            month_col.append(year * 12 + month - 1)
+            emissions_col.append(record.emissions)
+
+        countries = list(rows_by_country)
+        if not emissions_col:
+            return cls(countries, np.zeros((0, NUM_SUBSECTORS, 0)), 0)
+
+        months = np.frombuffer(month_col, dtype=np.int32)
+        first = int(months.min())
+        values = np.zeros((len(countries), NUM_SUBSECTORS, int(months.max()) - first + 1))
+        np.add.at(
+            values,
+            (np.frombuffer(country_col, dtype=np.int32), np.frombuffer(subsector_col, dtype=np.int32), months - first),
+            np.frombuffer(emissions_col, dtype=np.float64),
+        )
+        return cls(countries, values, first // 12, first % 12 + 1)
+
+    # -------------------------------------------------------------------------
+    # Aggregates
+    # -------------------------------------------------------------------------
+
+    def by_sector(self):
+        """ (countries, len(SECTORS), months): subsectors summed per sector. """
+        starts = [SECTOR_SLICES[sector][0] for sector in SECTORS]
+        return np.add.reduceat(self.values, starts, axis=1)
+
+    def country_totals(self):
+        """ (countries, months): all subsectors summed (net, like net_emissions.json). """
+        return self.values.sum(axis=1)
+
+    def month_of_year(self, values=None):
+        """
+        Sums the month axis into 12 calendar months (January first) across
+        all years. values defaults to the cube; by_sector() or
+        country_totals() output works too (month axis last).
+        """
+        values = self.values if values is None else values
+        calendar = (self.start_month - 1 + np.arange(values.shape[-1])) % 12
+        onehot = np.zeros((values.shape[-1], 12))
+        onehot[np.arange(values.shape[-1]), calendar] = 1.0
+        return values @ onehot
+
+    def seasonal(self, values=None):
+        """
+        Sums into the meteorological seasons (SEASONS: DJF, MAM, JJA, SON)
+        across all years (so every December joins the DJF total).
+        """
+        by_month = self.month_of_year(values)
+        onehot = np.zeros((12, len(SEASONS)))
+        onehot[np.arange(12), SEASON_OF_MONTH] = 1.0
+        return by_month @ onehot
+
+    def rolling_sum(self, window=12, values=None):
+        """
+        Trailing window sums along the month axis via one cumulative sum:
+        out[..., m] = sum(values[..., m - window + 1 : m + 1]).
+        The first window - 1 months (incomplete windows) are NaN.
+        """
+        values = self.values if values is None else values
+        cumulative = np.cumsum(values, axis=-1)
+        out = np.full(values.shape, np.nan)
+        if values.shape[-1] >= window:
+            out[..., window - 1] = cumulative[..., window - 1]
+            out[..., window:] = cumulative[..., window:] - cumulative[..., :-window]
+        return out
+
+    def annual_totals(self, values=None):
+        """ { year: array of values summed over that year's months } for the years covered. """
+        values = self.values if values is None else values
+        years = np.array([year for year, _ in self.periods()])
+        return {int(year): values[..., years == year].sum(axis=-1) for year in np.unique(years)}
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def save(self, filename=MONTHLY_OUTPUT):
+        np.savez_compressed(
+            filename,
+            values=self.values,
+            countries=np.array(self.countries),
+            subsectors=np.array(SUBSECTORS),
+            start=np.array([self.start_year, self.start_month]),
+        )
+
+    @classmethod
+    def load(cls, filename=MONTHLY_OUTPUT):
+        with np.load(filename) as data:
+            if tuple(data["subsectors"]) != SUBSECTORS:
+                raise ValueError(f"'{filename}' was written with a different subsector taxonomy")
+            start_year, start_month = (int(v) for v in data["start"])
+            return cls(list(data["countries"]), data["values"], start_year, start_month)
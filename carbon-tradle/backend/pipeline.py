@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import NamedTuple
+
+# Make-style driver for the data pipeline:
+#   python pipeline.py                    # rebuild whatever is stale
+#   python pipeline.py rankings snapshot  # only these targets (and what they need)
+#   python pipeline.py --dry-run          # show what would run
+#   python pipeline.py --fetch            # also refetch from the ClimateTRACE API
+#   python pipeline.py --list             # print the stage graph
+#
+# Every stage declares its input files, output files and the source files
+# its code lives in. A stage's key is a hash over all of those (plus its
+# arguments); finished stages record their output hashes under that key and
+# copy the outputs into a content-addressed object store in CACHE_DIR. A
+# stage is skipped when its key has a record and the outputs on disk still
+# match it; outputs that were deleted or overwritten are restored from the
+# store instead of recomputed. Stages whose inputs are all ready run in
+# parallel worker processes.
+#
+# Stages marked network (the API fetches) never run unless asked for with
+# --fetch or named as a target; otherwise their outputs count as source files,
+# and the default run leaves out stages waiting on one that was never fetched.
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = ".pipeline_cache"
+HASH_CHUNK = 1 << 20
+
+NET_OUTPUT = "net_emissions.json"
+GROSS_OUTPUT = "gross_emissions.json"
+BREAKDOWN_OUTPUT = "subsector_breakdown.json"
+SIMPLIFIED_INPUT = "simplified_emissions.json"
+COORDINATES_INPUT = "../frontend/public/data/coordinates.csv"
+CLIMATE_WATCH_INPUT = "../frontend/public/data/emissions.csv"
+ARCHIVE_SCRAPE_OUTPUT = "archive/emission_data_all.json"
+ARCHIVE_TREE_INPUT = "archive/filtered_emission_data_all.json"   # written by archive:clean
+ARCHIVE_TREE_DIR = "archive/treemaps"
+
+# Source files shared by every stage that validates records
+RECORD_CODE = ("process.py", "records.py", "taxonomy.py", "groups.py", "serialization.py")
+
+
+class Stage(NamedTuple):
+    """
+    name     unique stage name (also the CLI target name)
+    action   name of a module-level function below, called with *args in a worker
+    args     tuple of JSON-serializable arguments
+    inputs   files the stage reads (produced by another stage, or source files)
+    outputs  files the stage writes
+    code     source files whose content versions the stage
+    network  True for stages that call external APIs (never cached)
+    """
+    name: str
+    action: str
+    args: tuple
+    inputs: tuple
+    outputs: tuple
+    code: tuple
+    network: bool = False
+
+
+# =============================================================================
+# 1. STAGE ACTIONS (run in worker processes, with the backend as cwd)
+# =============================================================================
+
+def run_script(script, cwd="."):
+    subprocess.run([sys.executable, script], cwd=cwd, check=True)
+
+def run_totals(kind, input_file, output, compact):
+    """
+    One of process.py's three aggregations as its own stage, with its group
+    rollup when groups.json exists (like process.py, the rollup is optional).
+    """
+    import process
+    from groups import (GROUP_BREAKDOWN_OUTPUT, GROUP_GROSS_OUTPUT, GROUP_NET_OUTPUT, GROUPS_FILE,
+                        GroupIndex, load_groups)
+    from records import validate_records
+
+    aggregate, group_output = {
+        "net": (process.calculate_net_emissions, GROUP_NET_OUTPUT),
+        "gross": (process.calculate_gross_emissions, GROUP_GROSS_OUTPUT),
+        "breakdown": (process.build_subsector_breakdown, GROUP_BREAKDOWN_OUTPUT),
+    }[kind]
+    records, _ = validate_records(process.load_simplified_emissions(input_file))
+    group_index = GroupIndex(load_groups(GROUPS_FILE)) if os.path.exists(GROUPS_FILE) else None
+    group_totals = {}
+    process.save_json(aggregate(records, group_index, group_totals), output, compact=compact)
+    if group_index is not None:
+        process.save_json(group_totals, group_output, compact=compact)
+
+def run_rankings(net_file, gross_file, breakdown_file, output):
+    from rankings import build_rankings, save_rankings
+    loaded = []
+    for filename in (net_file, gross_file, breakdown_file):
+        with open(filename, "r", encoding="utf-8") as f:
+            loaded.append(json.load(f))
+    save_rankings(build_rankings(*loaded), output)
+
+def run_snapshot(output, breakdown_file, net_file, gross_file, coordinates_file):
+    from data_plane import build_snapshot
+    build_snapshot(output, breakdown_file, net_file, gross_file, coordinates_file)
+
+def run_reconcile(climate_watch_file, net_file, gross_file, output):
+    from reconcile import build_report
+    from serialization import dump_json
+    report = build_report(climate_watch_file, {"net": net_file, "gross": gross_file})
+    dump_json(report, output, compact=True, float_digits=4)
+
+def run_archive_tree(country_name, country_code, input_file, output):
+    """ archive/tree.py's build for one country (tree.py itself only builds China). """
+    sys.path.insert(0, os.path.abspath("archive"))
+    from tree import build_treemap_data
+    with open(input_file, "r") as f:
+        data = json.load(f)
+    treemap = build_treemap_data(country_name, data[country_name], country_code)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(treemap, f, indent=4)
+
+def run_action(action, args):
+    globals()[action](*args)
+
+
+# =============================================================================
+# 2. STAGE GRAPH
+# =============================================================================
+
+def archive_tree_stages(input_file=ARCHIVE_TREE_INPUT):
+    """
+    One stage per country in archive:clean's output (its ISO code is the
+    innermost key). The stages exist once that file does, so the first run
+    after a fresh scrape + clean builds the trees on the next invocation.
+    """
+    if not os.path.exists(input_file):
+        return []
+    with open(input_file, "r") as f:
+        data = json.load(f)
+    stages = []
+    for country_name, sectors in data.items():
+        codes = {code for subsectors in sectors.values() for by_code in subsectors.values() for code in by_code}
+        if len(codes) != 1:
+            continue
+        code = codes.pop()
+        stages.append(Stage(
+            f"archive:tree:{code}", "run_archive_tree",
+            (country_name, code, input_file, f"{ARCHIVE_TREE_DIR}/{code}.json"),
+            (input_file,), (f"{ARCHIVE_TREE_DIR}/{code}.json",), ("archive/tree.py",),
+        ))
+    return stages
+
+def build_stages(compact=False):
+    from data_plane import SNAPSHOT_FILE
+    from groups import GROUP_BREAKDOWN_OUTPUT, GROUP_GROSS_OUTPUT, GROUP_NET_OUTPUT, GROUPS_FILE
+    from rankings import RANKINGS_OUTPUT
+    from reconcile import REPORT_OUTPUT
+    from retrievedata import RAW_OUTPUT
+
+    # The group rollups (and groups.json as an input) only when groups.json exists
+    has_groups = os.path.exists(GROUPS_FILE)
+    totals = [
+        Stage(kind, "run_totals", (kind, SIMPLIFIED_INPUT, output, compact),
+              (SIMPLIFIED_INPUT, GROUPS_FILE) if has_groups else (SIMPLIFIED_INPUT,),
+              (output, group_output) if has_groups else (output,), RECORD_CODE)
+        for kind, output, group_output in (
+            ("net", NET_OUTPUT, GROUP_NET_OUTPUT),
+            ("gross", GROSS_OUTPUT, GROUP_GROSS_OUTPUT),
+            ("breakdown", BREAKDOWN_OUTPUT, GROUP_BREAKDOWN_OUTPUT),
+        )
+    ]
+    return [
+        Stage("fetch", "run_script", ("retrievedata.py",), (),
+              (SIMPLIFIED_INPUT, RAW_OUTPUT), ("retrievedata.py", "taxonomy.py", "http_cache.py"), network=True),
+        *totals,
+        Stage("rankings", "run_rankings", (NET_OUTPUT, GROSS_OUTPUT, BREAKDOWN_OUTPUT, RANKINGS_OUTPUT),
+              (NET_OUTPUT, GROSS_OUTPUT, BREAKDOWN_OUTPUT), (RANKINGS_OUTPUT,), ("rankings.py", "taxonomy.py")),
+        Stage("snapshot", "run_snapshot",
+              (SNAPSHOT_FILE, BREAKDOWN_OUTPUT, NET_OUTPUT, GROSS_OUTPUT, COORDINATES_INPUT),
+              (BREAKDOWN_OUTPUT, NET_OUTPUT, GROSS_OUTPUT, COORDINATES_INPUT), (SNAPSHOT_FILE,),
+              ("data_plane.py", "compact_breakdown.py", "taxonomy.py", "daily_puzzle.py")),
+        Stage("reconcile", "run_reconcile", (CLIMATE_WATCH_INPUT, NET_OUTPUT, GROSS_OUTPUT, REPORT_OUTPUT),
+              (CLIMATE_WATCH_INPUT, NET_OUTPUT, GROSS_OUTPUT), (REPORT_OUTPUT,), ("reconcile.py",)),
+        # archive/ chain: scrape.py -> clean.py -> tree.py (each with hard-coded names in archive/)
+        Stage("archive:scrape", "run_script", ("scrape.py", "archive"), (),
+              (ARCHIVE_SCRAPE_OUTPUT,), ("archive/scrape.py", "taxonomy.py"), network=True),
+        Stage("archive:clean", "run_script", ("clean.py", "archive"), (ARCHIVE_SCRAPE_OUTPUT,),
+              (ARCHIVE_TREE_INPUT,), ("archive/clean.py",)),
+        *archive_tree_stages(),
+    ]
+
+
+# =============================================================================
+# 3. CONTENT-ADDRESSED CACHE
+# =============================================================================
+
+class FileHashes:
+    """ sha256 of file contents, memoized per (path, size, mtime). """
+
+    def __init__(self):
+        self._memo = {}
+
+    def __call__(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        memo_key = (path, st.st_size, st.st_mtime_ns)
+        if memo_key not in self._memo:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                    digest.update(chunk)
+            self._memo[memo_key] = digest.hexdigest()
+        return self._memo[memo_key]
+
+
+class StageCache:
+    """
+    CACHE_DIR/keys/<stage key>.json    { "stage": name, "outputs": { path: sha256 } }
+    CACHE_DIR/objects/<sha256[:2]>/<sha256>   output contents
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, file_hash=None):
+        self.cache_dir = cache_dir
+        self.file_hash = file_hash or FileHashes()
+        # path -> sha256 of outputs a dry run would restore, so downstream
+        # keys can be computed as if they were on disk
+        self.would_restore = {}
+
+    def content_hash(self, path):
+        return self.would_restore.get(path) or self.file_hash(path)
+
+    def key(self, stage):
+        """ Hash of the stage's action, arguments, code versions and input contents. """
+        parts = {
+            "action": stage.action,
+            "args": list(stage.args),
+            "code": {path: self.content_hash(path) for path in stage.code},
+            "inputs": {path: self.content_hash(path) for path in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _key_file(self, key):
+        return os.path.join(self.cache_dir, "keys", f"{key}.json")
+
+    def _object_file(self, sha):
+        return os.path.join(self.cache_dir, "objects", sha[:2], sha)
+
+    def restore(self, key, dry_run=False):
+        """
+        Returns "fresh" if the recorded outputs for key are on disk, "restored"
+        if some had to be copied back from the object store (dry_run: would
+        have to be), or None (run it).
+        """
+        try:
+            with open(self._key_file(key), "r", encoding="utf-8") as f:
+                outputs = json.load(f)["outputs"]
+        except FileNotFoundError:
+            return None
+        stale = {path: sha for path, sha in outputs.items() if self.file_hash(path) != sha}
+        if any(not os.path.exists(self._object_file(sha)) for sha in stale.values()):
+            return None
+        if dry_run:
+            self.would_restore.update(stale)
+            return "restored" if stale else "fresh"
+        for path, sha in stale.items():
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(self._object_file(sha), path)
+        return "restored" if stale else "fresh"
+
+    def store(self, stage, key):
+        outputs = {}
+        for path in stage.outputs:
+            sha = self.file_hash(path)
+            if sha is None:
+                raise FileNotFoundError(f"stage '{stage.name}' did not write '{path}'")
+            obj = self._object_file(sha)
+            if not os.path.exists(obj):
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                shutil.copyfile(path, obj + ".tmp")
+                os.replace(obj + ".tmp", obj)
+            outputs[path] = sha
+        os.makedirs(os.path.dirname(self._key_file(key)), exist_ok=True)
+        with open(self._key_file(key), "w", encoding="utf-8") as f:
+            json.dump({"stage": stage.name, "outputs": outputs}, f, indent=2)
+
+
+# =============================================================================
+# 4. SCHEDULER
+# =============================================================================
+
+def select_stages(stages, targets=(), fetch=False):
+    """
+    Returns ({ name: stage } to consider, { name: set of upstream stage names }).
+    No targets means every non-network stage (plus the fetches with fetch=True),
+    except stages that need a file only an unselected network stage would
+    write (e.g. archive:clean before archive:scrape has ever run).
+    Network stages that are not selected are dropped, so their outputs act as sources.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    unknown = [t for t in targets if t not in by_name]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(unknown)} (see --list)")
+    wanted = set(targets) or {s.name for s in stages if fetch or not s.network}
+    enabled = {s.name for s in stages if fetch or not s.network or s.name in wanted}
+
+    if not targets:
+        # stages are declared upstream first, so one pass follows the chain
+        unfetched = {out for s in stages if s.name not in enabled for out in s.outputs if not os.path.exists(out)}
+        for s in stages:
+            if s.name in wanted and unfetched.intersection(s.inputs):
+                wanted.discard(s.name)
+                enabled.discard(s.name)
+                unfetched.update(out for out in s.outputs if not os.path.exists(out))
+
+    producers = {out: s.name for s in stages if s.name in enabled for out in s.outputs}
+    deps = {s.name: {producers[i] for i in s.inputs if i in producers} for s in stages if s.name in enabled}
+
+    selected, todo = set(), list(wanted)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(deps[name])
+    return {name: by_name[name] for name in selected}, {name: deps[name] for name in selected}
+
+def run_pipeline(stages, deps, jobs=None, force=False, dry_run=False, cache=None):
+    """
+    Runs stages in dependency order, up to jobs at a time.
+    Returns { name: (status, seconds) }; status is one of fresh, restored,
+    ran, would-run, blocked (missing inputs), failed or skipped (upstream failed).
+    """
+    cache = cache or StageCache()
+    results = {}
+    pending = set(stages)
+    running = {}
+
+    def settle(name, status, seconds=0.0):
+        results[name] = (status, seconds)
+        print(f"  {name:<24} {status:<10} {seconds:>7.2f}s")
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            ready = sorted(n for n in pending if all(d in results for d in deps[n]))
+            for name in ready:
+                pending.discard(name)
+                stage = stages[name]
+                upstream = [results[d][0] for d in deps[name]]
+                if any(status in ("failed", "blocked", "skipped") for status in upstream):
+                    settle(name, "skipped")
+                    continue
+                if dry_run and "would-run" in upstream:
+                    settle(name, "would-run")
+                    continue
+                missing = [path for path in stage.inputs if cache.content_hash(path) is None]
+                if missing:
+                    settle(name, "blocked")
+                    print(f"      missing: {', '.join(missing)}")
+                    continue
+                key = None if stage.network else cache.key(stage)
+                status = None if force or key is None else cache.restore(key, dry_run)
+                if status:
+                    settle(name, status)
+                elif dry_run:
+                    settle(name, "would-run")
+                else:
+                    running[pool.submit(run_action, stage.action, stage.args)] = (name, key, time.perf_counter())
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key, start = running.pop(future)
+                try:
+                    future.result()
+                    if key is not None:
+                        cache.store(stages[name], key)
+                except Exception as e:
+                    settle(name, "failed", time.perf_counter() - start)
+                    print(f"      {type(e).__name__}: {e}")
+                    continue
+                settle(name, "ran", time.perf_counter() - start)
+    return results
+
+
+def print_graph(stages):
+    for stage in stages:
+        flag = " [network]" if stage.network else ""
+        print(f"{stage.name}{flag}")
+        print(f"    in:  {', '.join(stage.inputs) or '-'}")
+        print(f"    out: {', '.join(stage.outputs)}")
+
+
+def main(argv=None):
+    from serialization import COMPACT_ENV, compact_requested
+
+    parser = argparse.ArgumentParser(description="Rebuild stale pipeline outputs, in parallel where possible.")
+    parser.add_argument("targets", nargs="*", help="Stages to bring up to date (default: all but network stages)")
+    parser.add_argument("--fetch", action="store_true", help="Also run the network stages (API fetches)")
+    parser.add_argument("--force", action="store_true", help="Ignore the cache and rerun the selected stages")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would run without running it")
+    parser.add_argument("--jobs", type=int, default=None, help="Parallel worker processes (default: CPU count)")
+    parser.add_argument("--compact", action="store_true",
+                        help=f"Write compact JSON outputs (or set {COMPACT_ENV}=1)")
+    parser.add_argument("--list", action="store_true", help="Print the stages with their inputs and outputs")
+    args = parser.parse_args(argv)
+
+    os.chdir(BACKEND_DIR)
+    stages = build_stages(compact=compact_requested(args.compact))
+    if args.list:
+        print_graph(stages)
+        return
+
+    selected, deps = select_stages(stages, args.targets, args.fetch)
+    start = time.perf_counter()
+    print(f"{len(selected)} stage(s):")
+    results = run_pipeline(selected, deps, args.jobs, args.force, args.dry_run)
+    counts = {}
+    for status, _ in results.values():
+        counts[status] = counts.get(status, 0) + 1
+    print(f"Done in {time.perf_counter() - start:.2f}s: "
+          + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    if counts.get("failed") or (counts.get("blocked") and args.targets):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 
+import argparse
 import json
 import math
-from collections import defaultdict
+import os
+from collections import Counter, defaultdict
+
+from emissions_store import DB_FILE, DEFAULT_YEAR, build_store
+from gases import GAS_CUBE_OUTPUT, GAS_OUTPUT, GWP_FILE, GasCube, load_gwp
+from groups import GROUP_BREAKDOWN_OUTPUT, GROUP_GROSS_OUTPUT, GROUP_NET_OUTPUT, GROUPS_FILE, GroupIndex, load_groups
+from json_stream import iter_json_array_file
+from monthly import MONTHLY_OUTPUT, MonthlyCube
+from profiling import PROFILE_DIR_ENV, PROFILE_ENV, StageProfiler, profiling_requested
+from rankings import RANKINGS_OUTPUT, build_rankings, save_rankings
+from records import iter_valid_records, print_rejections, validate_records
+from serialization import COMPACT_ENV, COMPRESSION_SUFFIXES, compact_requested, dump_json
 
 # Input file containing a list of records:
 # [
@@ -20,6 +32,9 @@ INPUT_FILE = "simplified_emissions.json"
 NET_OUTPUT         = "net_emissions.json"
 GROSS_OUTPUT       = "gross_emissions.json"
 BREAKDOWN_OUTPUT   = "subsector_breakdown.json"
+# Rank/percentile tables (RANKINGS_OUTPUT, "rankings.npz") are written alongside,
+# and, with a groups file (GROUPS_FILE, "groups.json"), group_*.json rollups.
+# With --multi-gas, per-gas outputs (GAS_OUTPUT, GAS_CUBE_OUTPUT) too.
 
 def load_simplified_emissions(filename):
     """
@@ -36,34 +51,81 @@ def load_simplified_emissions(filename):
         data = json.load(f)
     return data
 
-def calculate_net_emissions(data):
+def iter_simplified_emissions(filename):
+    """
+    Same records as load_simplified_emissions, but yielded one at a time by
+    an incremental parser (json_stream), so the file is never held in memory
+    as a whole. Used by `process.py --stream`.
+    """
+    return iter_json_array_file(filename)
+
+def calculate_net_emissions(records, group_index=None, group_totals=None):
     """
     Returns a dict of net emissions by country.
     Net = sum of all emissions (including negative).
     Example result: { "USA": 123456.78, "DEU": -9999.0, ... }
+
+    With a groups.GroupIndex, group_totals (a dict) is filled with the same
+    sums per group in the same pass: { "WORLD": ..., "EUROPE": ..., ... }
+    (they are still computed, then dropped, if group_totals is None)
     """
     net_by_country = defaultdict(float)
-    for record in data:
-        country = record.get("country", "N/A")
-        emissions = record.get("emissions", 0.0)
+    if group_index is None:
+        for country, _sector, _subsector, emissions in records:
+            net_by_country[country] += emissions
+        return dict(net_by_country)
+
+    net_by_group = dict.fromkeys(group_index.groups, 0.0)
+    for country, _sector, _subsector, emissions in records:
         net_by_country[country] += emissions
+        for group in group_index[country]:
+            net_by_group[group] += emissions
+    if group_totals is not None:
+        group_totals.update(net_by_group)
     return dict(net_by_country)
 
-def calculate_gross_emissions(data):
+def calculate_gross_emissions(records, group_index=None, group_totals=None):
     """
     Returns a dict of gross emissions by country.
     Gross = sum of only positive emissions, ignoring negative or zero values.
     Example result: { "USA": 200000.0, "DEU": 50000.0, ... }
+
+    group_index / group_totals work as in calculate_net_emissions.
     """
     gross_by_country = defaultdict(float)
-    for record in data:
-        country = record.get("country", "N/A")
-        emissions = record.get("emissions", 0.0)
+    if group_index is None:
+        for country, _sector, _subsector, emissions in records:
+            if emissions > 0:
+                gross_by_country[country] += emissions
+        return dict(gross_by_country)
+
+    gross_by_group = dict.fromkeys(group_index.groups, 0.0)
+    for country, _sector, _subsector, emissions in records:
         if emissions > 0:
             gross_by_country[country] += emissions
+            for group in group_index[country]:
+                gross_by_group[group] += emissions
+    if group_totals is not None:
+        group_totals.update(gross_by_group)
     return dict(gross_by_country)
 
-def build_subsector_breakdown(data):
+def finalize_breakdown(breakdown):
+    """ Converts breakdown[key][sector][subsector] defaultdicts to plain dicts with "sectorTotal". """
+    final_dict = {}
+    for country_code, sector_dict in breakdown.items():
+        final_dict[country_code] = {}
+        for sector_name, subsectors_dict in sector_dict.items():
+            # Compute total
+            sector_total = sum(subsectors_dict.values())
+            # Convert the inner defaultdict to a normal dict
+            normal_sub_dict = dict(subsectors_dict)
+            # Add the total
+            normal_sub_dict["sectorTotal"] = sector_total
+            # Assign
+            final_dict[country_code][sector_name] = normal_sub_dict
+    return final_dict
+
+def build_subsector_breakdown(records, group_index=None, group_totals=None):
     """
     Returns a nested dict:
       {
@@ -88,55 +150,250 @@ def build_subsector_breakdown(data):
     { subsectorName => emissions }, plus a "sectorTotal" key.
     Summing the individual subsectors (excluding "sectorTotal") yields the net
     emissions for that sector.
+
+    With a groups.GroupIndex, group_totals is filled with the same nested
+    structure per group code, accumulated in the same pass.
     """
     # Nested structure: breakdown[country][sector][subsector] -> float
     breakdown = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
 
     # 1) Fill the nested dict
-    for record in data:
-        country   = record.get("country", "N/A")
-        sector    = record.get("sector", "unknown")
-        subsector = record.get("subsector", "unknown")
-        emissions = record.get("emissions", 0.0)
-
-        breakdown[country][sector][subsector] += emissions
+    if group_index is None:
+        for country, sector, subsector, emissions in records:
+            breakdown[country][sector][subsector] += emissions
+    else:
+        group_breakdown = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+        for country, sector, subsector, emissions in records:
+            breakdown[country][sector][subsector] += emissions
+            for group in group_index[country]:
+                group_breakdown[group][sector][subsector] += emissions
+        if group_totals is not None:
+            group_totals.update(finalize_breakdown(group_breakdown))
 
     # 2) Convert into the final format, adding "sectorTotal"
-    final_dict = {}
-    for country_code, sector_dict in breakdown.items():
-        final_dict[country_code] = {}
-        for sector_name, subsectors_dict in sector_dict.items():
-            # Compute total
-            sector_total = sum(subsectors_dict.values())
-            # Convert the inner defaultdict to a normal dict
-            normal_sub_dict = dict(subsectors_dict)
-            # Add the total
-            normal_sub_dict["sectorTotal"] = sector_total
-            # Assign
-            final_dict[country_code][sector_name] = normal_sub_dict
+    return finalize_breakdown(breakdown)
 
-    return final_dict
+def aggregate_records(records, group_index=None, group_net=None, group_gross=None, group_breakdown=None):
+    """
+    Single pass computing what calculate_net_emissions,
+    calculate_gross_emissions and build_subsector_breakdown compute
+    separately, for records that can only be iterated once (a stream).
+    Sums are accumulated in the same order, so results are identical.
 
-def save_json(data, filename):
-    """ Utility to save data (dict or list) as pretty-printed JSON. """
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    With a groups.GroupIndex, group_net / group_gross / group_breakdown are
+    filled as in the separate functions.
+    Returns (net, gross, breakdown, number of records).
+    """
+    net_by_country = defaultdict(float)
+    gross_by_country = defaultdict(float)
+    breakdown = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+    count = 0
 
-if __name__ == "__main__":
-    # 1) Load the data
-    records = load_simplified_emissions(INPUT_FILE)
+    if group_index is None:
+        for country, sector, subsector, emissions in records:
+            count += 1
+            net_by_country[country] += emissions
+            if emissions > 0:
+                gross_by_country[country] += emissions
+            breakdown[country][sector][subsector] += emissions
+    else:
+        net_by_group = dict.fromkeys(group_index.groups, 0.0)
+        gross_by_group = dict.fromkeys(group_index.groups, 0.0)
+        breakdown_by_group = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+        for country, sector, subsector, emissions in records:
+            count += 1
+            groups = group_index[country]
+            net_by_country[country] += emissions
+            for group in groups:
+                net_by_group[group] += emissions
+            if emissions > 0:
+                gross_by_country[country] += emissions
+                for group in groups:
+                    gross_by_group[group] += emissions
+            breakdown[country][sector][subsector] += emissions
+            for group in groups:
+                breakdown_by_group[group][sector][subsector] += emissions
+        if group_net is not None:
+            group_net.update(net_by_group)
+        if group_gross is not None:
+            group_gross.update(gross_by_group)
+        if group_breakdown is not None:
+            group_breakdown.update(finalize_breakdown(breakdown_by_group))
+
+    return dict(net_by_country), dict(gross_by_country), finalize_breakdown(breakdown), count
+
+def save_json(data, filename, compact=False, float_digits=None, compress=()):
+    """
+    Utility to save data (dict or list) as JSON.
+    Pretty-printed by default; compact=True is the production mode (no
+    indentation), float_digits rounds every float, and compress writes
+    precompressed .gz/.br siblings. See serialization.dump_json.
+    """
+    dump_json(data, filename, compact=compact, float_digits=float_digits, compress=compress)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Aggregate simplified_emissions.json into net, gross and subsector outputs."
+    )
+    parser.add_argument("--input", default=INPUT_FILE,
+                        help=f"Simplified records to aggregate (default: {INPUT_FILE})")
+    parser.add_argument("--stream", action="store_true",
+                        help="Parse, validate and aggregate the input incrementally in one pass "
+                             "(near-constant memory for any input size)")
+    parser.add_argument("--multi-gas", action="store_true",
+                        help=f"Accept rows for several gases (see retrievedata.REQUESTED_GASES): CO2e totals "
+                             f"come from reported co2e_100yr rows or GWP-converted single gases, and per-gas "
+                             f"totals are written to {GAS_OUTPUT} / {GAS_CUBE_OUTPUT}")
+    parser.add_argument("--gwp", default=GWP_FILE,
+                        help=f"GWP table used by --multi-gas (default: {GWP_FILE})")
+    parser.add_argument("--monthly", action="store_true",
+                        help=f"Also aggregate rows carrying year/month into a country x subsector x month "
+                             f"array ({MONTHLY_OUTPUT}). retrievedata.py fetches annual totals only, so "
+                             f"this needs monthly records from another export")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Time and memory-profile each stage (or set {PROFILE_ENV}=1)")
+    parser.add_argument("--profile-dir", default=os.getenv(PROFILE_DIR_ENV),
+                        help="Also dump one cProfile .pstats file per stage into this directory")
+    parser.add_argument("--compact", action="store_true",
+                        help=f"Write compact JSON without indentation (or set {COMPACT_ENV}=1)")
+    parser.add_argument("--float-digits", type=int, default=None,
+                        help="Round emissions to this many decimal places in the outputs")
+    parser.add_argument("--compress", action="append", default=[], choices=sorted(COMPRESSION_SUFFIXES),
+                        help="Also write a precompressed copy of each output (repeatable: gzip, br)")
+    parser.add_argument("--sqlite", nargs="?", const=DB_FILE, default=None, metavar="PATH",
+                        help=f"Also load the records into an indexed SQLite store (default path: {DB_FILE})")
+    parser.add_argument("--groups", default=GROUPS_FILE,
+                        help=f"Group definitions for world/continent/income rollups (default: {GROUPS_FILE}); "
+                             "rollups are skipped if the file does not exist")
+    parser.add_argument("--year", type=int, default=DEFAULT_YEAR,
+                        help=f"Year stored for records that carry none (default: {DEFAULT_YEAR})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = StageProfiler(
+        enabled=profiling_requested(args.profile or bool(args.profile_dir)),
+        pstats_dir=args.profile_dir,
+    )
+    save_options = {
+        "compact": compact_requested(args.compact),
+        "float_digits": args.float_digits,
+        "compress": args.compress,
+    }
+
+    # Group rollups (world, continents, income groups) ride along in each pass
+    group_index = GroupIndex(load_groups(args.groups)) if os.path.exists(args.groups) else None
+    group_net, group_gross, group_breakdown = {}, {}, {}
+
+    gas_cube = None
+    if args.multi_gas:
+        # 1-4) One pass over the rows into a gas x country x subsector cube,
+        #      then one vectorized GWP conversion to CO2e records, which the
+        #      usual aggregators sum.
+        basis, gwp = load_gwp(args.gwp)
+        rejected = Counter()
+        with profiler.stage("aggregate:gases"):
+            rows = iter_simplified_emissions(args.input) if args.stream else load_simplified_emissions(args.input)
+            gas_cube = GasCube.from_rows(rows, rejected)
+            del rows
+            records = gas_cube.co2e_records(gwp, basis)
+        print_rejections(rejected, gas_cube.num_rows + sum(rejected.values()))
+        with profiler.stage("aggregate:co2e"):
+            net_emissions, gross_emissions, subsector_data, _ = aggregate_records(
+                records, group_index, group_net, group_gross, group_breakdown
+            )
+    elif args.stream:
+        # 1-4) Parse, validate and aggregate in a single pass over the file;
+        #      neither the raw rows nor the records are ever held in a list.
+        rejected = Counter()
+        with profiler.stage("stream:aggregate"):
+            records = iter_valid_records(iter_simplified_emissions(args.input), rejected)
+            net_emissions, gross_emissions, subsector_data, count = aggregate_records(
+                records, group_index, group_net, group_gross, group_breakdown
+            )
+        print_rejections(rejected, count + sum(rejected.values()))
+        records = None
+    else:
+        # 1) Load and validate the data
+        with profiler.stage("load"):
+            rows = load_simplified_emissions(args.input)
+        with profiler.stage("validate"):
+            records, rejected = validate_records(rows)
+        print_rejections(rejected, len(rows))
+        del rows
+
+        # 2) Net emissions by country (and group)
+        with profiler.stage("aggregate:net"):
+            net_emissions = calculate_net_emissions(records, group_index, group_net)
+
+        # 3) Gross emissions by country (and group)
+        with profiler.stage("aggregate:gross"):
+            gross_emissions = calculate_gross_emissions(records, group_index, group_gross)
+
+        # 4) Subsector breakdown (and group breakdown)
+        with profiler.stage("aggregate:breakdown"):
+            subsector_data = build_subsector_breakdown(records, group_index, group_breakdown)
 
-    # 2) Net emissions by country
-    net_emissions = calculate_net_emissions(records)
-    save_json(net_emissions, NET_OUTPUT)
+    with profiler.stage("save:net"):
+        save_json(net_emissions, NET_OUTPUT, **save_options)
+        if group_index is not None:
+            save_json(group_net, GROUP_NET_OUTPUT, **save_options)
     print(f"Saved net emissions to '{NET_OUTPUT}'")
 
-    # 3) Gross emissions by country
-    gross_emissions = calculate_gross_emissions(records)
-    save_json(gross_emissions, GROSS_OUTPUT)
+    with profiler.stage("save:gross"):
+        save_json(gross_emissions, GROSS_OUTPUT, **save_options)
+        if group_index is not None:
+            save_json(group_gross, GROUP_GROSS_OUTPUT, **save_options)
     print(f"Saved gross emissions to '{GROSS_OUTPUT}'")
 
-    # 4) Subsector breakdown
-    subsector_data = build_subsector_breakdown(records)
-    save_json(subsector_data, BREAKDOWN_OUTPUT)
+    with profiler.stage("save:breakdown"):
+        save_json(subsector_data, BREAKDOWN_OUTPUT, **save_options)
+        if group_index is not None:
+            save_json(group_breakdown, GROUP_BREAKDOWN_OUTPUT, **save_options)
     print(f"Saved subsector breakdown to '{BREAKDOWN_OUTPUT}'")
+    if group_index is not None:
+        print(f"Saved rollups for {len(group_index.groups)} groups to "
+              f"'{GROUP_NET_OUTPUT}', '{GROUP_GROSS_OUTPUT}' and '{GROUP_BREAKDOWN_OUTPUT}'")
+
+    if gas_cube is not None:
+        with profiler.stage("save:gases"):
+            save_json(gas_cube.summary(gwp, basis), GAS_OUTPUT, **save_options)
+            gas_cube.save(GAS_CUBE_OUTPUT)
+        print(f"Saved totals for {len(gas_cube.gases)} gases ({', '.join(gas_cube.gases)}) to "
+              f"'{GAS_OUTPUT}' and '{GAS_CUBE_OUTPUT}'")
+
+    # 5) Rank and percentile tables for net, gross, every sector and subsector
+    with profiler.stage("aggregate:rankings"):
+        rankings = build_rankings(net_emissions, gross_emissions, subsector_data)
+    with profiler.stage("save:rankings"):
+        save_rankings(rankings, RANKINGS_OUTPUT)
+    print(f"Saved rankings for {len(rankings[1])} keys to '{RANKINGS_OUTPUT}'")
+
+    # 6) Optional monthly cube (streams the input once more; only rows with a period count)
+    if args.monthly:
+        monthly_rejected = Counter()
+        with profiler.stage("aggregate:monthly"):
+            cube = MonthlyCube.from_rows(iter_simplified_emissions(args.input), monthly_rejected)
+        if cube.num_months:
+            with profiler.stage("save:monthly"):
+                cube.save(MONTHLY_OUTPUT)
+            labels = cube.month_labels()
+            print(f"Saved {len(cube.countries)} countries x {cube.num_months} months "
+                  f"({labels[0]}..{labels[-1]}) to '{MONTHLY_OUTPUT}'")
+        else:
+            print(f"No monthly rows in '{args.input}' ({dict(monthly_rejected)}); retrievedata.py "
+                  f"fetches annual totals only, --monthly needs records with year/month from another export")
+
+    # 7) Optional SQLite store
+    if args.sqlite:
+        with profiler.stage("save:sqlite"):
+            if records is None:
+                # Streaming mode kept no records: stream the file a second time.
+                records = iter_valid_records(iter_simplified_emissions(args.input), Counter())
+            row_count = build_store(records, args.sqlite, year=args.year)
+        print(f"Saved {row_count} records to SQLite store '{args.sqlite}'")
+
+    profiler.print_summary()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Set CARBONLE_PROFILE=1 to turn profiling on without touching the command line.
+# Set CARBONLE_PROFILE_DIR=<dir> to also dump one .pstats file per stage.
+PROFILE_ENV = "CARBONLE_PROFILE"
+PROFILE_DIR_ENV = "CARBONLE_PROFILE_DIR"
+
+
+def profiling_requested(flag=False):
+    """
+    True if profiling was asked for either by a CLI flag or by the
+    CARBONLE_PROFILE environment variable ("1", "true", "yes", "on").
+    """
+    if flag:
+        return True
+    return os.getenv(PROFILE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class StageProfiler:
+    """
+    Wraps named pipeline stages with a wall-clock timer and tracemalloc
+    allocation tracking, and optionally a cProfile run per stage.
+
+    Usage:
+        profiler = StageProfiler(enabled=True, pstats_dir="profiles")
+        with profiler.stage("load"):
+            records = load_simplified_emissions(INPUT_FILE)
+        ...
+        profiler.print_summary()
+
+    When disabled, stage() is a no-op so callers never need to branch.
+    Each finished stage is stored as a dict:
+      {
+        "stage": "aggregate:net",
+        "seconds": 0.0123,
+        "alloc_bytes": 123456,   # net growth of traced memory over the stage
+        "peak_bytes": 234567,    # tracemalloc peak while the stage ran
+        "pstats_file": "profiles/aggregate_net.pstats" or None
+      }
+    """
+
+    def __init__(self, enabled=False, pstats_dir=None):
+        self.enabled = enabled
+        self.pstats_dir = pstats_dir
+        self.results = []
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+
+        profile = cProfile.Profile() if self.pstats_dir else None
+        start = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            after, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            pstats_file = None
+            if profile:
+                os.makedirs(self.pstats_dir, exist_ok=True)
+                safe_name = "".join(c if c.isalnum() else "_" for c in name)
+                pstats_file = os.path.join(self.pstats_dir, f"{safe_name}.pstats")
+                pstats.Stats(profile).dump_stats(pstats_file)
+
+            self.results.append({
+                "stage": name,
+                "seconds": elapsed,
+                "alloc_bytes": after - before,
+                "peak_bytes": peak - before,
+                "pstats_file": pstats_file,
+            })
+
+    def print_summary(self):
+        """ Prints a table of time and memory per stage (nothing if disabled). """
+        if not self.enabled or not self.results:
+            return
+
+        width = max(len("stage"), max(len(r["stage"]) for r in self.results))
+        total_seconds = sum(r["seconds"] for r in self.results)
+
+        print()
+        print(f"{'stage':<{width}}  {'time (s)':>10}  {'% time':>7}  {'alloc (MiB)':>12}  {'peak (MiB)':>11}")
+        print("-" * (width + 48))
+        for r in self.results:
+            share = 100.0 * r["seconds"] / total_seconds if total_seconds else 0.0
+            print(
+                f"{r['stage']:<{width}}  {r['seconds']:>10.4f}  {share:>6.1f}%  "
+                f"{r['alloc_bytes'] / 2**20:>12.2f}  {r['peak_bytes'] / 2**20:>11.2f}"
+            )
+        print("-" * (width + 48))
+        print(f"{'total':<{width}}  {total_seconds:>10.4f}")
+
+        dumped = [r["pstats_file"] for r in self.results if r["pstats_file"]]
+        if dumped:
+            print(f"\ncProfile stats written to '{self.pstats_dir}' "
+                  f"(inspect with: python -m pstats {dumped[0]})")
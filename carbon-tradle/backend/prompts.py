@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+# Prompts shared by hint_backend.py, fact_and_tip_backend.py and the batch
+# generator in batch_prompts.py, so single and batched requests stay in sync.
+
+MODEL = "o3-mini"  # Change to your desired model if needed.
+
+# Define your system prompt (developer message in this new interface)
+SYSTEM_PROMPT = """
+You are a helpful hint generator for a geography-based game focused on greenhouse gas emissions.
+When a user makes a guess for a country, provide a concise hint related to greenhouse gas emissions that helps them get closer to the actual target country without revealing the answer directly.
+Focus on aspects like emissions sources, comparisons to the guessed country, or climate-related policies of the target country.
+Avoid giving away the answer directly. Keep hints brief and helpful. Do not ever give the actual country name in the hint.
+"""
+
+FACT_SYSTEM_PROMPT = "You are a knowledgeable environmental educator."
+
+TIP_SYSTEM_PROMPT = "You are an expert in environmental policy and sustainability. Your goal is to provide actionable advice."
+
+# Served with a 503 when the model is unavailable (breaker open, queue full, deadline hit).
+FALLBACK_HINT = "Hints are busy right now. Compare the two treemaps: the target's largest sectors are your best clue."
+FALLBACK_FACT = "Fun facts are busy right now. Try again in a moment!"
+FALLBACK_TIP = "Small steps add up: walk, cycle or take public transport for short trips when you can."
+
+
+def hint_messages(guess, country):
+    return [
+        {"role": "developer", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"My guess is '{guess}' and the correct country is '{country}'. Can you provide a hint to help me get closer to the correct answer?"}
+    ]
+
+def fact_messages(subsector):
+    return [
+        {"role": "developer", "content": FACT_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Share a fun fact about the '{subsector}' sub-sector, particularly in the context of carbon emissions or environmental impact."}
+    ]
+
+def tip_messages(country, subsector, emissions_info):
+    return [
+        {"role": "developer", "content": TIP_SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            f"Country: {country}\n"
+            f"Sub-sector: {subsector}\n"
+            f"Emissions Data: {emissions_info}\n\n"
+            "Based on this information, provide a relevant and very short practical tip to a regular person that they can do in their daily life to help reduce waste, emissions, and greenhouse gases."
+        )}
+    ]
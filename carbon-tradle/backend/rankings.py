@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+# Output file written by process.py (numpy .npz archive)
+RANKINGS_OUTPUT = "rankings.npz"
+
+# Keys for the whole-country totals; sector and subsector keys use their own names,
+# e.g. "power" or "power/electricity-generation".
+NET_KEY = "net"
+GROSS_KEY = "gross"
+
+
+def build_value_matrix(net_emissions, gross_emissions, breakdown):
+    """
+    Lays every rankable quantity out as one dense matrix:
+      countries: sorted list of country codes            (rows)
+      keys:      ["net", "gross", <sector>..., <sector>/<subsector>...]  (columns)
+      values:    float64 array of shape (len(countries), len(keys)),
+                 NaN where a country has no value for that key
+    """
+    countries = sorted(set(net_emissions) | set(gross_emissions) | set(breakdown))
+    sector_keys = sorted({sector for sectors in breakdown.values() for sector in sectors})
+    subsector_keys = sorted({
+        f"{sector}/{subsector}"
+        for sectors in breakdown.values()
+        for sector, subsectors in sectors.items()
+        for subsector in subsectors
+        if subsector != "sectorTotal"
+    })
+    keys = [NET_KEY, GROSS_KEY] + sector_keys + subsector_keys
+    column = {key: i for i, key in enumerate(keys)}
+
+    values = np.full((len(countries), len(keys)), np.nan)
+    for row, country in enumerate(countries):
+        if country in net_emissions:
+            values[row, column[NET_KEY]] = net_emissions[country]
+        if country in gross_emissions:
+            values[row, column[GROSS_KEY]] = gross_emissions[country]
+        for sector, subsectors in breakdown.get(country, {}).items():
+            for subsector, emissions in subsectors.items():
+                if subsector == "sectorTotal":
+                    values[row, column[sector]] = emissions
+                else:
+                    values[row, column[f"{sector}/{subsector}"]] = emissions
+    return countries, keys, values
+
+
+def rank_columns(values):
+    """
+    Ranks every column at once (one argsort over the whole matrix).
+
+    Returns (ranks, percentiles):
+      ranks:       int16, 1 = highest emitter in that column, 0 = no value
+      percentiles: float32 in (0, 100), the mid-rank percentile among countries
+                   with a value: share strictly below plus half the ties
+                   (so a column of all zeros puts everyone at 50); NaN = no value
+    Ties get the best rank of their group, so equal emitters share a rank.
+    """
+    present = ~np.isnan(values)
+    # Sort descending with missing values pushed to the bottom.
+    sortable = np.where(present, values, -np.inf)
+    order = np.argsort(-sortable, axis=0, kind="stable")
+    sorted_values = np.take_along_axis(sortable, order, axis=0)
+
+    # Dense position -> tie-aware rank: a row starts a new rank only if its
+    # value differs from the row above it; the last row of a tie group gives
+    # the group's worst position.
+    num_rows = values.shape[0]
+    positions = np.broadcast_to(np.arange(1, num_rows + 1)[:, None], sorted_values.shape)
+    new_group = np.ones_like(sorted_values, dtype=bool)
+    new_group[1:] = sorted_values[1:] != sorted_values[:-1]
+    end_group = np.ones_like(sorted_values, dtype=bool)
+    end_group[:-1] = new_group[1:]
+    sorted_best = np.maximum.accumulate(np.where(new_group, positions, 0), axis=0)
+    sorted_worst = np.minimum.accumulate(np.where(end_group, positions, num_rows)[::-1], axis=0)[::-1]
+
+    best = np.empty_like(sorted_best)
+    worst = np.empty_like(sorted_worst)
+    np.put_along_axis(best, order, sorted_best, axis=0)
+    np.put_along_axis(worst, order, sorted_worst, axis=0)
+    ranks = np.where(present, best, 0).astype(np.int16)
+
+    counts = present.sum(axis=0)
+    below = counts - worst
+    ties = worst - best + 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentiles = 100.0 * (below + 0.5 * ties) / counts
+    percentiles = np.where(present, percentiles, np.nan).astype(np.float32)
+    return ranks, percentiles
+
+
+def build_rankings(net_emissions, gross_emissions, breakdown):
+    """ Returns (countries, keys, ranks, percentiles) for the process.py outputs. """
+    countries, keys, values = build_value_matrix(net_emissions, gross_emissions, breakdown)
+    ranks, percentiles = rank_columns(values)
+    return countries, keys, ranks, percentiles
+
+
+def save_rankings(rankings, filename=RANKINGS_OUTPUT):
+    """ Writes the rankings to a compressed .npz archive. """
+    countries, keys, ranks, percentiles = rankings
+    np.savez_compressed(
+        filename,
+        countries=np.array(countries),
+        keys=np.array(keys),
+        ranks=ranks,
+        percentiles=percentiles,
+    )
+
+
+class RankingTable:
+    """
+    O(1) lookups into a precomputed rankings.npz.
+
+    Usage:
+        table = RankingTable.load("rankings.npz")
+        table.rank("USA", "gross")                          # -> 2
+        table.percentile("USA", "power/electricity-generation")  # -> 99.2
+        table.top("manufacturing/cement", 5)                # -> ["CHN", "IND", ...]
+
+    Keys are "net", "gross", a sector name, or "<sector>/<subsector>".
+    rank() returns None and percentile() returns None when the country has no value.
+    """
+
+    def __init__(self, countries, keys, ranks, percentiles):
+        self.countries = list(countries)
+        self.keys = list(keys)
+        self.ranks = ranks
+        self.percentiles = percentiles
+        self._row = {country: i for i, country in enumerate(self.countries)}
+        self._column = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def load(cls, filename=RANKINGS_OUTPUT):
+        with np.load(filename) as archive:
+            return cls(
+                archive["countries"].tolist(),
+                archive["keys"].tolist(),
+                archive["ranks"],
+                archive["percentiles"],
+            )
+
+    def rank(self, country, key):
+        rank = int(self.ranks[self._row[country], self._column[key]])
+        return rank or None
+
+    def percentile(self, country, key):
+        value = float(self.percentiles[self._row[country], self._column[key]])
+        return None if np.isnan(value) else value
+
+    def in_top_fraction(self, country, fraction=0.1):
+        """ Every key where the country sits in the top fraction (e.g. 0.1 = top decile). """
+        row = self.percentiles[self._row[country]]
+        hits = np.nonzero(row >= 100.0 * (1.0 - fraction))[0]
+        return [self.keys[i] for i in hits]
+
+    def top(self, key, n=5):
+        """ The n best-ranked countries for a key, highest emitter first. """
+        column = self.ranks[:, self._column[key]]
+        ranked = np.nonzero(column)[0]
+        ranked = ranked[np.argsort(column[ranked], kind="stable")][:n]
+        return [self.countries[i] for i in ranked]
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+import numpy as np
+
+from serialization import dump_json
+
+# Inputs: the ClimateTRACE-derived outputs of process.py (tonnes CO2e, 2022)
+# and the Climate Watch table served to the frontend (MtCO2e, 1990-2021):
+#   ISO,Country,Data source,Sector,Gas,Unit,2021,2020,...,1990
+CLIMATE_WATCH_FILE = "../frontend/public/data/emissions.csv"
+NET_FILE           = "net_emissions.json"
+GROSS_FILE         = "gross_emissions.json"
+REPORT_OUTPUT      = "reconciliation_report.json"
+
+CLIMATETRACE_YEAR = 2022
+TONNES_PER_MT = 1e6
+WORLD_ISO = "WORLD"
+
+# Which Climate Watch series each ClimateTRACE output is compared with.
+# Net includes land-use sinks; gross (positive sources only) is closest to
+# the total without land use.
+COMPARISONS = {
+    "net":   (NET_FILE,   "Total including LUCF"),
+    "gross": (GROSS_FILE, "Total excluding LUCF"),
+}
+
+# A country is an outlier if ClimateTRACE / Climate Watch (latest year) is
+# outside [1 / RATIO_LIMIT, RATIO_LIMIT], if its log ratio is more than
+# ROBUST_Z_LIMIT robust z-scores from the median country, or if the two
+# sources disagree on the sign. Countries under MIN_MT in both sources are
+# too small for ratios to mean much and are never flagged.
+RATIO_LIMIT = 2.0
+ROBUST_Z_LIMIT = 3.5
+MIN_MT = 1.0
+
+
+# =============================================================================
+# 1. LOADING
+# =============================================================================
+
+def load_climate_watch(filename=CLIMATE_WATCH_FILE, sectors=None):
+    """
+    Reads emissions.csv into dense arrays:
+      isos:   list of ISO3 codes (rows, including aggregates such as WORLD)
+      names:  { iso: country name }
+      years:  int array, ascending
+      series: { sector: float64 array (len(isos), len(years)) in MtCO2e, NaN for "N/A" }
+    """
+    sectors = set(sectors or [sector for _, sector in COMPARISONS.values()])
+    with open(filename, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        year_columns = [i for i, name in enumerate(header) if name.isdigit()]
+        order = np.argsort([int(header[i]) for i in year_columns])
+        years = np.array([int(header[i]) for i in year_columns])[order]
+        iso_col, name_col, sector_col = header.index("ISO"), header.index("Country"), header.index("Sector")
+
+        isos, names, cells = [], {}, {sector: {} for sector in sectors}
+        for row in reader:
+            sector = row[sector_col]
+            if sector not in cells:
+                continue
+            iso = row[iso_col]
+            if iso not in names:
+                names[iso] = row[name_col]
+                isos.append(iso)
+            cells[sector][iso] = [row[i] for i in year_columns]
+
+    row_of = {iso: i for i, iso in enumerate(isos)}
+    series = {}
+    for sector, by_iso in cells.items():
+        # "N/A" and blanks become NaN in one vectorized conversion.
+        table = np.full((len(isos), len(years)), "nan", dtype=object)
+        for iso, values in by_iso.items():
+            table[row_of[iso]] = [v if v not in ("", "N/A") else "nan" for v in values]
+        series[sector] = table.astype(np.float64)[:, order]
+    return isos, names, years, series
+
+def load_climatetrace(filename):
+    """ { iso: tonnes CO2e } from net_emissions.json / gross_emissions.json """
+    with open(filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# =============================================================================
+# 2. RECONCILIATION
+# =============================================================================
+
+def latest_values(matrix, years):
+    """ Per row, the most recent non-NaN value and its year (NaN / 0 if a row is empty). """
+    present = ~np.isnan(matrix)
+    last = matrix.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+    has_any = present.any(axis=1)
+    values = np.where(has_any, matrix[np.arange(matrix.shape[0]), last], np.nan)
+    return values, np.where(has_any, years[last], 0)
+
+def reconcile(climatetrace, isos, matrix, years,
+              ratio_limit=RATIO_LIMIT, z_limit=ROBUST_Z_LIMIT, min_mt=MIN_MT):
+    """
+    Compares one ClimateTRACE output ({ iso: tonnes }) with one Climate Watch
+    series (matrix, MtCO2e) for every joined country and every year at once.
+
+    Returns a dict of arrays over the joined countries:
+      isos, climatetrace (Mt), climate_watch / year (latest CW value),
+      ratio (CT / latest CW), ratios (CT / CW for every year),
+      log_ratio, robust_z, in_range (CT within CW's min..max over all years),
+      closest_year, outlier (bool), reason (str)
+    plus the joined / only-in-one-source code lists and the median ratio.
+    """
+    row_of = {iso: i for i, iso in enumerate(isos)}
+    joined = sorted(iso for iso in climatetrace if iso in row_of)
+    rows = np.array([row_of[iso] for iso in joined], dtype=np.intp)
+
+    ct = np.array([climatetrace[iso] for iso in joined], dtype=np.float64) / TONNES_PER_MT
+    cw = matrix[rows]
+    latest, latest_year = latest_values(cw, years)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = ct[:, None] / cw
+        ratio = ct / latest
+        log_ratio = np.log(ratio)
+
+    small = (np.abs(ct) < min_mt) & (np.abs(latest) < min_mt)
+    sign_mismatch = (ct * latest < 0) & ~small
+    usable = np.isfinite(log_ratio) & ~small
+
+    median = np.median(log_ratio[usable]) if usable.any() else 0.0
+    mad = np.median(np.abs(log_ratio[usable] - median)) if usable.any() else 0.0
+    robust_z = np.zeros_like(ct)
+    if mad > 0:
+        robust_z[usable] = 0.6745 * (log_ratio[usable] - median) / mad
+
+    far = usable & (np.abs(log_ratio) > np.log(ratio_limit))
+    unusual = usable & (np.abs(robust_z) > z_limit)
+    outlier = sign_mismatch | far | unusual
+    reason = np.where(sign_mismatch, "sign-mismatch",
+             np.where(far, "ratio", np.where(unusual, "robust-z", "")))
+
+    missing = np.isnan(cw)
+    in_range = (ct >= np.where(missing, np.inf, cw).min(axis=1)) & (ct <= np.where(missing, -np.inf, cw).max(axis=1))
+    closest = np.argmin(np.where(missing, np.inf, np.abs(cw - ct[:, None])), axis=1)
+
+    return {
+        "isos": joined,
+        "only_climatetrace": sorted(set(climatetrace) - set(row_of)),
+        "only_climate_watch": sorted(set(isos) - set(climatetrace) - {WORLD_ISO}),
+        "climatetrace": ct,
+        "climate_watch": latest,
+        "year": latest_year,
+        "ratio": ratio,
+        "ratios": ratios,
+        "log_ratio": log_ratio,
+        "robust_z": robust_z,
+        "in_range": in_range,
+        "closest_year": years[closest],
+        "outlier": outlier,
+        "reason": reason,
+        "median_ratio": float(np.exp(median)),
+    }
+
+
+# =============================================================================
+# 3. REPORT
+# =============================================================================
+
+def _number(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+def summarize(result, names, world_cw=None):
+    """ The compact, JSON-ready report section for one comparison. """
+    order = np.argsort(-np.abs(result["robust_z"]))
+    outliers = []
+    for i in order:
+        if not result["outlier"][i]:
+            continue
+        iso = result["isos"][i]
+        row_ratios = result["ratios"][i]
+        finite = row_ratios[np.isfinite(row_ratios)]
+        outliers.append({
+            "iso": iso,
+            "name": names.get(iso, iso),
+            "reason": str(result["reason"][i]),
+            "climatetrace": _number(result["climatetrace"][i]),
+            "climate_watch": _number(result["climate_watch"][i]),
+            "year": int(result["year"][i]),
+            "ratio": _number(result["ratio"][i]),
+            "robust_z": _number(result["robust_z"][i]),
+            "ratio_range": [_number(finite.min()), _number(finite.max())] if finite.size else None,
+            "closest_year": int(result["closest_year"][i]),
+        })
+
+    world_ct = float(result["climatetrace"].sum())
+    section = {
+        "joined": len(result["isos"]),
+        "only_climatetrace": result["only_climatetrace"],
+        "only_climate_watch": result["only_climate_watch"],
+        "median_ratio": result["median_ratio"],
+        "in_range": int(result["in_range"].sum()),
+        "world": {
+            "climatetrace": world_ct,
+            "climate_watch": _number(world_cw) if world_cw is not None else None,
+            "ratio": _number(world_ct / world_cw) if world_cw else None,
+        },
+        "outlier_count": len(outliers),
+        "outliers": outliers,
+        "ratios": {iso: _number(r) for iso, r in zip(result["isos"], result["ratio"])},
+    }
+    return section
+
+def build_report(climate_watch_file=CLIMATE_WATCH_FILE, inputs=None,
+                 ratio_limit=RATIO_LIMIT, z_limit=ROBUST_Z_LIMIT, min_mt=MIN_MT):
+    """
+    Runs every comparison in COMPARISONS. inputs overrides the ClimateTRACE
+    file per measure, e.g. { "net": "other_net.json" }.
+    """
+    inputs = inputs or {}
+    isos, names, years, series = load_climate_watch(climate_watch_file)
+    report = {
+        "climatetrace_year": CLIMATETRACE_YEAR,
+        "climate_watch_years": [int(years[0]), int(years[-1])],
+        "unit": "MtCO2e",
+        "limits": {"ratio": ratio_limit, "robust_z": z_limit, "min_mt": min_mt},
+        "measures": {},
+    }
+    for measure, (default_file, sector) in COMPARISONS.items():
+        climatetrace = load_climatetrace(inputs.get(measure, default_file))
+        result = reconcile(climatetrace, isos, series[sector], years, ratio_limit, z_limit, min_mt)
+        world_cw = None
+        if WORLD_ISO in isos:
+            world_cw = latest_values(series[sector][[isos.index(WORLD_ISO)]], years)[0][0]
+        report["measures"][measure] = {"compared_with": sector, **summarize(result, names, world_cw)}
+    return report
+
+def print_report(report):
+    for measure, section in report["measures"].items():
+        world_ratio = section["world"]["ratio"]
+        world_ratio = f"{world_ratio:.2f}" if world_ratio is not None else "n/a"
+        print(f"{measure} vs '{section['compared_with']}': {section['joined']} countries joined, "
+              f"median ratio {section['median_ratio']:.2f}, world ratio {world_ratio}")
+        if section["only_climatetrace"] or section["only_climate_watch"]:
+            print(f"  only in ClimateTRACE: {section['only_climatetrace']}")
+            print(f"  only in Climate Watch: {section['only_climate_watch']}")
+        print(f"  {section['outlier_count']} outlier(s)")
+        for o in section["outliers"][:10]:
+            ratio = f"{o['ratio']:.2f}" if o["ratio"] is not None else "n/a"
+            print(f"    {o['iso']} {o['name']}: {o['climatetrace']:.1f} vs {o['climate_watch']:.1f} Mt "
+                  f"({o['year']}), ratio {ratio} [{o['reason']}]")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Reconcile ClimateTRACE net/gross outputs against Climate Watch emissions.csv."
+    )
+    parser.add_argument("--climate-watch", default=CLIMATE_WATCH_FILE)
+    parser.add_argument("--net", default=NET_FILE)
+    parser.add_argument("--gross", default=GROSS_FILE)
+    parser.add_argument("--output", default=REPORT_OUTPUT)
+    parser.add_argument("--ratio-limit", type=float, default=RATIO_LIMIT)
+    parser.add_argument("--z-limit", type=float, default=ROBUST_Z_LIMIT)
+    parser.add_argument("--min-mt", type=float, default=MIN_MT)
+    parser.add_argument("--max-outliers", type=int, default=None,
+                        help="Exit with status 1 if any measure has more outliers than this (for gating refreshes)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = build_report(args.climate_watch, {"net": args.net, "gross": args.gross},
+                          args.ratio_limit, args.z_limit, args.min_mt)
+    dump_json(report, args.output, compact=True, float_digits=4)
+    elapsed = time.perf_counter() - start
+
+    print_report(report)
+    print(f"\nWrote '{args.output}' in {elapsed * 1000:.0f} ms")
+
+    if args.max_outliers is not None:
+        worst = max(section["outlier_count"] for section in report["measures"].values())
+        if worst > args.max_outliers:
+            print(f"FAILED: {worst} outliers > --max-outliers {args.max_outliers}")
+            sys.exit(1)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import math
+import sys
+from collections import Counter
+from typing import NamedTuple
+
+from taxonomy import PARENT_MAPPING
+
+# Rejection reasons counted by validate_records()
+REJECT_NOT_AN_OBJECT       = "not-an-object"
+REJECT_MISSING_COUNTRY     = "missing-country"
+REJECT_MISSING_SUBSECTOR   = "missing-subsector"
+REJECT_UNKNOWN_SUBSECTOR   = "unknown-subsector"
+REJECT_SECTOR_MISMATCH     = "sector-mismatch"
+REJECT_MISSING_EMISSIONS   = "missing-emissions"
+REJECT_BAD_EMISSIONS       = "non-numeric-emissions"
+REJECT_NONFINITE_EMISSIONS = "non-finite-emissions"
+REJECT_OTHER_GAS           = "other-gas"
+REJECT_MONTHLY_ROW         = "monthly-row"   # see validate_record's monthly flag
+
+# Rows without a "gas" are ClimateTRACE's default, CO2e over 100 years.
+# Rows for any other gas would be double-counted by the CO2e totals, so
+# validate_record rejects them; gases.GasCube (process.py --multi-gas)
+# ingests them instead.
+BASIS_GAS = "co2e_100yr"
+
+
+class EmissionRecord(NamedTuple):
+    """
+    One validated row of simplified_emissions.json. Fields are guaranteed:
+      country    upper-case, interned code, e.g. "USA"
+      sector     interned parent sector of subsector (per PARENT_MAPPING)
+      subsector  interned, known subsector, e.g. "electricity-generation"
+      emissions  finite float (may be negative, e.g. forest sinks)
+
+    NamedTuples have no per-instance __dict__, and aggregators can unpack
+    them directly: for country, sector, subsector, emissions in records.
+    """
+    country: str
+    sector: str
+    subsector: str
+    emissions: float
+
+
+def coerce_emissions(value):
+    """
+    Returns (float, None) or (None, rejection reason).
+    Ints, floats and numeric strings ("1,234.5") are accepted; bools are not.
+    """
+    if value is None or value == "":
+        return None, REJECT_MISSING_EMISSIONS
+    if isinstance(value, bool):
+        return None, REJECT_BAD_EMISSIONS
+    if isinstance(value, str):
+        value = value.replace(",", "").strip()
+    try:
+        emissions = float(value)
+    except (TypeError, ValueError):
+        return None, REJECT_BAD_EMISSIONS
+    if not math.isfinite(emissions):
+        return None, REJECT_NONFINITE_EMISSIONS
+    return emissions, None
+
+def validate_record(row, parent_mapping=PARENT_MAPPING, gas=BASIS_GAS, monthly=False):
+    """
+    Validates and coerces one raw row.
+    Returns (EmissionRecord, None) or (None, rejection reason).
+
+    A missing or "unknown" sector is filled in from the subsector; a sector
+    that contradicts PARENT_MAPPING is rejected rather than silently trusted.
+    Rows whose "gas" is not the given gas (default BASIS_GAS) are rejected.
+    So are rows with a "month" unless monthly=True: a month of a year that
+    annual rows already cover would be double-counted by the annual totals,
+    so only monthly.MonthlyCube (process.py --monthly) accepts them.
+    """
+    if not isinstance(row, dict):
+        return None, REJECT_NOT_AN_OBJECT
+    if row.get("gas", gas) != gas:
+        return None, REJECT_OTHER_GAS
+    if not monthly and row.get("month") is not None:
+        return None, REJECT_MONTHLY_ROW
+
+    country = row.get("country")
+    if not isinstance(country, str) or not country.strip():
+        return None, REJECT_MISSING_COUNTRY
+
+    subsector = row.get("subsector")
+    if not isinstance(subsector, str) or not subsector.strip():
+        return None, REJECT_MISSING_SUBSECTOR
+    subsector = subsector.strip()
+    parent = parent_mapping.get(subsector)
+    if parent is None:
+        return None, REJECT_UNKNOWN_SUBSECTOR
+
+    sector = row.get("sector")
+    if sector not in (None, "", "unknown", parent):
+        return None, REJECT_SECTOR_MISMATCH
+
+    emissions, problem = coerce_emissions(row.get("emissions"))
+    if problem:
+        return None, problem
+
+    return EmissionRecord(
+        sys.intern(country.strip().upper()),
+        sys.intern(parent),
+        sys.intern(subsector),
+        emissions,
+    ), None
+
+def iter_valid_records(rows, rejected, parent_mapping=PARENT_MAPPING):
+    """
+    Streaming form of validate_records: yields each valid EmissionRecord as
+    rows (any iterable, e.g. json_stream.iter_json_array) are consumed, and
+    counts rejections into rejected (a Counter).
+    """
+    for row in rows:
+        record, problem = validate_record(row, parent_mapping)
+        if problem:
+            rejected[problem] += 1
+        else:
+            yield record
+
+def validate_records(rows, parent_mapping=PARENT_MAPPING):
+    """
+    Validates every raw row once, at ingestion.
+    :return: (list of EmissionRecord, Counter { reason: rejected row count })
+    """
+    rejected = Counter()
+    records = list(iter_valid_records(rows, rejected, parent_mapping))
+    return records, rejected
+
+def print_rejections(rejected, total):
+    """ Summary of validate_records' rejections, e.g. after loading a file. """
+    if not rejected:
+        print(f"Validated {total} records, none rejected.")
+        return
+    print(f"Validated {total} records, rejected {sum(rejected.values())}:")
+    for reason, count in rejected.most_common():
+        print(f"  {reason}: {count}")
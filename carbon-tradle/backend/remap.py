@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import process
+from data_plane import SNAPSHOT_FILE, build_snapshot
+from records import BASIS_GAS
+from retrievedata import (
+    COMPACT_OUTPUT,
+    KEEP_GAS,
+    OUTPUT_COMPRESS,
+    OUTPUT_FILE,
+    OUTPUT_FLOAT_DIGITS,
+    RAW_OUTPUT,
+    REQUESTED_GASES,
+    simplify_data,
+)
+from serialization import compact_requested, dump_json
+from taxonomy import TAXONOMY_FINGERPRINT, map_subsector_to_sector
+
+# Re-applies taxonomy.PARENT_MAPPING to records already on disk and rebuilds
+# every derived output, with no API calls:
+#   python remap.py                       # re-map, then run process.py
+#   python remap.py --dry-run             # only report which rows would move
+#   python remap.py -- --stream --sqlite  # extra process.py arguments after "--"
+#
+# The source is RAW_OUTPUT (the API responses retrievedata.py stores) when it
+# exists, else the simplified records themselves: a row's sector is a pure
+# function of its subsector, so either is enough. process.py --monthly and
+# --multi-gas are added when the records carry periods or several gases, and
+# the data plane snapshot is rebuilt if there is one.
+
+
+def remap_rows(rows, moved):
+    """
+    Yields simplified rows with "sector" re-derived from "subsector".
+    moved (a Counter) counts changed rows per (subsector, old sector, new sector).
+    Rows that are not objects or have no subsector pass through untouched
+    (process.py's validation rejects them as before).
+    """
+    for row in rows:
+        if isinstance(row, dict) and isinstance(row.get("subsector"), str):
+            sector = map_subsector_to_sector(row["subsector"].strip())
+            if row.get("sector") != sector:
+                moved[(row["subsector"], row.get("sector"), sector)] += 1
+                row = dict(row, sector=sector)
+        yield row
+
+def load_source(raw_file, simplified_file, keep_gas):
+    """
+    Returns (rows re-mapped with the current taxonomy, Counter of moves, source file).
+    Moves are measured against the current simplified file when there is one.
+    """
+    moved = Counter()
+    if raw_file and os.path.exists(raw_file):
+        with open(raw_file, "r", encoding="utf-8") as f:
+            rows = simplify_data(json.load(f), keep_gas=keep_gas)
+        if os.path.exists(simplified_file):
+            for _ in remap_rows(process.iter_simplified_emissions(simplified_file), moved):
+                pass
+        return rows, moved, raw_file
+
+    rows = list(remap_rows(process.load_simplified_emissions(simplified_file), moved))
+    return rows, moved, simplified_file
+
+def process_arguments(rows, output, extra):
+    """ process.py argv for the re-mapped file, switching on the passes its rows need. """
+    argv = ["--input", output]
+    if any(row.get("month") is not None for row in rows if isinstance(row, dict)) and "--monthly" not in extra:
+        argv.append("--monthly")
+    if any(row.get("gas", BASIS_GAS) != BASIS_GAS for row in rows if isinstance(row, dict)) \
+            and "--multi-gas" not in extra:
+        argv.append("--multi-gas")
+    return argv + list(extra)
+
+def print_moves(moved):
+    if not moved:
+        print("No rows change sector.")
+        return
+    print(f"{sum(moved.values())} rows change sector:")
+    for (subsector, old, new), count in sorted(moved.items()):
+        print(f"  {subsector}: {old} -> {new} ({count} rows)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Re-map stored records to the current taxonomy and rebuild all outputs offline.",
+        epilog="Arguments after '--' are passed to process.py.",
+    )
+    parser.add_argument("--raw", default=RAW_OUTPUT,
+                        help=f"Stored API responses to re-simplify (default: {RAW_OUTPUT}; "
+                             "falls back to the simplified records if missing)")
+    parser.add_argument("--simplified", default=OUTPUT_FILE,
+                        help=f"Simplified records to rewrite (default: {OUTPUT_FILE})")
+    parser.add_argument("--dry-run", action="store_true", help="Report the moves without writing anything")
+    parser.add_argument("--no-process", action="store_true", help="Rewrite the records but skip process.py")
+    argv = sys.argv[1:] if argv is None else list(argv)
+    extra = []
+    if "--" in argv:
+        argv, extra = argv[:argv.index("--")], argv[argv.index("--") + 1:]
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows, moved, source = load_source(args.raw, args.simplified, KEEP_GAS or bool(REQUESTED_GASES))
+    print(f"Re-mapped {len(rows)} records from '{source}' with taxonomy {TAXONOMY_FINGERPRINT}.")
+    print_moves(moved)
+    if args.dry_run:
+        return
+
+    dump_json(
+        rows,
+        args.simplified,
+        compact=compact_requested(COMPACT_OUTPUT),
+        float_digits=OUTPUT_FLOAT_DIGITS,
+        compress=OUTPUT_COMPRESS,
+    )
+    print(f"Wrote '{args.simplified}'")
+
+    if not args.no_process:
+        process.main(process_arguments(rows, args.simplified, extra))
+        if os.path.exists(SNAPSHOT_FILE):
+            count = build_snapshot(SNAPSHOT_FILE)
+            print(f"Rebuilt '{SNAPSHOT_FILE}' ({count} countries)")
+
+    print(f"Done in {time.perf_counter() - start:.2f}s, no API calls.")
+
+if __name__ == "__main__":
+    main()
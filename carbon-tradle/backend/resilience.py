@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from types import SimpleNamespace
+
+
+class ServiceUnavailable(Exception):
+    """ The model can't be asked right now; callers should answer 503 / fallback content. """
+    retry_after = 1
+
+
+class Overloaded(ServiceUnavailable):
+    """ Too many calls in flight and queued; the request was shed immediately. """
+
+
+class CircuitOpen(ServiceUnavailable):
+    """ Recent calls kept failing; the breaker is open and no call was made. """
+
+
+class DeadlineExceeded(ServiceUnavailable):
+    """ The model did not answer within the per-call deadline. """
+
+
+def trips_breaker(error):
+    """
+    Whether a failed call says something about the provider's health:
+    timeouts, connection errors, 429 and 5xx do; other 4xx (a bad request,
+    bad credentials) are our own mistakes and leave the breaker alone.
+    """
+    status = getattr(error, "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker:
+      closed     calls flow; failure_threshold consecutive failures open it
+      open       calls are refused until reset_timeout seconds have passed
+      half_open  one trial call is let through; success closes, failure reopens
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = self.clock()
+
+    def release_trial(self):
+        """ Gives back a half-open trial that was granted but never used. """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def retry_after(self):
+        """ Seconds until the breaker will let a trial call through (0 if not open). """
+        with self._lock:
+            if self.state != "open":
+                return 0
+            return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+
+class ResilientClient:
+    """
+    Wraps an OpenAI-style client (client.chat.completions.create) with:
+      - a per-call deadline (also passed to the client as timeout=)
+      - at most max_concurrent calls running and max_queue waiting; anything
+        beyond that raises Overloaded at once instead of piling up
+      - a CircuitBreaker that fails fast with CircuitOpen after repeated errors
+
+    It exposes the same chat.completions.create interface, so it can replace
+    the raw client in the backends. stats() reports breaker state and queue
+    depth for monitoring.
+
+    With stream=True the result is a GuardedStream: the concurrency slot is
+    held and the deadline runs until the token stream is used up or closed,
+    and the breaker hears the outcome only then.
+    """
+
+    def __init__(self, client, deadline=20.0, max_concurrent=8, max_queue=32, breaker=None):
+        self.client = client
+        self.deadline = deadline
+        self.capacity = max_concurrent + max_queue
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="model-call")
+        self._max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._counters = {"calls": 0, "succeeded": 0, "failed": 0, "client_errors": 0, "timed_out": 0,
+                          "shed": 0, "rejected_open": 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._counters[name] += delta
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._outstanding -= 1
+        self._slots.release()
+
+    def _release_abandoned(self, future):
+        """ Done callback for a streamed call that timed out: nobody will read its stream. """
+        if not future.cancelled() and future.exception() is None:
+            close = getattr(future.result(), "close", None)
+            if close is not None:
+                close()
+        self._release()
+
+    def _record(self, error=None):
+        """ Counts a finished call and tells the breaker. """
+        if error is None:
+            self._count("succeeded")
+            self.breaker.record_success()
+        elif isinstance(error, DeadlineExceeded):
+            self._count("timed_out")
+            self.breaker.record_failure()
+        elif trips_breaker(error):
+            self._count("failed")
+            self.breaker.record_failure()
+        else:
+            self._count("client_errors")
+            self.breaker.release_trial()
+
+    def create(self, **kwargs):
+        if not self.breaker.allow():
+            self._count("rejected_open")
+            error = CircuitOpen("model circuit breaker is open")
+            error.retry_after = max(1, round(self.breaker.retry_after()))
+            raise error
+
+        if not self._slots.acquire(blocking=False):
+            self._count("shed")
+            # Shedding isn't the provider's fault, so it doesn't count towards the breaker,
+            # but a half-open trial we were granted must be handed back.
+            self.breaker.release_trial()
+            raise Overloaded(f"model queue is full ({self.capacity} calls outstanding)")
+
+        with self._lock:
+            self._outstanding += 1
+            self._counters["calls"] += 1
+        kwargs.setdefault("timeout", self.deadline)
+        stream = bool(kwargs.get("stream"))
+        started = time.monotonic()
+        # The slot is only freed when the underlying call really finishes, so
+        # abandoned (timed out) calls still count against capacity. A stream
+        # keeps it until it has been read (see GuardedStream).
+        future = self._executor.submit(self.client.chat.completions.create, **kwargs)
+        if not stream:
+            future.add_done_callback(self._release)
+
+        try:
+            result = future.result(timeout=self.deadline)
+        except FutureTimeout:
+            if stream:
+                future.add_done_callback(self._release_abandoned)
+            error = DeadlineExceeded(f"model did not answer within {self.deadline:g}s")
+            self._record(error)
+            raise error
+        except Exception as e:
+            if stream:
+                self._release()
+            self._record(e)
+            raise
+
+        if stream:
+            return GuardedStream(result, self, started)
+        self._record()
+        return result
+
+    def stats(self):
+        with self._lock:
+            outstanding = self._outstanding
+            counters = dict(self._counters)
+        return {
+            "breaker": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.consecutive_failures,
+                "retry_after": self.breaker.retry_after(),
+            },
+            "in_flight": min(outstanding, self._max_concurrent),
+            "queued": max(0, outstanding - self._max_concurrent),
+            "capacity": self.capacity,
+            "deadline": self.deadline,
+            **counters,
+        }
+
+
+class GuardedStream:
+    """
+    Iterates a streamed response for ResilientClient.create. The call's slot
+    is given back when the stream ends, fails, runs past the deadline or is
+    closed early; only then is the outcome counted (an early close, e.g. the
+    client went away, counts as neither success nor failure).
+    """
+
+    def __init__(self, stream, owner, started):
+        self._stream = stream
+        self._chunks = iter(stream)
+        self._owner = owner
+        self._started = started
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        if time.monotonic() - self._started > self._owner.deadline:
+            error = DeadlineExceeded(f"model did not finish streaming within {self._owner.deadline:g}s")
+            self._finish(error)
+            raise error
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._finish(e)
+            raise
+
+    def close(self):
+        if not self._done:
+            self._finish(closed=True)
+
+    def _finish(self, error=None, closed=False):
+        self._done = True
+        if error is not None or closed:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        self._owner._release()
+        if closed:
+            self._owner.breaker.release_trial()
+        else:
+            self._owner._record(error)
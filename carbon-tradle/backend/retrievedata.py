@@ -1,204 +1,21 @@
 #!/usr/bin/env python3
 
 import requests
-import json
-import math
+import os
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+from http_cache import DEFAULT_CACHE_DIR, CachedSession
+from serialization import compact_requested, dump_json
+from taxonomy import ALL_SECTORS, ALL_SUBSECTORS, PARENT_MAPPING, map_subsector_to_sector
 
 # =============================================================================
 # 1. DEFINITIONS
 # =============================================================================
 
-# Your new parent mapping dictionary
-#!/usr/bin/env python3
-
-# 1) TOP-LEVEL SECTORS
-ALL_SECTORS = [
-    "fluorinated-gases",
-    "waste",
-    "transportation",
-    "fossil-fuel-operations",
-    "agriculture",
-    "power",
-    "forestry-and-land-use",
-    "buildings",
-    "manufacturing",
-    "mineral-extraction"
-]
-
-# 2) ALL SUBSECTORS
-ALL_SUBSECTORS = [
-    "aluminum",
-    "bauxite-mining",
-    "biological-treatment-of-solid-waste-and-biogenic",
-    "cement",
-    "chemicals",
-    "coal-mining",
-    "copper-mining",
-    "cropland-fires",
-    "crop-residues",
-    "domestic-aviation",
-    "domestic-shipping",
-    "domestic-shipping-ship",
-    "domestic-wastewater-treatment-and-discharge",
-    "electricity-generation",
-    "enteric-fermentation-cattle-operation",
-    "enteric-fermentation-cattle-pasture",
-    "enteric-fermentation-other",
-    "fluorinated-gases",
-    "food-beverage-tobacco",
-    "forest-land-clearing",
-    "forest-land-degradation",
-    "forest-land-fires",
-    "glass",
-    "heat-plants",
-    "incineration-and-open-burning-of-waste",
-    "industrial-wastewater-treatment-and-discharge",
-    "international-aviation",
-    "international-shipping",
-    "international-shipping-ship",
-    "iron-and-steel",
-    "iron-mining",
-    "lime",
-    "manure-applied-to-soils",
-    "manure-left-on-pasture-cattle",
-    "manure-management-cattle-operation",
-    "manure-management-other",
-    "net-forest-land",
-    "net-shrubgrass",
-    "net-wetland",
-    "non-residential-onsite-fuel-usage",
-    "oil-and-gas-production",
-    "oil-and-gas-refining",
-    "oil-and-gas-transport",
-    "other-agricultural-soil-emissions",
-    "other-chemicals",
-    "other-energy-use",
-    "other-fossil-fuel-operations",
-    "other-manufacturing",
-    "other-metals",
-    "other-mining-quarrying",
-    "other-onsite-fuel-usage",
-    "other-transport",
-    "petrochemical-steam-cracking",
-    "pulp-and-paper",
-    "railways",
-    "removals",
-    "residential-onsite-fuel-usage",
-    "rice-cultivation",
-    "road-transportation",
-    "road-transportation-road-segment",
-    "rock-quarrying",
-    "sand-quarrying",
-    "shrubgrass-fires",
-    "soil-organic-carbon",
-    "solid-fuel-transformation",
-    "solid-waste-disposal",
-    "synthetic-fertilizer-application",
-    "textiles-leather-apparel",
-    "water-reservoirs",
-    "wetland-fires",
-    "wood-and-wood-products"
-]
-
-# 3) PARENT MAPPING: SUBSECTOR -> ONE OF THE TEN SECTORS
-PARENT_MAPPING = {
-    # manufacturing
-    "aluminum": "manufacturing",
-    "cement": "manufacturing",
-    "chemicals": "manufacturing",
-    "food-beverage-tobacco": "manufacturing",
-    "glass": "manufacturing",
-    "iron-and-steel": "manufacturing",
-    "other-chemicals": "manufacturing",
-    "other-energy-use": "manufacturing",
-    "other-manufacturing": "manufacturing",
-    "other-metals": "manufacturing",
-    "petrochemical-steam-cracking": "manufacturing",
-    "pulp-and-paper": "manufacturing",
-    "textiles-leather-apparel": "manufacturing",
-
-    # mineral-extraction
-    "bauxite-mining": "mineral-extraction",
-    "copper-mining": "mineral-extraction",
-    "iron-mining": "mineral-extraction",
-    "lime": "mineral-extraction",
-    "other-mining-quarrying": "mineral-extraction",
-    "rock-quarrying": "mineral-extraction",
-    "sand-quarrying": "mineral-extraction",
-
-    # power
-    "electricity-generation": "power",
-    "heat-plants": "power",
-    "solid-fuel-transformation": "power",
-
-    # transportation
-    "domestic-aviation": "transportation",
-    "domestic-shipping": "transportation",
-    "domestic-shipping-ship": "transportation",
-    "international-aviation": "transportation",
-    "international-shipping": "transportation",
-    "international-shipping-ship": "transportation",
-    "other-transport": "transportation",
-    "railways": "transportation",
-    "road-transportation": "transportation",
-    "road-transportation-road-segment": "transportation",
-
-    # fossil-fuel-operations
-    "coal-mining": "fossil-fuel-operations",
-    "oil-and-gas-production": "fossil-fuel-operations",
-    "oil-and-gas-refining": "fossil-fuel-operations",
-    "oil-and-gas-transport": "fossil-fuel-operations",
-    "other-fossil-fuel-operations": "fossil-fuel-operations",
-
-    # agriculture
-    "cropland-fires": "agriculture",
-    "crop-residues": "agriculture",
-    "enteric-fermentation-cattle-operation": "agriculture",
-    "enteric-fermentation-cattle-pasture": "agriculture",
-    "enteric-fermentation-other": "agriculture",
-    "manure-applied-to-soils": "agriculture",
-    "manure-left-on-pasture-cattle": "agriculture",
-    "manure-management-cattle-operation": "agriculture",
-    "manure-management-other": "agriculture",
-    "other-agricultural-soil-emissions": "agriculture",
-    "rice-cultivation": "agriculture",
-    "synthetic-fertilizer-application": "agriculture",
-
-    # forestry-and-land-use
-    "forest-land-clearing": "forestry-and-land-use",
-    "forest-land-degradation": "forestry-and-land-use",
-    "forest-land-fires": "forestry-and-land-use",
-    "net-forest-land": "forestry-and-land-use",
-    "net-shrubgrass": "forestry-and-land-use",
-    "net-wetland": "forestry-and-land-use",
-    "removals": "forestry-and-land-use",
-    "shrubgrass-fires": "forestry-and-land-use",
-    "soil-organic-carbon": "forestry-and-land-use",
-    "water-reservoirs": "forestry-and-land-use",
-    "wetland-fires": "forestry-and-land-use",
-    "wood-and-wood-products": "forestry-and-land-use",
-
-    # buildings
-    "non-residential-onsite-fuel-usage": "buildings",
-    "other-onsite-fuel-usage": "buildings",
-    "residential-onsite-fuel-usage": "buildings",
-
-    # waste
-    "biological-treatment-of-solid-waste-and-biogenic": "waste",
-    "domestic-wastewater-treatment-and-discharge": "waste",
-    "incineration-and-open-burning-of-waste": "waste",
-    "industrial-wastewater-treatment-and-discharge": "waste",
-    "solid-waste-disposal": "waste",
-
-    # fluorinated-gases
-    "fluorinated-gases": "fluorinated-gases"
-}
-
-def map_subsector_to_sector(subsector: str) -> str:
-    """
-    Return the top-level sector for the given subsector, or 'unknown' if not found.
-    """
-    return PARENT_MAPPING.get(subsector, "unknown")
+# Sectors, subsectors and the subsector -> sector mapping live in taxonomy.py
+# (imported above, so `from retrievedata import PARENT_MAPPING` keeps working).
 
 
 # =============================================================================
@@ -225,9 +42,25 @@ API_TOKEN = None   # e.g. "abc123"
 YEAR = 2022
 REQUESTED_SECTORS = None
 REQUESTED_SUBSECTORS = None
-BASE_URL = "https://api.climatetrace.org/v6/assets/emissions"
-CHUNK_SIZE = 50
+REQUESTED_GASES = None       # e.g. ["co2", "ch4", "n2o"]; None fetches the API default (co2e_100yr) only
+BASE_URL = os.getenv("CLIMATETRACE_BASE_URL", "https://api.climatetrace.org/v6/assets/emissions")
+CHUNK_SIZE = 50              # starting chunk size; adapted between MIN and MAX at run time
+                             # (fixed while HTTP_CACHE_DIR is set, so re-runs hit the cache)
+MIN_CHUNK_SIZE = 1
+MAX_CHUNK_SIZE = 100
+TARGET_SECONDS = 10.0        # shrink chunks when a request takes longer than this
+MAX_RESPONSE_BYTES = 8_000_000
+MAX_RETRIES = 5              # retries per request on 429/503/network errors
+RATE_LIMIT_WAIT = 60.0       # wait before re-sending a chunk still rate limited after MAX_RETRIES
+MAX_RATE_LIMIT_WAITS = 3     # (unless Retry-After says otherwise), at most this many times per chunk
+HTTP_CACHE_DIR = DEFAULT_CACHE_DIR   # None disables the on-disk response cache
+HTTP_OFFLINE = False                 # True (or CARBONLE_HTTP_OFFLINE=1) replays the cache only
 OUTPUT_FILE = "simplified_emissions.json"
+RAW_OUTPUT = "raw_emissions.json"   # untouched API responses, re-mapped offline by remap.py (None to skip)
+COMPACT_OUTPUT = False       # True (or CARBONLE_JSON_COMPACT=1) writes no-indent JSON
+OUTPUT_FLOAT_DIGITS = None   # e.g. 2 to round emissions to 2 decimal places
+OUTPUT_COMPRESS = ()         # e.g. ("gzip", "br") to also write precompressed copies
+KEEP_GAS = False             # True keeps each row's Gas (always on when REQUESTED_GASES is set)
 
 
 # =============================================================================
@@ -240,19 +73,103 @@ def to_comma(lst):
         return None
     return ",".join(str(x) for x in lst)
 
-def fetch_emissions(countries=None, sectors=None, subsectors=None, year=None, api_token=None, chunk_size=50):
+def parse_retry_after(value, default=1.0):
+    """
+    Parse a Retry-After header into seconds to wait.
+    Accepts either delta-seconds ("30") or an HTTP date; falls back to default.
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def request_with_backoff(http, params, headers, max_retries=MAX_RETRIES, sleep=time.sleep):
+    """
+    GET BASE_URL, retrying rate-limited (429) and unavailable (503) answers.
+    Waits as long as the server's Retry-After asks (or backs off exponentially
+    without one). Network errors are retried the same way.
+
+    :return: (response or None, elapsed seconds of the final attempt, error string or None)
+    """
+    error = None
+    for attempt in range(max_retries + 1):
+        start = time.perf_counter()
+        try:
+            resp = http.get(BASE_URL, headers=headers, params=params)
+        except requests.RequestException as e:
+            error = f"{type(e).__name__}: {e}"
+            if attempt < max_retries:
+                sleep(min(2 ** attempt, 60))
+            continue
+        elapsed = time.perf_counter() - start
+
+        if resp.status_code in (429, 503) and attempt < max_retries:
+            wait = parse_retry_after(resp.headers.get("Retry-After"), default=min(2 ** attempt, 60))
+            print(f"  {resp.status_code} from API, retrying in {wait:.1f}s...")
+            sleep(wait)
+            continue
+        return resp, elapsed, None
+    return None, 0.0, error or "retries exhausted"
+
+def next_chunk_size(chunk_size, chunk_len, elapsed, num_bytes):
+    """
+    Adapt the chunk size from the last successful request:
+    halve it when a response was slow or huge, double it when a full chunk
+    came back quickly and small. Always stays within [MIN_CHUNK_SIZE, MAX_CHUNK_SIZE].
+    """
+    if elapsed > TARGET_SECONDS or num_bytes > MAX_RESPONSE_BYTES:
+        chunk_size = chunk_size // 2
+    elif chunk_len >= chunk_size and elapsed < TARGET_SECONDS / 2 and num_bytes < MAX_RESPONSE_BYTES / 2:
+        chunk_size = chunk_size * 2
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
+
+def fetch_emissions(countries=None, sectors=None, subsectors=None, year=None, api_token=None, chunk_size=50,
+                    session=None, report=None, sleep=time.sleep, gas=None, adaptive=None):
     """
     Calls /v6/assets/emissions for the given filters and returns a combined list of results.
+
+    Countries are requested in chunks whose size adapts to observed latency
+    and response size (see next_chunk_size). 429/503 answers honour
+    Retry-After. A chunk that still fails is bisected and each half retried,
+    so one bad country costs only itself instead of the whole chunk. A chunk
+    still rate limited (429) is not bisected, which would only multiply
+    requests against the limit: it waits out Retry-After and is sent again
+    whole, up to MAX_RATE_LIMIT_WAITS times before its countries fail.
+
+    A chunk's country list is part of the http_cache key, so with a
+    CachedSession the chunk size stays fixed: latency-driven boundaries
+    would differ on the next run and miss every cached response (and
+    offline replay would find nothing). Bisection is deterministic, so
+    failed chunks still replay.
     
     :param countries: List of 3-letter ISO codes
     :param sectors: List of top-level sectors, or None
     :param subsectors: List of subsectors, or None
     :param year: int (e.g. 2022) or None
     :param api_token: Bearer token or None
-    :param chunk_size: How many countries per request
+    :param chunk_size: How many countries per request (starting value)
+    :param session: Object with a requests-style .get() (e.g. http_cache.CachedSession); defaults to requests
+    :param report: Optional dict, filled with a completeness report:
+                   { "requested": [...], "received": [...], "missing": [...],
+                     "failed": { country: error }, "requests": int }
+    :param sleep: Function used to wait between retries (swap out to test)
+    :param gas: One gas, e.g. "ch4", or None for the API default (co2e_100yr)
+    :param adaptive: Adapt the chunk size to latency; None means "unless session is a CachedSession"
     :return: Combined list of response items (dicts or lists)
     """
     all_results = []
+    http = session or requests
+    if report is None:
+        report = {}
+    if adaptive is None:
+        adaptive = not isinstance(session, CachedSession)
 
     # Common params
     params_common = {}
@@ -262,6 +179,8 @@ def fetch_emissions(countries=None, sectors=None, subsectors=None, year=None, ap
         params_common["subsectors"] = to_comma(subsectors)
     if year is not None:
         params_common["years"] = str(year)
+    if gas:
+        params_common["gas"] = gas
 
     headers = {}
     if api_token:
@@ -269,51 +188,118 @@ def fetch_emissions(countries=None, sectors=None, subsectors=None, year=None, ap
 
     # If no countries given, do one request
     if not countries:
-        resp = requests.get(BASE_URL, headers=headers, params=params_common)
-        if resp.status_code == 200:
+        resp, _, error = request_with_backoff(http, params_common, headers, sleep=sleep)
+        report.update({"requested": [], "received": [], "missing": [], "failed": {}, "requests": 1})
+        if resp is not None and resp.status_code == 200:
             data = resp.json()
             return data if isinstance(data, list) else [data]
         else:
-            print(f"Error {resp.status_code}: {resp.text}")
+            print(f"Error {resp.status_code}: {resp.text}" if resp is not None else f"Error: {error}")
             return []
 
-    total_countries = len(countries)
-    num_chunks = math.ceil(total_countries / chunk_size)
+    pending = deque(countries)   # countries not yet attempted, in order
+    bisected = []                # stack of sub-chunks split off a failing chunk
+    received = set()
+    failed = {}
+    num_requests = 0
+    rate_limit_waits = 0         # for the current chunk
 
-    for i in range(num_chunks):
-        start = i * chunk_size
-        end = start + chunk_size
-        chunk = countries[start:end]
+    while pending or bisected:
+        if bisected:
+            chunk = bisected.pop()
+        else:
+            chunk = [pending.popleft() for _ in range(min(chunk_size, len(pending)))]
 
         params_chunk = dict(params_common)
         params_chunk["countries"] = to_comma(chunk)
 
-        print(f"Requesting chunk {i+1}/{num_chunks} ({len(chunk)} countries)...")
-        resp = requests.get(BASE_URL, headers=headers, params=params_chunk)
+        num_requests += 1
+        print(f"Requesting {len(chunk)} countries "
+              f"({len(received) + len(failed)}/{len(countries)} done, chunk size {chunk_size})...")
+        resp, elapsed, error = request_with_backoff(http, params_chunk, headers, sleep=sleep)
 
-        if resp.status_code == 200:
+        if resp is not None and resp.status_code == 200:
             data = resp.json()
             # data might be a dict (e.g., {"DEU": [...]}) or a list
             if isinstance(data, list):
                 all_results.extend(data)
+                items = data
             else:
                 all_results.append(data)
-        else:
-            print(f"Error {resp.status_code}: {resp.text}")
+                items = [data]
+            for item in items:
+                if isinstance(item, dict):
+                    received.update(item.keys())
+            if adaptive:
+                chunk_size = next_chunk_size(chunk_size, len(chunk), elapsed, len(resp.content))
+            rate_limit_waits = 0
+            continue
 
+        error = f"HTTP {resp.status_code}: {resp.text[:200]}" if resp is not None else error
+        if resp is not None and resp.status_code == 429:
+            if rate_limit_waits < MAX_RATE_LIMIT_WAITS:
+                rate_limit_waits += 1
+                wait = parse_retry_after(resp.headers.get("Retry-After"), default=RATE_LIMIT_WAIT)
+                print(f"  still rate limited, waiting {wait:.1f}s before re-sending the chunk of {len(chunk)}")
+                sleep(wait)
+                bisected.append(chunk)
+            else:
+                print(f"  {error} -> giving up on {len(chunk)} rate-limited countries")
+                failed.update((country, error) for country in chunk)
+                rate_limit_waits = 0
+            continue
+        rate_limit_waits = 0
+        if len(chunk) > 1:
+            mid = len(chunk) // 2
+            print(f"  {error} -> bisecting chunk of {len(chunk)}")
+            # Push the second half first so the first half is retried next.
+            bisected.append(chunk[mid:])
+            bisected.append(chunk[:mid])
+        else:
+            print(f"  {error} -> giving up on {chunk[0]}")
+            failed[chunk[0]] = error
+
+    report.update({
+        "requested": list(countries),
+        "received": [c for c in countries if c in received],
+        "missing": [c for c in countries if c not in received],
+        "failed": failed,
+        "requests": num_requests,
+    })
     return all_results
 
+def print_completeness_report(report):
+    """Summarize which requested countries came back and which are missing."""
+    requested = report.get("requested", [])
+    missing = report.get("missing", [])
+    failed = report.get("failed", {})
+    print(f"\nCompleteness: {len(requested) - len(missing)}/{len(requested)} countries "
+          f"received in {report.get('requests', 0)} request(s).")
+    for country in missing:
+        reason = failed.get(country, "request succeeded but no data returned")
+        print(f"  MISSING {country}: {reason}")
+
 
 # =============================================================================
 # 4. SIMPLIFY FUNCTION
 # =============================================================================
 
-def simplify_data(raw_responses):
+def simplify_data(raw_responses, keep_gas=False):
     """
     raw_responses might be multiple dicts like:
       [{ "DEU": [...], "USA": [...] },
        { "CHN": [...], "CAN": [...] }]
     We need to iterate through each dict, each country code, and each record.
+
+    Rows with a Month keep their "year" and "month", so the annual totals
+    skip them (records.REJECT_MONTHLY_ROW) and process.py --monthly can
+    aggregate them. /v6/assets/emissions as fetched above returns annual
+    rows only (Year/Month null), so monthly records have to come from
+    another export.
+
+    With keep_gas=True each record also carries the row's "gas" (e.g.
+    "co2e_100yr", "ch4"). Files mixing gases must keep it: process.py
+    rejects non-CO2e rows by default and converts them with --multi-gas.
     """
     simplified = []
 
@@ -330,12 +316,18 @@ def simplify_data(raw_responses):
                 # Use our new parent_mapping to figure out the top-level sector
                 parent_sector = map_subsector_to_sector(subsector_str)
 
-                simplified.append({
+                record = {
                     "sector": parent_sector,
                     "subsector": subsector_str,
                     "emissions": emissions_val,
                     "country": country_code
-                })
+                }
+                if rec.get("Month") is not None:
+                    record["year"] = rec.get("Year")
+                    record["month"] = rec.get("Month")
+                if keep_gas:
+                    record["gas"] = rec.get("Gas")
+                simplified.append(record)
     return simplified
 
 
@@ -344,18 +336,37 @@ def simplify_data(raw_responses):
 # =============================================================================
 
 if __name__ == "__main__":
-    raw_data = fetch_emissions(
-        countries=COUNTRIES,
-        sectors=REQUESTED_SECTORS,
-        subsectors=REQUESTED_SUBSECTORS,
-        year=YEAR,
-        api_token=API_TOKEN,
-        chunk_size=CHUNK_SIZE
-    )
+    http_session = CachedSession(HTTP_CACHE_DIR, offline=HTTP_OFFLINE) if HTTP_CACHE_DIR else None
+    fetch_report = {}
+
+    # One pass per gas: the API filters by a single gas per request.
+    raw_data = []
+    for gas in REQUESTED_GASES or [None]:
+        if gas:
+            print(f"\nFetching gas '{gas}'...")
+        raw_data.extend(fetch_emissions(
+            countries=COUNTRIES,
+            sectors=REQUESTED_SECTORS,
+            subsectors=REQUESTED_SUBSECTORS,
+            year=YEAR,
+            api_token=API_TOKEN,
+            chunk_size=CHUNK_SIZE,
+            session=http_session,
+            report=fetch_report,
+            gas=gas
+        ))
+        print_completeness_report(fetch_report)
+    if http_session:
+        print(f"HTTP cache: {http_session.stats}")
 
     print(f"\nFetched {len(raw_data)} chunk(s) of data.\n")
 
-    simplified_results = simplify_data(raw_data)
+    # Keep the responses as received, so a taxonomy fix never needs a refetch
+    if RAW_OUTPUT:
+        dump_json(raw_data, RAW_OUTPUT, compact=True)
+        print(f"Stored raw responses in '{RAW_OUTPUT}'")
+
+    simplified_results = simplify_data(raw_data, keep_gas=KEEP_GAS or bool(REQUESTED_GASES))
     print(f"Total records after simplifying: {len(simplified_results)}")
 
     # Print a few
@@ -363,7 +374,12 @@ if __name__ == "__main__":
         print(f"{i}. {row}")
 
     # Save to file
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(simplified_results, f, indent=2)
+    dump_json(
+        simplified_results,
+        OUTPUT_FILE,
+        compact=compact_requested(COMPACT_OUTPUT),
+        float_digits=OUTPUT_FLOAT_DIGITS,
+        compress=OUTPUT_COMPRESS
+    )
 
     print(f"\nDone! Wrote {len(simplified_results)} simplified records to '{OUTPUT_FILE}'.")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import gzip
+import json
+import os
+
+# orjson is several times faster than the stdlib encoder; brotli gives
+# smaller precompressed files than gzip. Both are optional.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Set CARBONLE_JSON_COMPACT=1 to write compact (no-indent) JSON by default.
+COMPACT_ENV = "CARBONLE_JSON_COMPACT"
+
+# Precompressed siblings written next to the JSON file: <name>.json.gz, <name>.json.br
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "br": ".br",
+}
+
+
+def compact_requested(flag=False):
+    """ True if compact output was asked for by a CLI flag or CARBONLE_JSON_COMPACT. """
+    if flag:
+        return True
+    return os.getenv(COMPACT_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def round_floats(data, digits):
+    """
+    Returns a copy of data (dicts/lists/scalars) with every float rounded to
+    the given number of decimal places, e.g. with digits=2:
+      19766269.557782978 -> 19766269.56
+    Ints, strings and bools are left alone.
+    """
+    if isinstance(data, float):
+        return round(data, digits)
+    if isinstance(data, dict):
+        return {key: round_floats(value, digits) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [round_floats(value, digits) for value in data]
+    return data
+
+
+def encode_json(data, compact=False, float_digits=None):
+    """
+    Serializes data to UTF-8 JSON bytes.
+
+    compact=False keeps the historical pretty-printed layout (indent=2);
+    compact=True drops all whitespace. Uses orjson when installed and falls
+    back to the stdlib encoder otherwise.
+    """
+    if float_digits is not None:
+        data = round_floats(data, float_digits)
+
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+
+    if compact:
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def compress_bytes(payload, encoding):
+    """ Compresses payload with 'gzip' or 'br' at the highest ratio (done once, offline). """
+    if encoding == "gzip":
+        # mtime=0 keeps the output byte-identical across runs
+        return gzip.compress(payload, compresslevel=9, mtime=0)
+    if encoding == "br":
+        if brotli is None:
+            raise RuntimeError("brotli precompression requested but the 'brotli' package is not installed")
+        return brotli.compress(payload, quality=11)
+    raise ValueError(f"Unknown compression '{encoding}' (expected one of {sorted(COMPRESSION_SUFFIXES)})")
+
+
+def dump_json(data, filename, compact=False, float_digits=None, compress=()):
+    """
+    Writes data to filename as JSON, plus one precompressed sibling per entry
+    in compress (e.g. ("gzip", "br") -> filename.gz and filename.br).
+
+    The precompressed files let a static server answer with the matching
+    Content-Encoding directly instead of compressing on every request
+    (nginx gzip_static / brotli_static, or any CDN that honours them); the
+    server does the Accept-Encoding negotiation, q-values included.
+    Returns the list of paths written.
+    """
+    payload = encode_json(data, compact=compact, float_digits=float_digits)
+    with open(filename, "wb") as f:
+        f.write(payload)
+
+    written = [filename]
+    for encoding in compress:
+        path = filename + COMPRESSION_SUFFIXES[encoding]
+        with open(path, "wb") as f:
+            f.write(compress_bytes(payload, encoding))
+        written.append(path)
+    return written
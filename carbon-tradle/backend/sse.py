@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import json
+
+from flask import Response
+
+# Server-sent events for the hint / fact / tip endpoints.
+#
+# A client opts in with {"stream": true} in the JSON body or an
+# "Accept: text/event-stream" header. It then receives
+#
+#   data: {"delta": "Most of"}
+#   data: {"delta": " its emissions"}
+#   ...
+#   event: done
+#   data: {"suggestion": "Most of its emissions ..."}
+#
+# where the final "done" event carries exactly the JSON object the
+# non-streaming endpoint would have returned. Cached answers are sent as a
+# single "done" event. A fallback answer (model unavailable) is also a single
+# "done" event, sent with the same 503 status and Retry-After header as the
+# JSON response. A failure after streaming started ends the stream with
+# "event: error" and {"error": ...}.
+
+
+def wants_stream(request, data):
+    if isinstance(data, dict) and data.get('stream') is True:
+        return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+def sse_event(payload, event=None):
+    lines = f"event: {event}\n" if event else ""
+    return f"{lines}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def chunk_text(chunk):
+    """ Token text of one streamed chat completion chunk ('' for role/usage-only chunks). """
+    choices = getattr(chunk, 'choices', None)
+    if not choices:
+        return ""
+    return getattr(choices[0].delta, 'content', None) or ""
+
+def sse_response(events):
+    return Response(
+        events,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+def stream_completion(stream, field, on_complete=None):
+    """
+    Forwards a chat.completions.create(..., stream=True) iterator as SSE.
+
+    :param field: Key of the final answer in the done event ("suggestion", "tip", ...)
+    :param on_complete: Called with the full text once the model finished, e.g. to cache it.
+                        Skipped when the model returned no text, so nothing empty is cached
+    """
+    def events():
+        parts = []
+        try:
+            for chunk in stream:
+                text = chunk_text(chunk)
+                if text:
+                    parts.append(text)
+                    yield sse_event({'delta': text})
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+            return
+        finally:
+            # Also runs when the client disconnects mid-stream, so the model
+            # client gets its concurrency slot back (see resilience.GuardedStream)
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+        full_text = "".join(parts)
+        if on_complete is not None and full_text:
+            on_complete(full_text)
+        yield sse_event({field: full_text}, event='done')
+
+    return sse_response(events())
+
+def stream_cached(payload):
+    """ A whole answer in one burst, for cache hits and fallbacks. """
+    return sse_response([sse_event(payload, event='done')])
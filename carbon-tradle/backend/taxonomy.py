@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import sys
+
+# The one sector taxonomy used by the fetchers (retrievedata.py,
+# archive/scrape.py), validation (records.py) and every dense layout
+# (compact_breakdown, monthly, gases, data_plane). To reclassify a
+# subsector, edit PARENT_MAPPING here and run `python remap.py`: stored
+# records are re-mapped and all outputs rebuilt without any API calls.
+
+# =============================================================================
+# 1. DEFINITIONS
+# =============================================================================
+
+# 1) TOP-LEVEL SECTORS
+ALL_SECTORS = [
+    "fluorinated-gases",
+    "waste",
+    "transportation",
+    "fossil-fuel-operations",
+    "agriculture",
+    "power",
+    "forestry-and-land-use",
+    "buildings",
+    "manufacturing",
+    "mineral-extraction"
+]
+
+# 2) ALL SUBSECTORS
+ALL_SUBSECTORS = [
+    "aluminum",
+    "bauxite-mining",
+    "biological-treatment-of-solid-waste-and-biogenic",
+    "cement",
+    "chemicals",
+    "coal-mining",
+    "copper-mining",
+    "cropland-fires",
+    "crop-residues",
+    "domestic-aviation",
+    "domestic-shipping",
+    "domestic-shipping-ship",
+    "domestic-wastewater-treatment-and-discharge",
+    "electricity-generation",
+    "enteric-fermentation-cattle-operation",
+    "enteric-fermentation-cattle-pasture",
+    "enteric-fermentation-other",
+    "fluorinated-gases",
+    "food-beverage-tobacco",
+    "forest-land-clearing",
+    "forest-land-degradation",
+    "forest-land-fires",
+    "glass",
+    "heat-plants",
+    "incineration-and-open-burning-of-waste",
+    "industrial-wastewater-treatment-and-discharge",
+    "international-aviation",
+    "international-shipping",
+    "international-shipping-ship",
+    "iron-and-steel",
+    "iron-mining",
+    "lime",
+    "manure-applied-to-soils",
+    "manure-left-on-pasture-cattle",
+    "manure-management-cattle-operation",
+    "manure-management-other",
+    "net-forest-land",
+    "net-shrubgrass",
+    "net-wetland",
+    "non-residential-onsite-fuel-usage",
+    "oil-and-gas-production",
+    "oil-and-gas-refining",
+    "oil-and-gas-transport",
+    "other-agricultural-soil-emissions",
+    "other-chemicals",
+    "other-energy-use",
+    "other-fossil-fuel-operations",
+    "other-manufacturing",
+    "other-metals",
+    "other-mining-quarrying",
+    "other-onsite-fuel-usage",
+    "other-transport",
+    "petrochemical-steam-cracking",
+    "pulp-and-paper",
+    "railways",
+    "removals",
+    "residential-onsite-fuel-usage",
+    "rice-cultivation",
+    "road-transportation",
+    "road-transportation-road-segment",
+    "rock-quarrying",
+    "sand-quarrying",
+    "shrubgrass-fires",
+    "soil-organic-carbon",
+    "solid-fuel-transformation",
+    "solid-waste-disposal",
+    "synthetic-fertilizer-application",
+    "textiles-leather-apparel",
+    "water-reservoirs",
+    "wetland-fires",
+    "wood-and-wood-products"
+]
+
+# 3) PARENT MAPPING: SUBSECTOR -> ONE OF THE TEN SECTORS
+PARENT_MAPPING = {
+    # manufacturing
+    "aluminum": "manufacturing",
+    "cement": "manufacturing",
+    "chemicals": "manufacturing",
+    "food-beverage-tobacco": "manufacturing",
+    "glass": "manufacturing",
+    "iron-and-steel": "manufacturing",
+    "other-chemicals": "manufacturing",
+    "other-energy-use": "manufacturing",
+    "other-manufacturing": "manufacturing",
+    "other-metals": "manufacturing",
+    "petrochemical-steam-cracking": "manufacturing",
+    "pulp-and-paper": "manufacturing",
+    "textiles-leather-apparel": "manufacturing",
+
+    # mineral-extraction
+    "bauxite-mining": "mineral-extraction",
+    "copper-mining": "mineral-extraction",
+    "iron-mining": "mineral-extraction",
+    "lime": "mineral-extraction",
+    "other-mining-quarrying": "mineral-extraction",
+    "rock-quarrying": "mineral-extraction",
+    "sand-quarrying": "mineral-extraction",
+
+    # power
+    "electricity-generation": "power",
+    "heat-plants": "power",
+    "solid-fuel-transformation": "power",
+
+    # transportation
+    "domestic-aviation": "transportation",
+    "domestic-shipping": "transportation",
+    "domestic-shipping-ship": "transportation",
+    "international-aviation": "transportation",
+    "international-shipping": "transportation",
+    "international-shipping-ship": "transportation",
+    "other-transport": "transportation",
+    "railways": "transportation",
+    "road-transportation": "transportation",
+    "road-transportation-road-segment": "transportation",
+
+    # fossil-fuel-operations
+    "coal-mining": "fossil-fuel-operations",
+    "oil-and-gas-production": "fossil-fuel-operations",
+    "oil-and-gas-refining": "fossil-fuel-operations",
+    "oil-and-gas-transport": "fossil-fuel-operations",
+    "other-fossil-fuel-operations": "fossil-fuel-operations",
+
+    # agriculture
+    "cropland-fires": "agriculture",
+    "crop-residues": "agriculture",
+    "enteric-fermentation-cattle-operation": "agriculture",
+    "enteric-fermentation-cattle-pasture": "agriculture",
+    "enteric-fermentation-other": "agriculture",
+    "manure-applied-to-soils": "agriculture",
+    "manure-left-on-pasture-cattle": "agriculture",
+    "manure-management-cattle-operation": "agriculture",
+    "manure-management-other": "agriculture",
+    "other-agricultural-soil-emissions": "agriculture",
+    "rice-cultivation": "agriculture",
+    "synthetic-fertilizer-application": "agriculture",
+
+    # forestry-and-land-use
+    "forest-land-clearing": "forestry-and-land-use",
+    "forest-land-degradation": "forestry-and-land-use",
+    "forest-land-fires": "forestry-and-land-use",
+    "net-forest-land": "forestry-and-land-use",
+    "net-shrubgrass": "forestry-and-land-use",
+    "net-wetland": "forestry-and-land-use",
+    "removals": "forestry-and-land-use",
+    "shrubgrass-fires": "forestry-and-land-use",
+    "soil-organic-carbon": "forestry-and-land-use",
+    "water-reservoirs": "forestry-and-land-use",
+    "wetland-fires": "forestry-and-land-use",
+    "wood-and-wood-products": "forestry-and-land-use",
+
+    # buildings
+    "non-residential-onsite-fuel-usage": "buildings",
+    "other-onsite-fuel-usage": "buildings",
+    "residential-onsite-fuel-usage": "buildings",
+
+    # waste
+    "biological-treatment-of-solid-waste-and-biogenic": "waste",
+    "domestic-wastewater-treatment-and-discharge": "waste",
+    "incineration-and-open-burning-of-waste": "waste",
+    "industrial-wastewater-treatment-and-discharge": "waste",
+    "solid-waste-disposal": "waste",
+
+    # fluorinated-gases
+    "fluorinated-gases": "fluorinated-gases"
+}
+
+def map_subsector_to_sector(subsector: str) -> str:
+    """
+    Return the top-level sector for the given subsector, or 'unknown' if not found.
+    """
+    return PARENT_MAPPING.get(subsector, "unknown")
+
+
+# =============================================================================
+# 2. CODE TABLE
+# =============================================================================
+
+# Subsectors ordered by (sector, subsector) so that each sector is one
+# contiguous slice of a country's row. Names are interned so every view and
+# dict key shares a single string object.
+SECTORS = tuple(sys.intern(s) for s in sorted(set(PARENT_MAPPING.values())))
+SUBSECTORS = tuple(
+    sys.intern(sub) for sub in sorted(PARENT_MAPPING, key=lambda sub: (PARENT_MAPPING[sub], sub))
+)
+
+SECTOR_INDEX = {name: i for i, name in enumerate(SECTORS)}
+SUBSECTOR_INDEX = {name: i for i, name in enumerate(SUBSECTORS)}
+
+NUM_SUBSECTORS = len(SUBSECTORS)
+
+# SECTOR_OF_SUBSECTOR[subsector code] == sector code, e.g.
+#   SECTOR_OF_SUBSECTOR[SUBSECTOR_INDEX["cement"]] == SECTOR_INDEX["manufacturing"]
+# (bytes, so numpy can take it as a uint8 array with np.frombuffer)
+SECTOR_OF_SUBSECTOR = bytes(SECTOR_INDEX[PARENT_MAPPING[sub]] for sub in SUBSECTORS)
+
+def _sector_slices():
+    """ sector -> (start, stop) slice of SUBSECTORS (and of every country row). """
+    slices = {}
+    for i, subsector in enumerate(SUBSECTORS):
+        sector = SECTORS[SECTOR_OF_SUBSECTOR[i]]
+        start, _ = slices.get(sector, (i, i))
+        slices[sector] = (start, i + 1)
+    return slices
+
+SECTOR_SLICES = _sector_slices()
+
+# Short hash of PARENT_MAPPING: changes whenever the mapping does.
+TAXONOMY_FINGERPRINT = hashlib.sha1(
+    json.dumps(PARENT_MAPPING, sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
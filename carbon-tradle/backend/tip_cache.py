@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Emissions are bucketed to this many significant figures before keying,
+# so 1234.56, "1234.5600" and 1.23e3 all share one cache entry.
+SIGNIFICANT_FIGURES = 2
+
+# Whole numbers in this range are treated as years and never bucketed.
+YEAR_RANGE = (1900, 2100)
+
+# The SQLite tier drops expired rows when it opens and after every this many sets.
+PURGE_EVERY = 100
+
+_NUMBER = re.compile(r"[-+]?\d[\d,]*(?:\.\d+)?(?:[eE][-+]?\d+)?")
+
+
+# =============================================================================
+# 1. CANONICALIZATION
+# =============================================================================
+
+def emissions_bucket(value, significant=SIGNIFICANT_FIGURES):
+    """ Rounds a number to a few significant figures: 19766269.55 -> 20000000.0 """
+    value = float(value)
+    if value == 0 or not math.isfinite(value):
+        return 0.0
+    digits = significant - 1 - int(math.floor(math.log10(abs(value))))
+    return round(value, digits) + 0.0  # + 0.0 turns -0.0 into 0.0
+
+def normalize_number(value):
+    """
+    Buckets an emissions number, but keeps whole numbers that look like years
+    (1900-2100) exact so 2021 and 2022 never share a key.
+    """
+    value = float(value)
+    if value.is_integer() and YEAR_RANGE[0] <= value <= YEAR_RANGE[1]:
+        return int(value)
+    return emissions_bucket(value)
+
+def normalize_country(country):
+    """ "usa " -> "USA"; full names are case- and whitespace-folded. """
+    country = " ".join(str(country).split())
+    return country.upper() if len(country) == 3 else country.casefold()
+
+def normalize_subsector(subsector):
+    """ " Road Transportation" -> "road-transportation" """
+    return "-".join(str(subsector).strip().lower().replace("_", " ").split())
+
+def normalize_emissions_info(info):
+    """
+    Turns free-form emissions_info into a stable, JSON-serializable value:
+      - numbers (or numeric strings) become emissions buckets (years stay exact)
+      - dicts get sorted, normalized keys and normalized values
+      - lists keep their order with normalized items
+      - other strings are case/whitespace-folded with embedded numbers bucketed
+    """
+    if isinstance(info, bool) or info is None:
+        return info
+    if isinstance(info, (int, float)):
+        return normalize_number(info)
+    if isinstance(info, dict):
+        normalized = {str(k).strip().lower(): normalize_emissions_info(v) for k, v in info.items()}
+        return dict(sorted(normalized.items()))
+    if isinstance(info, (list, tuple)):
+        return [normalize_emissions_info(v) for v in info]
+
+    text = " ".join(str(info).split()).lower()
+    try:
+        return normalize_number(text.replace(",", ""))
+    except ValueError:
+        pass
+    return _NUMBER.sub(lambda m: repr(normalize_number(m.group(0).replace(",", ""))), text)
+
+def canonical_tip_key(country, subsector, emissions_info):
+    """ Stable cache key for an emission tip request. """
+    return json.dumps(
+        [normalize_country(country), normalize_subsector(subsector), normalize_emissions_info(emissions_info)],
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+
+
+# =============================================================================
+# 2. CACHE
+# =============================================================================
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after ttl seconds.
+
+    With persistent_path, entries are also written to a small SQLite file and
+    looked up there on a memory miss, so tips survive restarts and are shared
+    between worker processes. Expired rows are deleted when the file is
+    opened and every PURGE_EVERY sets, so it doesn't grow without bound.
+
+    stats() reports hits, misses, evictions and the hit ratio.
+    """
+
+    def __init__(self, maxsize=1024, ttl=7 * 24 * 3600, persistent_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._sets = 0
+        self._persistent = None
+        if persistent_path:
+            self._persistent = sqlite3.connect(persistent_path, check_same_thread=False)
+            with self._persistent:
+                self._persistent.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+                )
+                self._persistent.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+            self._purge_expired(time.time())
+
+    def _purge_expired(self, now):
+        with self._persistent:
+            self._persistent.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    def _remember(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            if self._persistent is not None:
+                row = self._persistent.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self._hits += 1
+                    return value
+
+            self._misses += 1
+            return default
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._persistent is not None:
+                with self._persistent:
+                    self._persistent.execute(
+                        "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, json.dumps(value), expires_at)
+                    )
+                self._sets += 1
+                if self._sets % PURGE_EVERY == 0:
+                    self._purge_expired(now)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "persistent": self._persistent is not None,
+            }
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from compact_breakdown import CompactBreakdown
+from serialization import dump_json
+from taxonomy import NUM_SUBSECTORS, SECTOR_SLICES, SECTORS, SUBSECTORS, TAXONOMY_FINGERPRINT
+
+# Precomputed nested treemap layouts (sectors, then subsectors inside each
+# sector) for every country and a few standard viewports, so clients only
+# draw rectangles instead of laying out file_hierarchical.json per render.
+#
+# The layout is d3's: d3.treemap().tile(d3.treemapSquarify).padding(PADDING)
+# .round(true), as in frontend/src/components/CarbonTreemapD3.js. Only
+# positive emissions take up area; sinks (negative values) and zeros are
+# left out.
+#
+# Output, one compact file per country plus an index:
+#   treemaps/index.json
+#     { "taxonomy": "ed9401aeb796", "sectors": [...], "subsectors": [...],
+#       "viewports": { "desktop": [1000, 600], ... }, "padding": 10, "countries": [...] }
+#   treemaps/USA.json
+#     {
+#       "country": "USA",
+#       "sectors":    [[sector code, value], ...],      codes index the index's lists
+#       "subsectors": [[subsector code, value], ...],
+#       "layouts": {
+#         "desktop": { "sectors": [x0, y0, x1, y1, ...], "subsectors": [x0, y0, x1, y1, ...] },
+#         ...
+#       }
+#     }
+# Each layout holds four integers per rectangle, in the order of the
+# "sectors" / "subsectors" lists.
+BREAKDOWN_FILE = "subsector_breakdown.json"
+OUTPUT_DIR = "treemaps"
+INDEX_FILE = "index.json"
+
+VIEWPORTS = {
+    "desktop": (1000, 600),
+    "tablet": (768, 480),
+    "mobile": (360, 360),
+}
+PADDING = 10
+PHI = (1 + math.sqrt(5)) / 2   # d3.treemapSquarify's default target aspect ratio
+
+SECTOR_STARTS = [SECTOR_SLICES[sector][0] for sector in SECTORS]
+
+
+# =============================================================================
+# 1. LAYOUT
+# =============================================================================
+
+def squarify(values, x0, y0, x1, y1, ratio=PHI):
+    """
+    d3.treemapSquarify for one parent: tiles values (1-D, sorted largest
+    first, all > 0) into the rectangle. Returns an (n, 4) array of
+    [x0, y0, x1, y1].
+
+    d3 grows each row one node at a time while the worst aspect ratio
+    improves. Here the ratios of every possible row length are computed in
+    one vectorized pass over the remaining values, and the row ends where
+    they first get worse, which gives the same rows.
+    """
+    n = len(values)
+    rects = np.empty((n, 4))
+    value = values.sum()
+    i0 = 0
+    while i0 < n:
+        dx, dy = x1 - x0, y1 - y0
+        if dx <= 0 or dy <= 0:
+            rects[i0:] = (x0, y0, max(x0, x1), max(y0, y1))
+            break
+
+        rest = values[i0:]
+        alpha = max(dy / dx, dx / dy) / (value * ratio)
+        sums = np.cumsum(rest)
+        beta = sums * sums * alpha
+        ratios = np.maximum(rest[0] / beta, beta / rest)
+        worse = np.flatnonzero(ratios[1:] > ratios[:-1])
+        length = worse[0] + 1 if len(worse) else len(rest)
+
+        row_sum = sums[length - 1]
+        edges = np.empty(length + 1)
+        edges[0] = 0.0
+        edges[1:] = sums[:length] / row_sum
+        out = rects[i0:i0 + length]
+        if dx < dy:
+            # Row across the top, nodes left to right
+            y_end = y0 + dy * row_sum / value
+            xs = x0 + dx * edges
+            out[:, 0], out[:, 1], out[:, 2], out[:, 3] = xs[:-1], y0, xs[1:], y_end
+            y0 = y_end
+        else:
+            # Column down the left, nodes top to bottom
+            x_end = x0 + dx * row_sum / value
+            ys = y0 + dy * edges
+            out[:, 0], out[:, 1], out[:, 2], out[:, 3] = x0, ys[:-1], x_end, ys[1:]
+            x0 = x_end
+        value -= row_sum
+        i0 += length
+    return rects
+
+def inset(rects, p):
+    """ Shrinks [x0, y0, x1, y1] rows by p on every side; rows narrower than 2p collapse to their midline. """
+    out = rects + (p, p, -p, -p)
+    for lo, hi in ((0, 2), (1, 3)):
+        collapsed = out[:, hi] < out[:, lo]
+        middle = (out[collapsed, lo] + out[collapsed, hi]) / 2
+        out[collapsed, lo] = out[collapsed, hi] = middle
+    return out
+
+def layout_country(sector_values, subsector_values, width, height, padding=PADDING):
+    """
+    Nested layout for one country, with d3's padding: padding between
+    siblings and between a parent's edge and its children.
+      sector_values     [(sector code, value), ...] largest first
+      subsector_values  { sector code: [(subsector code, value), ...] largest first }
+    Returns (sector rects, subsector rects) as integer (n, 4) arrays, the
+    subsectors in sector layout order.
+    """
+    half = padding / 2
+    if not sector_values:
+        return np.empty((0, 4), dtype=np.int64), np.empty((0, 4), dtype=np.int64)
+
+    area = inset(np.array([[0.0, 0.0, width, height]]), half)[0]
+    sector_rects = squarify(np.array([value for _, value in sector_values]), *area)
+    child_areas = inset(sector_rects, padding).tolist()
+    sub_rects = np.concatenate([
+        squarify(np.array([value for _, value in subsector_values[sector]]), *child_area)
+        for (sector, _), child_area in zip(sector_values, child_areas)
+    ])
+    return round_rects(inset(sector_rects, half)), round_rects(inset(sub_rects, half))
+
+def round_rects(rects):
+    """ d3's .round(true): Math.round on every coordinate (halves round up, unlike np.rint). """
+    return np.floor(rects + 0.5).astype(np.int64)
+
+
+# =============================================================================
+# 2. PER-COUNTRY FILES (parallel across cores)
+# =============================================================================
+
+_worker = None
+
+def _init_worker(breakdown_file, output_dir, viewports, padding):
+    """
+    Loads the breakdown once per worker into a (countries, NUM_SUBSECTORS)
+    array of positive values and computes every country's sector totals in
+    one np.add.reduceat.
+    """
+    global _worker
+    with open(breakdown_file, "r", encoding="utf-8") as f:
+        breakdown = CompactBreakdown.from_breakdown(json.load(f))
+    values = np.frombuffer(breakdown.values_bytes(), dtype=np.float64).reshape(-1, NUM_SUBSECTORS)
+    positive = np.clip(values, 0.0, None)
+    _worker = {
+        "rows": {country: i for i, country in enumerate(breakdown.countries)},
+        "positive": positive,
+        "sector_totals": np.add.reduceat(positive, SECTOR_STARTS, axis=1),
+        "output_dir": output_dir,
+        "viewports": viewports,
+        "padding": padding,
+    }
+
+def build_country(country):
+    """ The per-country file contents (see the header comment). """
+    row = _worker["rows"][country]
+    positive = _worker["positive"][row]
+    totals = _worker["sector_totals"][row]
+
+    sector_values = [(int(s), float(totals[s])) for s in np.argsort(-totals, kind="stable") if totals[s] > 0]
+    subsector_values = {}
+    for sector, _ in sector_values:
+        start, stop = SECTOR_SLICES[SECTORS[sector]]
+        order = start + np.argsort(-positive[start:stop], kind="stable")
+        subsector_values[sector] = [(int(s), float(positive[s])) for s in order if positive[s] > 0]
+
+    layouts = {}
+    for name, (width, height) in _worker["viewports"].items():
+        sector_rects, sub_rects = layout_country(sector_values, subsector_values, width, height, _worker["padding"])
+        layouts[name] = {"sectors": sector_rects.ravel().tolist(), "subsectors": sub_rects.ravel().tolist()}
+
+    return {
+        "country": country,
+        "sectors": [[code, round(value)] for code, value in sector_values],
+        "subsectors": [[code, round(value)] for sector, _ in sector_values for code, value in subsector_values[sector]],
+        "layouts": layouts,
+    }
+
+def _build_and_write(country):
+    path = os.path.join(_worker["output_dir"], f"{country}.json")
+    dump_json(build_country(country), path, compact=True)
+    return path
+
+def precompute(breakdown_file=BREAKDOWN_FILE, output_dir=OUTPUT_DIR, viewports=None, padding=PADDING, workers=None):
+    """
+    Writes one layout file per country and the index. With workers > 1 the
+    countries are spread over a process pool; each worker loads the
+    breakdown once in its initializer. Returns the number of countries.
+    """
+    viewports = viewports or VIEWPORTS
+    os.makedirs(output_dir, exist_ok=True)
+    initargs = (breakdown_file, output_dir, viewports, padding)
+    _init_worker(*initargs)
+    countries = list(_worker["rows"])
+
+    if workers == 1:
+        for country in countries:
+            _build_and_write(country)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+            list(pool.map(_build_and_write, countries, chunksize=16))
+
+    dump_json({
+        "taxonomy": TAXONOMY_FINGERPRINT,
+        "sectors": list(SECTORS),
+        "subsectors": list(SUBSECTORS),
+        "viewports": {name: list(size) for name, size in viewports.items()},
+        "padding": padding,
+        "countries": countries,
+    }, os.path.join(output_dir, INDEX_FILE), compact=True)
+    return len(countries)
+
+
+def parse_viewport(text):
+    """ "name=WIDTHxHEIGHT", e.g. "wide=1600x900". """
+    name, _, size = text.partition("=")
+    width, _, height = size.partition("x")
+    return name, (int(width), int(height))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute squarified treemap layouts for every country.")
+    parser.add_argument("--breakdown", default=BREAKDOWN_FILE)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--viewport", action="append", type=parse_viewport, default=None,
+                        help=f"name=WIDTHxHEIGHT, repeatable (default: {', '.join(f'{k}={w}x{h}' for k, (w, h) in VIEWPORTS.items())})")
+    parser.add_argument("--padding", type=float, default=PADDING)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = precompute(args.breakdown, args.output_dir, dict(args.viewport) if args.viewport else None,
+                       args.padding, args.workers)
+    print(f"Wrote layouts for {count} countries to '{args.output_dir}' in {time.perf_counter() - start:.2f}s")